@@ -1,3 +1,17 @@
-import pluggy
+"""django-simple-deploy.
 
-hookimpl = pluggy.HookimplMarker("simple_deploy")
+Plugins mark their hook implementations with @simple_deploy.hookimpl. Django imports
+this package for every manage.py command, so pluggy is only imported when hookimpl is
+first used.
+"""
+
+
+def __getattr__(name):
+    if name == "hookimpl":
+        import pluggy
+
+        global hookimpl
+        hookimpl = pluggy.HookimplMarker("simple_deploy")
+        return hookimpl
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
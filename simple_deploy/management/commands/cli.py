@@ -10,9 +10,20 @@ def get_usage():
         [--automate-all]
         [--no-logging]
         [--ignore-unclean-git]
+        [--profile]
+        [--refresh-cache]
 
         [--region REGION]
-        [--deployed-project-name DEPLOYED_PROJECT_NAME]"""
+        [--deployed-project-name DEPLOYED_PROJECT_NAME]
+        [--vm-size VM_SIZE]
+        [--workload {io,cpu}]
+        [--server {wsgi,asgi}]
+        [--concurrency-type {requests,connections}]
+        [--min-machines MIN_MACHINES]
+        [--max-machines MAX_MACHINES]
+        [--health-check-path HEALTH_CHECK_PATH]
+        [--conn-max-age CONN_MAX_AGE]
+        [--no-db-health-checks]"""
 
 
 class SimpleDeployCLI:
@@ -67,6 +78,20 @@ class SimpleDeployCLI:
             action="store_true",
         )
 
+        # Allow users to see where a run spends its time.
+        behavior_group.add_argument(
+            "--profile",
+            help="Show how long each step took, and write timing data to the log directory.",
+            action="store_true",
+        )
+
+        # Allow users to ignore cached output from platform CLI commands.
+        behavior_group.add_argument(
+            "--refresh-cache",
+            help="Ignore cached output from platform CLI commands, such as lists of regions.",
+            action="store_true",
+        )
+
         # --- Arguments to customize deployment configuration ---
 
         # Allow users to set the deployed project name. This is the name that will be
@@ -87,6 +112,78 @@ class SimpleDeployCLI:
             default="us-3.platform.sh",
         )
 
+        # Allow users to size gunicorn for the machine their app will run on.
+        deployment_config_group.add_argument(
+            "--vm-size",
+            type=str,
+            help="Size of the machine the app runs on: a Fly.io VM size, Heroku dyno type, or Platform.sh container size. Used to size gunicorn workers.",
+            default="",
+        )
+
+        # Allow users to say what limits their app, so gunicorn can be sized for it.
+        deployment_config_group.add_argument(
+            "--workload",
+            type=str,
+            choices=["io", "cpu"],
+            help="Whether requests mostly wait on IO, such as database queries, or mostly use the CPU. Used to choose gunicorn workers and threads.",
+            default="io",
+        )
+
+        # Allow users to serve their project through its ASGI application.
+        deployment_config_group.add_argument(
+            "--server",
+            type=str,
+            choices=["wsgi", "asgi"],
+            help="Serve the project through its WSGI or ASGI application. ASGI uses gunicorn with uvicorn workers.",
+            default="wsgi",
+        )
+
+        # Allow users to tune how Fly.io's proxy balances load across machines.
+        deployment_config_group.add_argument(
+            "--concurrency-type",
+            type=str,
+            choices=["requests", "connections"],
+            help="Fly.io only: Whether machine concurrency limits count requests or connections. Defaults to requests for WSGI, and connections for ASGI.",
+            default="",
+        )
+
+        # Allow users to set bounds for Fly.io's machine auto-scaling.
+        deployment_config_group.add_argument(
+            "--min-machines",
+            type=int,
+            help="Fly.io only: Number of machines to keep running when the app is idle. Defaults to 0 on shared CPUs, and 1 on performance VMs.",
+            default=None,
+        )
+
+        deployment_config_group.add_argument(
+            "--max-machines",
+            type=int,
+            help="Fly.io only: Number of machines the app can scale up to. With --automate-all, the app is scaled to this many machines after it's deployed.",
+            default=None,
+        )
+
+        # Allow users to have Fly.io check an endpoint of their app.
+        deployment_config_group.add_argument(
+            "--health-check-path",
+            type=str,
+            help="Fly.io only: Path that Fly.io requests to check the app's health, such as /healthz.",
+            default="",
+        )
+
+        # Allow users to tune how long database connections are reused.
+        deployment_config_group.add_argument(
+            "--conn-max-age",
+            type=int,
+            help="Seconds to reuse a database connection across requests. Use 0 to open a new connection for each request.",
+            default=600,
+        )
+
+        deployment_config_group.add_argument(
+            "--no-db-health-checks",
+            help="Don't check that a reused database connection still works before using it.",
+            action="store_true",
+        )
+
         # --- Testing arguments ---
 
         # Since these are never used by end users, they're not included in the help
@@ -0,0 +1,120 @@
+"""Cache the output of read-only platform CLI commands between runs.
+
+When a run of simple_deploy fails, users fix the problem and run it again. Some of the
+validation phase is spent on queries such as `fly version` and
+`fly platform regions --json`, whose output won't have changed. Callers opt in per
+command, with run_quick_command(cmd, cached=True).
+
+Identity and inventory queries, such as `fly auth whoami --json` and
+`fly apps list --json`, aren't cached. Validation errors ask users to fix exactly these
+things, by logging in or creating an app, and then to run simple_deploy again. A cached
+answer would bring the same error back on that run.
+
+Entries are stored as JSON files in the user's cache directory, keyed by the command
+and the directory it was run from. Only successful commands are cached, and output
+that looks like it contains a secret is never written to disk. Deployers should call
+clear() after creating remote resources, so later queries see the new resources.
+"""
+
+import base64, hashlib, json, re, shutil, subprocess, time
+
+# Output matching this pattern is never cached.
+SECRET_PATTERN = re.compile(
+    r"secret|password|passwd|token|api[_-]?key|private[_-]?key|ssh[_-]?key"
+    r"|DATABASE_URL|://[^/\s:@]+:[^/\s@]+@",
+    re.IGNORECASE,
+)
+
+
+class CLICache:
+    """TTL'd on-disk cache of CompletedProcess results."""
+
+    def __init__(self, cache_dir, cwd, ttl=600, refresh=False):
+        """Set up a cache for commands run from cwd.
+
+        ttl: Seconds that an entry stays valid.
+        refresh: If True, cached entries are ignored, but new results are still
+          written, so the next run can use them.
+        """
+        cwd_hash = hashlib.sha256(str(cwd).encode()).hexdigest()[:16]
+        self.cache_dir = cache_dir / cwd_hash
+        self.cwd = str(cwd)
+        self.ttl = ttl
+        self.refresh = refresh
+
+    def get(self, cmd):
+        """Get the cached result of cmd, if there's a fresh one.
+
+        Returns:
+            CompletedProcess | None
+        """
+        if self.refresh:
+            return None
+
+        try:
+            entry = json.loads(self._get_path(cmd).read_text())
+        except (OSError, ValueError):
+            return None
+
+        if entry.get("cmd") != cmd or entry.get("cwd") != self.cwd:
+            return None
+        if time.time() - entry.get("timestamp", 0) > self.ttl:
+            return None
+
+        return subprocess.CompletedProcess(
+            entry["args"],
+            entry["returncode"],
+            base64.b64decode(entry["stdout"]),
+            base64.b64decode(entry["stderr"]),
+        )
+
+    def set(self, cmd, output):
+        """Cache output from cmd, if it's safe and worth caching.
+
+        Failing to write the cache isn't worth stopping a deployment for.
+
+        Returns:
+            bool: True if output was cached.
+        """
+        if output.returncode != 0 or self.contains_secret(output):
+            return False
+
+        entry = {
+            "cmd": cmd,
+            "cwd": self.cwd,
+            "timestamp": time.time(),
+            "args": output.args,
+            "returncode": output.returncode,
+            "stdout": base64.b64encode(output.stdout).decode(),
+            "stderr": base64.b64encode(output.stderr).decode(),
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._get_path(cmd).write_text(json.dumps(entry))
+        except OSError:
+            return False
+
+        return True
+
+    def clear(self):
+        """Remove all cached entries for this directory.
+
+        Returns:
+            None
+        """
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    @staticmethod
+    def contains_secret(output):
+        """Return True if output looks like it contains a secret."""
+        for stream in (output.stdout, output.stderr):
+            if SECRET_PATTERN.search(stream.decode(errors="replace")):
+                return True
+        return False
+
+    # --- Helper methods ---
+
+    def _get_path(self, cmd):
+        """Get the path of the cache file for cmd."""
+        cmd_hash = hashlib.sha256(cmd.encode()).hexdigest()
+        return self.cache_dir / f"{cmd_hash}.json"
@@ -0,0 +1,102 @@
+"""Generate the database settings in each platform's settings block.
+
+By default, Django closes its database connection at the end of every request. On a
+hosted Postgres database, that means each request pays for a new TCP connection, a TLS
+handshake, and authentication before it runs a single query. Setting CONN_MAX_AGE lets
+each worker thread reuse its connection across requests. Connection health checks make
+Django test a reused connection before handing it to a request, so a connection that
+was dropped by the database or a proxy is replaced, instead of failing the request.
+
+Platforms describe their database differently. Heroku and Fly.io provide a
+DATABASE_URL, which is parsed by dj_database_url. Platform.sh provides credentials,
+which are written into DATABASES directly. Both forms get the same connection settings
+from DatabaseSettings, so every settings block configures connection reuse the same way.
+
+Values passed to DatabaseSettings are Python source code, such as '"DATABASE_URL"' or
+'db_settings["path"]', and are written to settings.py as they are. Code is laid out
+the way Black would lay it out, one argument or entry per line.
+"""
+
+import json
+from collections import namedtuple
+
+# Seconds to keep a database connection open between requests.
+DEFAULT_CONN_MAX_AGE = 600
+
+INDENT = "    "
+
+# A function call in generated code. args is a list of source code strings, and
+# kwargs is a dict of {name: source code}.
+Call = namedtuple("Call", ["func", "args", "kwargs"])
+
+
+class DatabaseSettings:
+    """Generate database settings with the same connection reuse for every platform."""
+
+    def __init__(self, conn_max_age=DEFAULT_CONN_MAX_AGE, health_checks=True):
+        """Store the connection settings.
+
+        conn_max_age: Seconds to keep connections open. 0 closes each connection at
+          the end of its request, and health checks are left out.
+        """
+        self.conn_max_age = conn_max_age
+        self.health_checks = health_checks and conn_max_age != 0
+
+    def database_url(self, func, *args, **kwargs):
+        """Get a call to a dj_database_url function, such as dj_database_url.config,
+        with connection reuse settings added to its keyword arguments.
+
+        Returns:
+            Call
+        """
+        kwargs["conn_max_age"] = str(self.conn_max_age)
+        if self.health_checks:
+            kwargs["conn_health_checks"] = "True"
+        return Call(func, list(args), kwargs)
+
+    def connection(self, entries):
+        """Get a DATABASES entry with connection reuse settings added to entries.
+
+        Returns:
+            dict
+        """
+        entries = dict(entries)
+        entries["CONN_MAX_AGE"] = str(self.conn_max_age)
+        if self.health_checks:
+            entries["CONN_HEALTH_CHECKS"] = "True"
+        return entries
+
+    def assignment(self, target, value, level=1):
+        """Get code that assigns value to target, such as DATABASES.
+
+        value: Source code, a Call, or a dict of {key: value} for a dict literal.
+        level: Indentation level of the assignment. The first line isn't indented,
+          so the code can be placed after indentation in a template.
+
+        Returns:
+            str
+        """
+        return f"{target} = {_format_value(value, level)}"
+
+
+# --- Helper functions ---
+
+
+def _format_value(value, level):
+    """Format a value in generated code, indenting nested lines below level."""
+    inner = INDENT * (level + 1)
+    closing = INDENT * level
+
+    if isinstance(value, Call):
+        items = value.args + [f"{name}={code}" for name, code in value.kwargs.items()]
+        lines = [f"{inner}{item}," for item in items]
+        return "\n".join([f"{value.func}(", *lines, f"{closing})"])
+
+    if isinstance(value, dict):
+        lines = [
+            f"{inner}{json.dumps(key)}: {_format_value(item, level + 1)},"
+            for key, item in value.items()
+        ]
+        return "\n".join(["{", *lines, f"{closing}}}"])
+
+    return value
@@ -92,3 +92,58 @@ def invalid_platform_msg(requested_platform):
     """
     )
     return msg
+
+
+def invalid_vm_size_msg(platform, vm_size, known_sizes):
+    """Error message, when an unknown --vm-size argument is provided."""
+
+    sizes = "\n".join(f"          {size}" for size in known_sizes)
+    msg = dedent(
+        f"""
+
+        --- The VM size "{vm_size}" isn't known for {platform}. ---
+
+        - Sizes simple_deploy can plan gunicorn workers for:
+{sizes}
+        - Example usage:
+          $ python manage.py simple_deploy --platform {platform} --vm-size {known_sizes[0]}
+
+    """
+    )
+    return msg
+
+
+def invalid_conn_max_age_msg(conn_max_age):
+    """Error message, when a negative --conn-max-age argument is provided."""
+
+    msg = dedent(
+        f"""
+
+        --- The connection age {conn_max_age} can't be used. ---
+
+        - --conn-max-age is the number of seconds to reuse a database connection.
+        - Use 0 to open a new connection for each request.
+        - Example usage:
+          $ python manage.py simple_deploy --platform heroku --conn-max-age 60
+
+    """
+    )
+    return msg
+
+
+def missing_asgi_module_msg(asgi_path):
+    """Error message, when --server asgi is used but there's no asgi.py file."""
+
+    msg = dedent(
+        f"""
+
+        --- The --server asgi option needs an ASGI application, but there's
+            no asgi.py file at:
+            {asgi_path.as_posix()}
+
+        - Django's startproject command generates this file. You can copy it
+          from a new project, or run simple_deploy with --server wsgi.
+
+    """
+    )
+    return msg
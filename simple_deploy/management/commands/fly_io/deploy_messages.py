@@ -98,6 +98,36 @@ If you think there's a database that simple_deploy should be able to use,
 #   determined as the script runs.
 
 
+def invalid_machine_counts_msg(min_machines, max_machines):
+    """Error message, when --min-machines or --max-machines can't be used."""
+
+    msg = dedent(
+        f"""
+        --- The machine counts --min-machines {min_machines} and --max-machines {max_machines} can't be used. ---
+
+        - --min-machines can't be negative, and --max-machines must be at least 1.
+        - --min-machines can't be greater than --max-machines.
+        - Example usage:
+          $ python manage.py simple_deploy --platform fly_io --min-machines 1 --max-machines 3
+    """
+    )
+    return msg
+
+
+def invalid_health_check_path_msg(path):
+    """Error message, when --health-check-path isn't a path."""
+
+    msg = dedent(
+        f"""
+        --- The health check path "{path}" needs to start with a slash. ---
+
+        - Example usage:
+          $ python manage.py simple_deploy --platform fly_io --health-check-path /healthz
+    """
+    )
+    return msg
+
+
 def region_not_found(app_name):
     """Could not find a region to deploy to."""
 
@@ -200,7 +230,7 @@ def cant_use_db(db_name, users):
     return msg
 
 
-def success_msg(log_output=""):
+def success_msg(log_output="", app_name="", max_machines=None):
     """Success message, for configuration-only run.
 
     Note: This is immensely helpful; I use it just about every time I do a
@@ -227,6 +257,14 @@ def success_msg(log_output=""):
     """
     )
 
+    if max_machines:
+        msg += dedent(
+            f"""
+        - Let Fly.io scale your project up to {max_machines} machines:
+            $ fly scale count {max_machines} -a {app_name}
+        """
+        )
+
     if log_output:
         msg += dedent(
             f"""
@@ -0,0 +1,156 @@
+"""Build the contents of fly.toml for a project.
+
+fly.toml is built as a dict, and written out as TOML by the core command. The app is
+served through an [http_service] section, which lets Fly's proxy start machines when
+requests arrive, and stop them when they're idle.
+
+Fly's proxy balances load using concurrency limits:
+- Above soft_limit, the proxy prefers to send traffic to other machines, and starts
+  stopped machines if there are any.
+- At hard_limit, the proxy stops sending new traffic to a machine, and holds it until
+  the machine has capacity again.
+
+The limits are derived from how gunicorn was sized for the VM. A WSGI app can work on
+workers * threads requests at once, so that's the soft limit. Requests beyond that wait
+in gunicorn's backlog, and the hard limit leaves room for a few queued requests per
+thread. An ASGI worker's event loop handles many connections at once, so ASGI apps are
+limited by connections, and each worker is allowed ASGI_CONNECTIONS_PER_WORKER of them.
+
+Machines on shared CPUs are cheap to stop and start, so by default they're all stopped
+when the app is idle. Apps on performance VMs keep one machine running.
+
+Every app gets a TCP check, which makes sure gunicorn is accepting connections, like the
+tcp_checks in the legacy [[services]] block did. The checks on [http_service] can only
+be HTTP checks, so the TCP check is a top-level check. An HTTP check on [http_service]
+is only added when a health check path is passed, because it needs a path that responds
+successfully without logging in.
+"""
+
+from collections import namedtuple
+
+Concurrency = namedtuple("Concurrency", ["type", "soft_limit", "hard_limit"])
+
+CONCURRENCY_TYPES = ("requests", "connections")
+
+# Concurrency type used when --concurrency-type isn't passed.
+DEFAULT_CONCURRENCY_TYPES = {
+    "wsgi": "requests",
+    "asgi": "connections",
+}
+
+# Connections each uvicorn worker is expected to handle well.
+ASGI_CONNECTIONS_PER_WORKER = 50
+
+# hard_limit is this multiple of soft_limit.
+HARD_LIMIT_FACTOR = 4
+
+INTERNAL_PORT = 8000
+
+
+def get_concurrency(worker_config, server="wsgi", concurrency_type=""):
+    """Get concurrency limits for machines running gunicorn with worker_config.
+
+    Returns:
+        Concurrency
+    """
+    concurrency_type = concurrency_type or DEFAULT_CONCURRENCY_TYPES[server]
+
+    if server == "asgi":
+        soft_limit = worker_config.workers * ASGI_CONNECTIONS_PER_WORKER
+    else:
+        soft_limit = worker_config.workers * worker_config.threads
+
+    return Concurrency(concurrency_type, soft_limit, soft_limit * HARD_LIMIT_FACTOR)
+
+
+def get_min_machines(vm_size, min_machines=None):
+    """Get the number of machines to keep running when the app is idle.
+
+    Returns:
+        int
+    """
+    if min_machines is not None:
+        return min_machines
+    return 0 if vm_size.startswith("shared-") else 1
+
+
+def get_health_check(app_name, path):
+    """Get an HTTP health check that requests path.
+
+    The check sends the app's public hostname, so Django's ALLOWED_HOSTS accepts it.
+
+    Returns:
+        dict
+    """
+    return {
+        "grace_period": "10s",
+        "interval": "30s",
+        "method": "GET",
+        "timeout": "5s",
+        "path": path,
+        "headers": {"Host": f"{app_name}.fly.dev"},
+    }
+
+
+def get_tcp_check():
+    """Get a TCP check on the port the app listens on.
+
+    Returns:
+        dict
+    """
+    return {
+        "type": "tcp",
+        "port": INTERNAL_PORT,
+        "grace_period": "1s",
+        "interval": "15s",
+        "timeout": "2s",
+        "processes": ["app"],
+    }
+
+
+def build_config(
+    app_name,
+    vm_size,
+    worker_config,
+    env_vars,
+    server="wsgi",
+    concurrency_type="",
+    min_machines=None,
+    health_check_path="",
+):
+    """Build the contents of fly.toml.
+
+    env_vars: Env vars to set on the app's machines, besides PORT.
+    min_machines: Machines to keep running when idle. Defaults to a number
+      suited to vm_size.
+    health_check_path: Path for Fly to check the app's health on. If it's empty, Fly
+      only checks that the app accepts TCP connections.
+
+    Returns:
+        dict
+    """
+    concurrency = get_concurrency(worker_config, server, concurrency_type)
+
+    http_service = {
+        "internal_port": INTERNAL_PORT,
+        "force_https": True,
+        "auto_stop_machines": "stop",
+        "auto_start_machines": True,
+        "min_machines_running": get_min_machines(vm_size, min_machines),
+        "processes": ["app"],
+        "concurrency": concurrency._asdict(),
+    }
+    if health_check_path:
+        http_service["checks"] = [get_health_check(app_name, health_check_path)]
+
+    return {
+        "app": app_name,
+        "kill_signal": "SIGINT",
+        "kill_timeout": 5,
+        "env": {"PORT": str(INTERNAL_PORT), **env_vars},
+        "http_service": http_service,
+        "checks": {"app_port": get_tcp_check()},
+        "vm": [{"size": vm_size}],
+        "statics": [{"guest_path": "/app/public", "url_prefix": "/static/"}],
+        "deploy": {"release_command": "python manage.py migrate"},
+    }
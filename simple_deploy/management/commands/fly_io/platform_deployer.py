@@ -13,9 +13,10 @@ from pathlib import Path
 
 from django.utils.safestring import mark_safe
 
-import requests
-
 from . import deploy_messages as platform_msgs
+from . import utils as fly_utils
+from . import region_probe
+from . import fly_config
 
 
 class PlatformDeployer:
@@ -39,18 +40,29 @@ class PlatformDeployer:
         """Coordinate the overall configuration and deployment."""
         self.sd.write_output("\nConfiguring project for deployment to Fly.io...")
 
-        self._validate_platform()
-
-        self._prep_automate_all()
-        self._set_env_vars()
-        self._add_dockerfile()
-        self._add_dockerignore()
-        self._add_flytoml()
-        self._modify_settings()
-        self._add_requirements()
-
-        self._conclude_automate_all()
-        self._show_success_message()
+        # Steps run in order, except for the few that opt in to running concurrently.
+        # The app and database are created during validation, and secrets can only be
+        # set on them after that. The Dockerfile and settings steps may prompt the
+        # user, so they run on their own.
+        Step = self.sd.step_graph.Step
+        steps = [
+            Step(self._validate_platform, provides=["fly_app", "database"]),
+            Step(self._prep_automate_all),
+            Step(
+                self._set_env_vars,
+                requires=["fly_app", "database"],
+                provides=["remote_secrets"],
+                concurrent=True,
+            ),
+            Step(self._add_dockerfile, provides=["Dockerfile"]),
+            Step(self._add_dockerignore, provides=[".dockerignore"], concurrent=True),
+            Step(self._add_flytoml, provides=["fly.toml"], concurrent=True),
+            Step(self._modify_settings, provides=["settings.py"]),
+            Step(self._add_requirements, provides=["requirements"], concurrent=True),
+            Step(self._conclude_automate_all),
+            Step(self._show_success_message),
+        ]
+        self.sd.run_steps(steps)
 
     # --- Helper methods for deploy() ---
 
@@ -67,6 +79,8 @@ class PlatformDeployer:
         Raises:
             SimpleDeployCommandError: If we find any reason deployment won't work.
         """
+        self._check_scaling_options()
+
         if self.sd.unit_testing:
             # Unit tests don't use the platform's CLI. Use the deployed project name
             # that was passed to the simple_deploy CLI.
@@ -79,10 +93,12 @@ class PlatformDeployer:
         # Make sure a Fly.io app has been created, or create one if  using
         # --automate-all. Get the name of that app, which will be the  same as
         # self.app_name.
-        self.deployed_project_name = self._get_deployed_project_name()
+        with self.sd.profiler.span("fly_io: _get_deployed_project_name"):
+            self.deployed_project_name = self._get_deployed_project_name()
 
         # Create the db now, before any additional configuration.
-        self._create_db()
+        with self.sd.profiler.span("fly_io: _create_db"):
+            self._create_db()
 
     def _prep_automate_all(self):
         """Take any further actions needed if using automate_all."""
@@ -94,27 +110,18 @@ class PlatformDeployer:
         if self.sd.unit_testing:
             return
 
-        self._set_on_flyio()
-        self._set_debug()
-
-    def _set_on_flyio(self):
-        """Set a secret, ON_FLYIO. This is used in settings.py to apply
-        deployment-specific settings.
-        """
-        msg = "\nSetting ON_FLYIO secret..."
-        self.sd.write_output(msg)
-        self._set_secret("ON_FLYIO", "ON_FLYIO=1")
-
-    def _set_debug(self):
-        """Set a secret, DEBUG=FALSE. This is used in settings.py to apply
-        deployment-specific settings.
-        """
-        msg = "Setting DEBUG secret..."
-        self.sd.write_output(msg)
-        self._set_secret("DEBUG", "DEBUG=FALSE")
+        # ON_FLYIO and DEBUG are used in settings.py to apply deployment-specific
+        # settings.
+        self.sd.write_output("\nSetting ON_FLYIO and DEBUG secrets...")
+        self._set_secrets({"ON_FLYIO": "1", "DEBUG": "FALSE"})
 
     def _add_dockerfile(self):
-        """Add a minimal dockerfile.
+        """Add a multi-stage dockerfile.
+
+        Packages are installed in a builder stage, with BuildKit cache mounts for the
+        pip, Poetry, and Pipenv caches. The runtime stage only copies in the virtual
+        environment and the app code, so package managers and build tools aren't
+        shipped in the final image.
 
         Different dependency management systems need different Dockerfiles. We could
         send an argument to the template to dynamically generate the appropriate
@@ -128,7 +135,7 @@ class PlatformDeployer:
         self.sd.write_output(f"\n  Looking in {self.sd.git_path} for Dockerfile...")
 
         path = self.sd.project_root / "Dockerfile"
-        if path.exists():
+        if self.sd.snapshot.exists(path):
             self.sd.write_output("    Found existing Dockerfile.")
             proceed = self.sd.get_confirmation(self.messages.dockerfile_found)
             if not proceed:
@@ -141,6 +148,8 @@ class PlatformDeployer:
 
         context = {
             "django_project_name": self.sd.local_project_name,
+            "server": self.sd.server,
+            "server_args": self.sd.server_args,
         }
 
         if self.sd.pkg_manager == "poetry":
@@ -151,7 +160,9 @@ class PlatformDeployer:
             dockerfile_template = "dockerfile"
         template_path = self.templates_path / dockerfile_template
 
-        self.sd.utils.write_file_from_template(path, template_path, context)
+        self.sd.utils.write_file_from_template(
+            path, template_path, context, self.sd.snapshot
+        )
 
         msg = f"\n    Generated Dockerfile: {path}"
         self.sd.write_output(msg)
@@ -165,50 +176,61 @@ class PlatformDeployer:
         # Check for existing dockerignore file; we're only looking in project root.
         #   If we find one, don't make any changes.
         path = Path(".dockerignore")
-        if path.exists():
+        if self.sd.snapshot.exists(path):
             msg = "  Found existing .dockerignore file. Not overwriting this file."
             self.sd.write_output(msg)
         else:
             dockerignore_str = self._build_dockerignore()
-            path.write_text(dockerignore_str, encoding="utf-8")
+            self.sd.snapshot.write_text(path, dockerignore_str)
             msg = "  Wrote .dockerignore file."
             self.sd.write_output(msg)
 
     def _add_flytoml(self):
-        """Add a minimal fly.toml file."""
+        """Add a fly.toml file, with concurrency and scaling suited to the VM."""
         # File should be in project root, if present.
         self.sd.write_output(f"\n  Looking in {self.sd.git_path} for fly.toml file...")
 
         path = self.sd.project_root / "fly.toml"
-        if path.exists():
+        if self.sd.snapshot.exists(path):
             self.sd.write_output("    Found existing fly.toml file.")
         else:
-            # Generate file from template.
-            context = {
-                "deployed_project_name": self.deployed_project_name,
-                "using_pipenv": (self.sd.pkg_manager == "pipenv"),
-            }
-            template_path = self.templates_path / "fly.toml"
-
-            self.sd.utils.write_file_from_template(path, template_path, context)
+            config = fly_config.build_config(
+                self.deployed_project_name,
+                self.sd.vm_size,
+                self.sd.worker_config,
+                self.sd.worker_env_vars,
+                server=self.sd.server,
+                concurrency_type=self.sd.concurrency_type,
+                min_machines=self.sd.min_machines,
+                health_check_path=self.sd.health_check_path,
+            )
+            self.sd.utils.write_toml(path, config, self.sd.snapshot)
 
+            concurrency = config["http_service"]["concurrency"]
             msg = f"\n    Generated fly.toml: {path}"
+            msg += f"\n    Concurrency limits: {concurrency['soft_limit']} soft,"
+            msg += f" {concurrency['hard_limit']} hard ({concurrency['type']})."
             self.sd.write_output(msg)
 
     def _modify_settings(self):
         """Add platformsh-specific settings."""
         self.sd.write_output("\n  Adding a Fly.io-specific settings block...")
 
-        settings_string = self.sd.settings_path.read_text()
+        settings_string = self.sd.snapshot.read_text(self.sd.settings_path)
         safe_settings_string = mark_safe(settings_string)
+        db = self.sd.db_settings
+        databases_setting = db.assignment(
+            'DATABASES["default"]', db.database_url("dj_database_url.parse", "db_url")
+        )
         context = {
             "current_settings": safe_settings_string,
             "deployed_project_name": self.deployed_project_name,
+            "databases_setting": mark_safe(databases_setting),
         }
         template_path = self.templates_path / "settings.py"
 
         self.sd.utils.write_file_from_template(
-            self.sd.settings_path, template_path, context
+            self.sd.settings_path, template_path, context, self.sd.snapshot
         )
 
         msg = f"    Modified settings.py file: {self.sd.settings_path}"
@@ -217,7 +239,7 @@ class PlatformDeployer:
     def _add_requirements(self):
         """Add requirements for deploying to Fly.io."""
         requirements = ["gunicorn", "psycopg2-binary", "dj-database-url", "whitenoise"]
-        self.sd.add_packages(requirements)
+        self.sd.add_packages(requirements + self.sd.server_packages)
 
     def _conclude_automate_all(self):
         """Finish automating the push to Fly.io.
@@ -237,6 +259,11 @@ class PlatformDeployer:
         cmd = "fly deploy"
         self.sd.run_slow_command(cmd)
 
+        if self.sd.max_machines:
+            self.sd.write_output(f"  Scaling to {self.sd.max_machines} machines...")
+            cmd = f"fly scale count {self.sd.max_machines} -a {self.app_name} --yes"
+            self.sd.run_slow_command(cmd)
+
         # Open project.
         self.sd.write_output("  Opening deployed app in a new browser tab...")
         cmd = f"fly apps open -a {self.app_name}"
@@ -258,36 +285,49 @@ class PlatformDeployer:
         if self.sd.automate_all:
             msg = self.messages.success_msg_automate_all(self.deployed_url)
         else:
-            msg = self.messages.success_msg(log_output=self.sd.log_output)
+            msg = self.messages.success_msg(
+                log_output=self.sd.log_output,
+                app_name=self.deployed_project_name,
+                max_machines=self.sd.max_machines,
+            )
         self.sd.write_output(msg)
 
-    def _set_secret(self, needle, secret):
-        """Set a secret on Fly, if it's not already set.
+    def _set_secrets(self, secrets):
+        """Set any secrets on Fly that aren't already set.
 
-        DEV: Do we need to say that it's already set, and get confirmation to change
-        value? (Only needed if it's not set to same value.)
-        """
+        Existing secrets are listed once, and all missing secrets are set in a single
+        `fly secrets set` call. Each call to `fly secrets set` can trigger a new
+        release, so setting secrets one at a time is much slower. If the app hasn't
+        been deployed yet, secrets are staged for the first deployment.
 
-        # First check if secret has already been set.
-        #   Don't log output of `fly secrets list`!
+        DEV: Do we need to say that a secret is already set, and get confirmation to
+        change its value? (Only needed if it's not set to same value.)
+        """
+        # Don't log output of `fly secrets list`!
         cmd = f"fly secrets list -a {self.deployed_project_name} --json"
         output_obj = self.sd.run_quick_command(cmd)
-        secrets_json = json.loads(output_obj.stdout.decode())
+        missing_secrets = fly_utils.get_missing_secrets(
+            secrets, output_obj.stdout.decode()
+        )
 
-        secrets_keys = [secret["Name"] for secret in secrets_json]
+        for name in secrets:
+            if name not in missing_secrets:
+                msg = f"  Found {name} in existing secrets."
+                self.sd.write_output(msg)
 
-        if needle in secrets_keys:
-            msg = f"  Found {needle} in existing secrets."
-            self.sd.write_output(msg)
+        if not missing_secrets:
             return
 
-        cmd = f"fly secrets set -a {self.deployed_project_name} {secret}"
+        cmd = fly_utils.get_secrets_set_cmd(
+            self.deployed_project_name, missing_secrets, stage=not self.app_deployed
+        )
         output_obj = self.sd.run_quick_command(cmd)
         output_str = output_obj.stdout.decode()
         self.sd.write_output(output_str)
 
-        msg = f"  Set secret: {secret}"
-        self.sd.write_output(msg)
+        for name, value in missing_secrets.items():
+            msg = f"  Set secret: {name}={value}"
+            self.sd.write_output(msg)
 
     def _build_dockerignore(self):
         """Build the contents of the dockerignore file."""
@@ -318,6 +358,24 @@ class PlatformDeployer:
 
     # --- Helper methods for _validate_platform() ---
 
+    def _check_scaling_options(self):
+        """Make sure the machine counts and health check path can be used."""
+        min_machines, max_machines = self.sd.min_machines, self.sd.max_machines
+        if (
+            (min_machines is not None and min_machines < 0)
+            or (max_machines is not None and max_machines < 1)
+            or (
+                None not in (min_machines, max_machines) and min_machines > max_machines
+            )
+        ):
+            msg = self.messages.invalid_machine_counts_msg(min_machines, max_machines)
+            raise self.sd.utils.SimpleDeployCommandError(self.sd, msg)
+
+        path = self.sd.health_check_path
+        if path and not path.startswith("/"):
+            msg = self.messages.invalid_health_check_path_msg(path)
+            raise self.sd.utils.SimpleDeployCommandError(self.sd, msg)
+
     def _check_flyio_settings(self):
         """Check to see if a Fly.io settings block already exists."""
         start_line = "# Fly.io settings."
@@ -329,12 +387,18 @@ class PlatformDeployer:
         )
 
     def _validate_cli(self):
-        """Make sure the Fly.io CLI is installed, and user is authenticated."""
-        cmd = "fly version"
+        """Make sure the Fly.io CLI is installed, and user is authenticated.
+
+        The version check and the auth check don't depend on each other, so they're
+        run at the same time.
+        """
+        cmds = ["fly version", "fly auth whoami --json"]
 
         # This generates a FileNotFoundError on Ubuntu if the CLI is not installed.
         try:
-            output_obj = self.sd.run_quick_command(cmd)
+            output_obj, whoami_output_obj = self.sd.gather_commands(
+                cmds, cached=["fly version"]
+            )
         except FileNotFoundError:
             raise self.sd.utils.SimpleDeployCommandError(
                 self.sd, self.messages.cli_not_installed
@@ -349,8 +413,7 @@ class PlatformDeployer:
             )
 
         # Check that user is authenticated.
-        cmd = "fly auth whoami --json"
-        output_obj = self.sd.run_quick_command(cmd)
+        output_obj = whoami_output_obj
 
         error_msg = "Error: No access token available."
         if error_msg in output_obj.stderr.decode():
@@ -404,6 +467,12 @@ class PlatformDeployer:
         project_names = self._get_undeployed_projects(output_json)
         self._select_project_name(project_names)
 
+        # Newly-created apps aren't in output_json; they haven't been deployed either.
+        deployed_apps = [
+            app_dict["Name"] for app_dict in output_json if app_dict["Deployed"]
+        ]
+        self.app_deployed = self.app_name in deployed_apps
+
         # Display and return deployed app name.
         msg = f"  Using Fly.io app: {self.app_name}"
         self.sd.write_output(msg)
@@ -508,6 +577,9 @@ class PlatformDeployer:
 
         cmd = "fly apps create --generate-name --json"
         output_obj = self.sd.run_quick_command(cmd)
+
+        # Cached lists of apps are out of date now.
+        self.sd.cli_cache.clear()
         output_str = output_obj.stdout.decode()
         self.sd.write_output(output_str)
 
@@ -564,8 +636,9 @@ class PlatformDeployer:
         cmd += " --initial-cluster-size 1 --vm-size shared-cpu-1x --volume-size 1"
         self._confirm_create_db(db_cmd=cmd)
 
-        # Create database. Log command, but don't log output because it should contain
-        # db credentials. May want to scrub and then log output.
+        # Create database. Log command, but don't log output because it contains db
+        # credentials. The output is streamed in chunks, and a credential split across
+        # two chunks wouldn't be recognized by the log's secret scrubber.
         self.sd.log_info(cmd)
         self.sd.run_slow_command(cmd, skip_logging=True)
 
@@ -594,8 +667,11 @@ class PlatformDeployer:
         Current approach:
         - This forum post: https://community.fly.io/t/feature-requests-region-latency-tests/968/6
         - Leads to this tool: https://liveview-counter.fly.dev/
-        - It identifies the region with lowest latency, ie "Connected to iad".
-        - Solution: request this page, parse for that phrase, select region.
+        - The tool runs in every region, and Fly honors a fly-prefer-region header.
+        - Solution: Get candidate regions from `fly platform regions --json`, probe
+          the tool from every region concurrently, and use the region with the
+          lowest median latency. See region_probe.py.
+        - The result is cached in the user's cache directory for a day.
         - Return 'sea' if this doesn't work.
 
         Returns:
@@ -605,25 +681,41 @@ class PlatformDeployer:
         msg = "Looking for Fly.io region..."
         self.sd.write_output(msg)
 
-        # Get region output.
-        url = "https://liveview-counter.fly.dev/"
-        r = requests.get(url)
-
-        re_region = r"Connected to ([a-z]{3})"
-        m = re.search(re_region, r.text)
-        if m:
-            region = m.group(1)
+        cache_path = self.sd.utils.get_user_cache_dir() / "fly_io_region.json"
+        region, from_cache = region_probe.find_nearest_region(
+            self._get_candidate_regions, cache_path
+        )
 
+        if region and from_cache:
+            msg = f"  Using cached lowest latency region: {region}"
+            self.sd.write_output(msg)
+        elif region:
             msg = f"  Found lowest latency region: {region}"
             self.sd.write_output(msg)
         else:
-            region = "sea"
+            region = region_probe.DEFAULT_REGION
 
-            msg = f"  Couldn't find lowest latency region, using 'sea'."
+            msg = f"  Couldn't find lowest latency region, using '{region}'."
             self.sd.write_output(msg)
 
         return region
 
+    def _get_candidate_regions(self):
+        """Get the regions that are available for a new db.
+
+        Returns:
+            List[str]: Empty if the regions can't be listed.
+        """
+        cmd = "fly platform regions --json"
+        output_obj = self.sd.run_quick_command(cmd, cached=True)
+        if output_obj.returncode:
+            return []
+
+        try:
+            return region_probe.parse_regions(output_obj.stdout.decode())
+        except ValueError:
+            return []
+
     def _check_db_exists(self):
         """Check if a postgres db already exists that should be used with this app.
 
@@ -796,14 +888,8 @@ class PlatformDeployer:
         output_obj = self.sd.run_quick_command(cmd)
         output_str = output_obj.stdout.decode()
 
-        # Show full output, then scrub for logging.
-        self.sd.write_output(output_str, skip_logging=True)
-
-        output_scrubbed = [
-            l for l in output_str.splitlines() if "DATABASE_URL" not in l
-        ]
-        output_scrubbed = "\n".join(output_scrubbed)
-        self.sd.log_info(output_scrubbed)
+        # Output includes DATABASE_URL, which is scrubbed before it's logged.
+        self.sd.write_output(output_str)
 
         msg = "  Attached database to app."
         self.sd.write_output(msg)
@@ -0,0 +1,155 @@
+"""Find the Fly.io region with the lowest latency for the current user.
+
+Fly routes each request to the region named in a fly-prefer-region header, if that
+region is running the app. The liveview-counter app runs in every region, so timing a
+request to it with that header set gives a rough latency for each region.
+
+Every candidate region is probed concurrently, a few times each. The region with the
+lowest median latency wins. The result is cached for a while, because a user's nearest
+region rarely changes between runs.
+
+The network layer is a plain function, probe(url, region, timeout), so tests can
+probe a local server instead of Fly. requests is only imported when a region is
+actually probed.
+"""
+
+import json, time, statistics
+from concurrent.futures import ThreadPoolExecutor
+
+PROBE_URL = "https://liveview-counter.fly.dev/"
+DEFAULT_REGION = "sea"
+CACHE_TTL = 24 * 60 * 60
+
+
+def parse_regions(output_str):
+    """Get candidate region codes from `fly platform regions --json`.
+
+    Regions that require a paid plan are left out.
+
+    Returns:
+        List[str]
+    """
+    regions_json = json.loads(output_str)
+    return [
+        region["Code"]
+        for region in regions_json
+        if region.get("Code") and not region.get("RequiresPaidPlan")
+    ]
+
+
+def http_probe(url, region, timeout):
+    """Time a single request to url, asking Fly to serve it from region.
+
+    timeout applies to connecting, and to waiting for the response.
+
+    Returns:
+        float: Seconds taken for the request.
+        None: If the request failed, or was served from a different region.
+    """
+    # requests is slow to import, and most runs use a cached region.
+    import requests
+
+    start = time.perf_counter()
+    try:
+        r = requests.get(
+            url, headers={"fly-prefer-region": region}, timeout=(timeout, timeout)
+        )
+    except requests.RequestException:
+        return None
+    elapsed = time.perf_counter() - start
+
+    if not r.ok:
+        return None
+
+    # Fly reports the region that handled the request. If the preferred region
+    # wasn't available, this timing says nothing about that region.
+    served_region = r.headers.get("fly-region")
+    if served_region and served_region != region:
+        return None
+
+    return elapsed
+
+
+def probe_regions(
+    regions, url=PROBE_URL, probe=http_probe, samples=3, timeout=2.0, max_workers=16
+):
+    """Probe every region concurrently.
+
+    Returns:
+        dict: {region: median latency in seconds}, for each region that answered at
+        least once.
+    """
+    jobs = [region for region in regions for _ in range(samples)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda region: probe(url, region, timeout), jobs)
+
+        timings = {}
+        for region, latency in zip(jobs, results):
+            if latency is not None:
+                timings.setdefault(region, []).append(latency)
+
+    return {region: statistics.median(values) for region, values in timings.items()}
+
+
+def select_region(latencies):
+    """Pick the region with the lowest median latency.
+
+    Returns:
+        str | None: None if no region answered.
+    """
+    if not latencies:
+        return None
+    return min(latencies, key=latencies.get)
+
+
+def read_cached_region(cache_path, ttl=CACHE_TTL):
+    """Read a cached region, if one was cached less than ttl seconds ago.
+
+    Returns:
+        str | None
+    """
+    try:
+        cache_data = json.loads(cache_path.read_text())
+        region, timestamp = cache_data["region"], cache_data["timestamp"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+    if time.time() - timestamp > ttl:
+        return None
+    return region
+
+
+def write_cached_region(cache_path, region):
+    """Cache region, for later runs.
+
+    Failing to write the cache isn't worth stopping a deployment for.
+
+    Returns:
+        None
+    """
+    cache_data = {"region": region, "timestamp": time.time()}
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(cache_data))
+    except OSError:
+        pass
+
+
+def find_nearest_region(get_regions, cache_path, ttl=CACHE_TTL, **probe_kwargs):
+    """Find the nearest region, using the cache if possible.
+
+    get_regions is only called if there's no usable cached region, so the list of
+    candidate regions isn't fetched unless it's needed. probe_kwargs are passed to
+    probe_regions().
+
+    Returns:
+        tuple: (region, from_cache). region is None if no region could be probed.
+    """
+    region = read_cached_region(cache_path, ttl)
+    if region:
+        return region, True
+
+    region = select_region(probe_regions(get_regions(), **probe_kwargs))
+    if region:
+        write_cached_region(cache_path, region)
+    return region, False
@@ -70,7 +70,7 @@ def get_project_url_name():
 def check_log(tmp_proj_dir):
     """Check the log that was generated during a full deployment.
 
-    Checks that log file exists, and that DATABASE_URL is not logged.
+    Checks that log file exists, and that the value of DATABASE_URL is not logged.
     """
     path = tmp_proj_dir / "simple_deploy_logs"
     if not path.exists():
@@ -81,8 +81,11 @@ def check_log(tmp_proj_dir):
         return False
 
     log_str = log_files[0].read_text()
-    if "DATABASE_URL" in log_str:
-        return False
+    for line in log_str.splitlines():
+        if "DATABASE_URL=" in line and "*value hidden*" not in line:
+            return False
+        if "postgres://" in line and "*value hidden*" not in line:
+            return False
 
     return True
 
@@ -164,7 +164,11 @@ if os.environ.get("ON_FLYIO"):
 
     # Use the Fly.io Postgres database.
     db_url = os.environ.get("DATABASE_URL")
-    DATABASES["default"] = dj_database_url.parse(db_url)
+    DATABASES["default"] = dj_database_url.parse(
+        db_url,
+        conn_max_age=600,
+        conn_health_checks=True,
+    )
 
     # Prevent CSRF "Origin checking failed" issue.
     CSRF_TRUSTED_ORIGINS = ["https://my_blog_project.fly.dev"]
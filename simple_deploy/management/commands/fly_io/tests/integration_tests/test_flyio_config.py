@@ -110,7 +110,8 @@ def test_log_dir(tmp_project):
     # Check for exactly the log files we expect to find.
     # assert 'deployment_summary.html' in log_filenames
     # DEV: Add a regex text for a file like "simple_deploy_2022-07-09174245.log".
-    assert len(log_files) == 1  # update on friendly summary
+    assert "simple_deploy_manifest.json" in log_filenames
+    assert len(log_files) == 2  # update on friendly summary
 
     # Read log file. We can never just examine the log file directly to a reference,
     #   because it will have different timestamps.
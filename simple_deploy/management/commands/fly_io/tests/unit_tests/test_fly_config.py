@@ -0,0 +1,75 @@
+"""Unit tests for building fly.toml."""
+
+from simple_deploy.management.commands.fly_io import fly_config
+from simple_deploy.management.commands.worker_sizing import WorkerConfig
+
+
+def test_concurrency_wsgi():
+    concurrency = fly_config.get_concurrency(WorkerConfig(2, 4, "gthread"))
+    assert concurrency == fly_config.Concurrency("requests", 8, 32)
+
+
+def test_concurrency_asgi():
+    worker_config = WorkerConfig(3, 1, "uvicorn_worker.UvicornWorker")
+    concurrency = fly_config.get_concurrency(worker_config, "asgi")
+    assert concurrency == fly_config.Concurrency("connections", 150, 600)
+
+
+def test_concurrency_type_override():
+    concurrency = fly_config.get_concurrency(
+        WorkerConfig(3, 1, "sync"), concurrency_type="connections"
+    )
+    assert concurrency == fly_config.Concurrency("connections", 3, 12)
+
+
+def test_min_machines():
+    assert fly_config.get_min_machines("shared-cpu-2x") == 0
+    assert fly_config.get_min_machines("performance-2x") == 1
+    assert fly_config.get_min_machines("shared-cpu-2x", 2) == 2
+    assert fly_config.get_min_machines("performance-2x", 0) == 0
+
+
+def test_build_config():
+    config = fly_config.build_config(
+        "my-app",
+        "performance-1x",
+        WorkerConfig(2, 4, "gthread"),
+        {"WEB_CONCURRENCY": "2"},
+    )
+
+    assert config["env"] == {"PORT": "8000", "WEB_CONCURRENCY": "2"}
+    assert config["vm"] == [{"size": "performance-1x"}]
+
+    http_service = config["http_service"]
+    assert http_service["min_machines_running"] == 1
+    assert http_service["concurrency"] == {
+        "type": "requests",
+        "soft_limit": 8,
+        "hard_limit": 32,
+    }
+    assert "checks" not in http_service
+    assert config["checks"] == {
+        "app_port": {
+            "type": "tcp",
+            "port": 8000,
+            "grace_period": "1s",
+            "interval": "15s",
+            "timeout": "2s",
+            "processes": ["app"],
+        }
+    }
+
+
+def test_build_config_health_check():
+    config = fly_config.build_config(
+        "my-app",
+        "shared-cpu-1x",
+        WorkerConfig(2, 4, "gthread"),
+        {},
+        health_check_path="/healthz",
+    )
+
+    (check,) = config["http_service"]["checks"]
+    assert check["path"] == "/healthz"
+    assert check["headers"] == {"Host": "my-app.fly.dev"}
+    assert config["checks"]["app_port"]["type"] == "tcp"
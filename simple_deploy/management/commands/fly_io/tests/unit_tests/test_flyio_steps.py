@@ -0,0 +1,43 @@
+"""Unit tests for the order of Fly.io's deployment steps."""
+
+from types import SimpleNamespace
+
+from simple_deploy.management.commands import step_graph
+from simple_deploy.management.commands.fly_io.platform_deployer import (
+    PlatformDeployer,
+)
+
+
+def _get_steps():
+    """Get Fly.io's deployment steps, without running them."""
+    steps = []
+    sd_command = SimpleNamespace(
+        stdout=None,
+        step_graph=step_graph,
+        write_output=lambda output: None,
+        run_steps=steps.extend,
+    )
+    PlatformDeployer(sd_command).deploy()
+    return steps
+
+
+def _get_index(steps, name):
+    return [step.name for step in steps].index(name)
+
+
+def test_secrets_set_after_app_and_db_created():
+    steps = _get_steps()
+    dependencies = step_graph.get_dependencies(steps)
+
+    secrets_step = steps[_get_index(steps, "_set_env_vars")]
+    assert {"fly_app", "database"} <= secrets_step.requires
+    assert (
+        _get_index(steps, "_validate_platform")
+        in dependencies[_get_index(steps, "_set_env_vars")]
+    )
+
+
+def test_dockerfile_step_runs_alone():
+    """The Dockerfile step may ask before overwriting an existing Dockerfile."""
+    steps = _get_steps()
+    assert steps[_get_index(steps, "_add_dockerfile")].exclusive
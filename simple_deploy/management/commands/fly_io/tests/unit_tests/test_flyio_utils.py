@@ -0,0 +1,37 @@
+"""Unit tests for Fly.io utils."""
+
+import json
+
+import simple_deploy.management.commands.fly_io.utils as fly_utils
+
+
+def test_get_missing_secrets():
+    desired_secrets = {"ON_FLYIO": "1", "DEBUG": "FALSE"}
+
+    # No secrets set yet.
+    missing = fly_utils.get_missing_secrets(desired_secrets, "[]")
+    assert missing == desired_secrets
+
+    # Empty output is treated the same as an empty list.
+    missing = fly_utils.get_missing_secrets(desired_secrets, "")
+    assert missing == desired_secrets
+
+    # One secret already set.
+    output_str = json.dumps([{"Name": "ON_FLYIO", "Digest": "abc", "CreatedAt": ""}])
+    missing = fly_utils.get_missing_secrets(desired_secrets, output_str)
+    assert missing == {"DEBUG": "FALSE"}
+
+    # All secrets already set.
+    output_str = json.dumps([{"Name": "ON_FLYIO"}, {"Name": "DEBUG"}])
+    missing = fly_utils.get_missing_secrets(desired_secrets, output_str)
+    assert missing == {}
+
+
+def test_get_secrets_set_cmd():
+    secrets = {"ON_FLYIO": "1", "DEBUG": "FALSE"}
+
+    cmd = fly_utils.get_secrets_set_cmd("my-app", secrets)
+    assert cmd == "fly secrets set -a my-app ON_FLYIO=1 DEBUG=FALSE"
+
+    cmd = fly_utils.get_secrets_set_cmd("my-app", secrets, stage=True)
+    assert cmd == "fly secrets set -a my-app ON_FLYIO=1 DEBUG=FALSE --stage"
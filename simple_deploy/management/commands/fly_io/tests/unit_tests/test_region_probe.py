@@ -0,0 +1,123 @@
+"""Unit tests for Fly.io region probing.
+
+Probes are run against a local server that stands in for liveview-counter. The server
+answers from whichever region the client prefers, after a delay for that region.
+"""
+
+import json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import simple_deploy.management.commands.fly_io.region_probe as region_probe
+
+# Delay for each stand-in region, in seconds. Missing regions aren't served.
+REGION_DELAYS = {"fst": 0.0, "mid": 0.05, "slw": 0.15, "hng": 2.0}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        region = self.headers.get("fly-prefer-region")
+        if region not in REGION_DELAYS:
+            # Fly serves the request from some other region.
+            region = "fst"
+        time.sleep(REGION_DELAYS[region])
+
+        self.send_response(200)
+        self.send_header("fly-region", region)
+        self.end_headers()
+        self.wfile.write(b"Connected to " + region.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stand_in_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    server.block_on_close = False
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_port}/"
+
+    server.shutdown()
+    server.server_close()
+
+
+def test_parse_regions():
+    output_str = json.dumps(
+        [
+            {"Code": "ams", "Name": "Amsterdam, Netherlands"},
+            {"Code": "sea", "Name": "Seattle, Washington (US)"},
+            {"Code": "xyz", "Name": "Paid only", "RequiresPaidPlan": True},
+        ]
+    )
+    assert region_probe.parse_regions(output_str) == ["ams", "sea"]
+
+
+def test_http_probe(stand_in_url):
+    latency = region_probe.http_probe(stand_in_url, "mid", timeout=1.0)
+    assert latency >= 0.05
+
+    # Request served from a different region.
+    assert region_probe.http_probe(stand_in_url, "zzz", timeout=1.0) is None
+
+    # Request times out.
+    assert region_probe.http_probe(stand_in_url, "hng", timeout=0.2) is None
+
+
+def test_probe_regions_picks_fastest(stand_in_url):
+    start = time.monotonic()
+    latencies = region_probe.probe_regions(
+        ["slw", "mid", "fst", "hng", "zzz"], url=stand_in_url, timeout=0.5
+    )
+
+    # Probes run concurrently; sequential probes would take well over a second.
+    assert time.monotonic() - start < 1.5
+
+    assert set(latencies) == {"slw", "mid", "fst"}
+    assert region_probe.select_region(latencies) == "fst"
+
+
+def test_probe_regions_uses_median():
+    # One outlier sample shouldn't change the outcome.
+    samples = {"aaa": iter([0.01, 0.9, 0.01]), "bbb": iter([0.05, 0.05, 0.05])}
+    probe = lambda url, region, timeout: next(samples[region])
+
+    latencies = region_probe.probe_regions(["aaa", "bbb"], probe=probe, max_workers=1)
+    assert latencies == {"aaa": 0.01, "bbb": 0.05}
+
+
+def test_select_region_none_answered():
+    assert region_probe.select_region({}) is None
+
+
+def test_find_nearest_region_cached(tmp_path):
+    cache_path = tmp_path / "cache" / "fly_io_region.json"
+    probe = lambda url, region, timeout: {"aaa": 0.2, "bbb": 0.1}[region]
+    get_regions = lambda: ["aaa", "bbb"]
+
+    region, from_cache = region_probe.find_nearest_region(
+        get_regions, cache_path, probe=probe
+    )
+    assert (region, from_cache) == ("bbb", False)
+
+    # Second call uses the cache, without listing or probing regions.
+    def fail():
+        raise AssertionError("Regions should not be listed.")
+
+    region, from_cache = region_probe.find_nearest_region(fail, cache_path)
+    assert (region, from_cache) == ("bbb", True)
+
+    # An expired cache is ignored.
+    assert region_probe.read_cached_region(cache_path, ttl=-1) is None
+
+
+def test_read_cached_region_bad_file(tmp_path):
+    cache_path = tmp_path / "fly_io_region.json"
+    assert region_probe.read_cached_region(cache_path) is None
+
+    cache_path.write_text("not json")
+    assert region_probe.read_cached_region(cache_path) is None
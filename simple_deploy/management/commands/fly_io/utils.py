@@ -0,0 +1,42 @@
+"""Utilities specific to Fly.io deployments."""
+
+import json
+
+
+def get_missing_secrets(desired_secrets, output_str):
+    """Find the desired secrets that haven't been set yet.
+
+    Compares desired_secrets against the output of `fly secrets list --json`. Only
+    secret names are listed by Fly, so a secret that's already set is left alone,
+    whatever its current value.
+
+    Returns:
+        dict: {name: value} for each secret that needs to be set, in the order of
+        desired_secrets.
+    """
+    secrets_json = json.loads(output_str) if output_str.strip() else []
+    existing_names = {secret["Name"] for secret in secrets_json}
+
+    return {
+        name: value
+        for name, value in desired_secrets.items()
+        if name not in existing_names
+    }
+
+
+def get_secrets_set_cmd(app_name, secrets, stage=False):
+    """Build a single `fly secrets set` command for all of secrets.
+
+    Each `fly secrets set` call can trigger a new release, so all secrets are set in
+    one call. Passing stage=True sets the secrets without restarting any machines;
+    they take effect on the next deploy.
+
+    Returns:
+        str
+    """
+    assignments = " ".join(f"{name}={value}" for name, value in secrets.items())
+    cmd = f"fly secrets set -a {app_name} {assignments}"
+    if stage:
+        cmd += " --stage"
+
+    return cmd
@@ -0,0 +1,268 @@
+"""Inspect a project's git status, to decide whether simple_deploy can run.
+
+All of simple_deploy's changes should end up in a single commit, so the only
+uncommitted changes allowed are ones left by an earlier run of simple_deploy: an
+untracked simple_deploy_logs/ directory, and small changes to settings.py and
+.gitignore.
+
+Status comes from a single `git status --porcelain=v2 -z` call. Its NUL-delimited
+records are parsed as they're read from the pipe. Only the files that are allowed to
+change are diffed, so the cost of the check doesn't grow with the size of the
+repository, or with the size of unrelated diffs.
+
+Diff output is also checked as a stream of lines. Memory use doesn't depend on the size
+of the diff, and reading stops at the first change that rules out continuing.
+"""
+
+import shlex
+from collections import namedtuple
+from itertools import groupby
+from operator import itemgetter
+from pathlib import PurePosixPath
+
+STATUS_CMD = "git status --porcelain=v2 -z"
+
+# Names of files that simple_deploy itself modifies.
+ALLOWED_MODIFICATIONS = ("settings.py", ".gitignore")
+
+# xy is the two-character status code, in the same form as `git status --porcelain`.
+# orig_path is only set for renamed and copied files.
+StatusEntry = namedtuple("StatusEntry", ["xy", "path", "orig_path"])
+
+
+def iter_records(chunks, sep=b"\0"):
+    """Split a stream of byte chunks into sep-delimited records.
+
+    Only the current, incomplete record is held in memory.
+
+    Returns:
+        Generator[bytes]
+    """
+    remainder = b""
+    for chunk in chunks:
+        *records, remainder = (remainder + chunk).split(sep)
+        yield from records
+
+    if remainder:
+        yield remainder
+
+
+def parse_status(chunks):
+    """Parse the output of `git status --porcelain=v2 -z`, as it's read.
+
+    Header lines are ignored.
+
+    Returns:
+        Generator[StatusEntry]
+    """
+    records = iter_records(chunks)
+    for record in records:
+        record = _decode(record)
+        kind = record[:1]
+
+        if kind == "1":
+            # 1 XY sub mH mI mW hH hI path
+            fields = record.split(" ", 8)
+            yield StatusEntry(_get_xy(fields[1]), fields[8], None)
+        elif kind == "2":
+            # 2 XY sub mH mI mW hH hI Xscore path, then the original path as its own
+            # record.
+            fields = record.split(" ", 9)
+            orig_path = _decode(next(records, b""))
+            yield StatusEntry(_get_xy(fields[1]), fields[9], orig_path)
+        elif kind == "u":
+            # u XY sub m1 m2 m3 mW h1 h2 h3 path
+            fields = record.split(" ", 10)
+            yield StatusEntry(_get_xy(fields[1]), fields[10], None)
+        elif kind == "?":
+            yield StatusEntry("??", record[2:], None)
+        elif kind == "!":
+            yield StatusEntry("!!", record[2:], None)
+
+
+def parse_status_v1(status_output):
+    """Parse the output of `git status --porcelain`.
+
+    Returns:
+        Generator[StatusEntry]
+    """
+    for line in status_output.splitlines():
+        # Leading whitespace may have been stripped, so " M path" may be "M path".
+        xy, _, path = line.strip().partition(" ")
+        if not xy:
+            continue
+
+        orig_path = None
+        path = path.strip()
+        if " -> " in path:
+            orig_path, path = path.split(" -> ", 1)
+        yield StatusEntry(xy, path, orig_path)
+
+
+def format_entry(entry):
+    """Format an entry the way `git status --porcelain` shows it, for logging.
+
+    Returns:
+        str
+    """
+    if entry.orig_path:
+        return f"{entry.xy} {entry.orig_path} -> {entry.path}"
+    return f"{entry.xy} {entry.path}"
+
+
+def check_status_entries(entries):
+    """Check status entries for uncommitted changes.
+
+    Look for:
+        Untracked changes other than simple_deploy_logs/
+        Modified files beyond .gitignore and settings.py
+    Consider looking at other status codes at some point.
+
+    Stops reading entries at the first change that rules out continuing.
+
+    Returns:
+        tuple: (proceed, diff_paths). diff_paths are the modified files that need
+        their diffs checked.
+    """
+    untracked_seen = False
+    diff_paths = []
+
+    for entry in entries:
+        if entry.xy == "??":
+            if untracked_seen or "simple_deploy_logs/" not in entry.path:
+                return False, []
+            untracked_seen = True
+        elif entry.xy.strip()[:1] == "M":
+            if PurePosixPath(entry.path).name not in ALLOWED_MODIFICATIONS:
+                return False, []
+            diff_paths.append(entry.path)
+
+    return True, diff_paths
+
+
+def get_diff_cmd(paths):
+    """Get a command that diffs only paths.
+
+    Status paths are relative to the top of the repository, which isn't always the
+    directory git is run from. The :/ prefix makes git read them that way.
+
+    Returns:
+        str
+    """
+    pathspecs = " ".join(shlex.quote(f":/{path}") for path in paths)
+    return f"git diff --unified=0 -- {pathspecs}"
+
+
+def iter_lines(chunks):
+    """Split a stream of byte chunks into lines of text, as they're read.
+
+    Returns:
+        Generator[str]
+    """
+    for line in iter_records(chunks, sep=b"\n"):
+        yield line.decode("utf-8", errors="replace")
+
+
+def iter_changes(diff_lines):
+    """Yield each meaningful change in `git diff --unified=0` output.
+
+    Headers, context, and additions or deletions of blank lines are skipped.
+
+    Returns:
+        Generator[tuple]: (file header, change line). The file header is the
+        "diff --git a/... b/..." line of the file the change belongs to.
+    """
+    file_header = None
+    for line in diff_lines:
+        if line.startswith("diff "):
+            file_header = line
+        elif line[:2] in ("--", "++"):
+            # --- and +++ lines name the old and new files.
+            continue
+        elif line[:1] in ("-", "+") and line not in ("-", "+"):
+            yield file_header, line
+
+
+def check_diff_lines(diff_lines):
+    """Check git diff output, which may include several changed files.
+
+    diff_lines can be a stream of lines. Only one change is held at a time, and
+    reading stops at the first change that rules out continuing.
+
+    Returns:
+        bool: True if okay to proceed, False if not.
+    """
+    changes = iter_changes(diff_lines)
+    for file_header, file_changes in groupby(changes, key=itemgetter(0)):
+        marker = _get_allowed_change_marker(file_header)
+        lines = (line for _, line in file_changes)
+        if marker and not _check_changes(lines, marker):
+            return False
+
+    return True
+
+
+def check_diff(diff_output):
+    """Check git diff output that's already been read into a string."""
+    return check_diff_lines(diff_output.splitlines())
+
+
+def check_settings_diff(diff_lines):
+    """Look for any unexpected changes in settings.py.
+
+    Note: May want to accept a platform-specific settings block.
+    """
+    return _check_changes(clean_diff(diff_lines), "simple_deploy")
+
+
+def check_gitignore_diff(diff_lines):
+    """Look for any unexpected changes in .gitignore."""
+    return _check_changes(clean_diff(diff_lines), "simple_deploy_logs")
+
+
+def clean_diff(diff_lines):
+    """Remove unneeded info from diff output."""
+    return [line for _, line in iter_changes(diff_lines)]
+
+
+# --- Helper functions ---
+
+
+def _decode(record):
+    """Decode a path-bearing record; git doesn't guarantee paths are valid UTF-8."""
+    return record.decode("utf-8", errors="surrogateescape")
+
+
+def _get_xy(xy):
+    """Convert a v2 status code to v1 form; v2 uses "." for an unchanged side."""
+    return xy.replace(".", " ")
+
+
+def _get_allowed_change_marker(file_header):
+    """Get the text that the one allowed change to a file must contain.
+
+    Returns:
+        str | None: None if changes to the file don't need to be checked.
+    """
+    if file_header is None:
+        return None
+    if "settings.py" in file_header:
+        return "simple_deploy"
+    if ".gitignore" in file_header:
+        return "simple_deploy_logs"
+    return None
+
+
+def _check_changes(lines, marker):
+    """Allow at most one meaningful change to a file, and only if it contains marker.
+
+    Returns:
+        bool
+    """
+    seen_change = False
+    for line in lines:
+        if seen_change or marker not in line:
+            return False
+        seen_change = True
+
+    return True
@@ -59,6 +59,13 @@ In order to configure the project for deployment, we need to write a Procfile. P
 remove the current Procfile, and then run simple_deploy again.
 """
 
+poetry_export_failed = """
+Heroku doesn't support Poetry directly, so simple_deploy generates a requirements.txt
+file with `poetry export`, and that command failed. On recent versions of Poetry, the
+export command is provided by the poetry-plugin-export plugin. Make sure
+`poetry export` works in this project, and then run simple_deploy again.
+"""
+
 
 # --- Dynamic strings ---
 # These need to be generated in functions, to display information that's
@@ -11,6 +11,7 @@ from django.utils.crypto import get_random_string
 from django.utils.safestring import mark_safe
 
 from . import deploy_messages as platform_msgs
+from . import utils as heroku_utils
 
 
 class PlatformDeployer:
@@ -33,20 +34,39 @@ class PlatformDeployer:
     def deploy(self, *args, **options):
         self.sd.write_output("\nConfiguring project for deployment to Heroku...")
 
-        self._validate_platform()
-
-        self._handle_poetry()
-        self._prep_automate_all()
-        self._ensure_db()
-        self._add_requirements()
-        self._set_env_vars()
-        self._generate_procfile()
-        self._add_static_file_directory()
-        self._modify_settings()
-
-        self._conclude_automate_all()
-        self._summarize_deployment()
-        self._show_success_message()
+        # Steps run in order, except for the few that opt in to running concurrently.
+        # Steps that prompt the user, such as the Procfile and settings steps, or
+        # stream slow remote calls, such as creating the app, run on their own. Adding
+        # the database and setting config vars each trigger a release, so config vars
+        # wait for the database, and changes to the remote app are made one at a time.
+        Step = self.sd.step_graph.Step
+        steps = [
+            Step(self._validate_platform),
+            Step(self._handle_poetry, provides=["requirements"]),
+            Step(self._prep_automate_all, provides=["heroku_app"]),
+            Step(
+                self._ensure_db,
+                requires=["heroku_app"],
+                provides=["database"],
+                concurrent=True,
+            ),
+            Step(self._add_requirements, provides=["requirements"], concurrent=True),
+            Step(
+                self._set_env_vars,
+                requires=["heroku_app", "database"],
+                provides=["config_vars"],
+                concurrent=True,
+            ),
+            Step(self._generate_procfile, provides=["Procfile"]),
+            Step(
+                self._add_static_file_directory, provides=["static/"], concurrent=True
+            ),
+            Step(self._modify_settings, provides=["settings.py"]),
+            Step(self._conclude_automate_all),
+            Step(self._summarize_deployment),
+            Step(self._show_success_message),
+        ]
+        self.sd.run_steps(steps)
 
     # --- Helper methods for deploy() ---
 
@@ -101,6 +121,12 @@ class PlatformDeployer:
         output = self.sd.run_quick_command(cmd)
         self.sd.write_output(output)
 
+        # Without requirements.txt, no requirements can be added for Heroku.
+        if output.returncode:
+            raise self.sd.utils.SimpleDeployCommandError(
+                self.sd, platform_msgs.poetry_export_failed
+            )
+
         msg = "    Wrote requirements.txt file."
         self.sd.write_output(msg)
 
@@ -108,6 +134,7 @@ class PlatformDeployer:
         # requirements.txt file.
         self.sd.pkg_manager = "req_txt"
         self.sd.req_txt_path = self.sd.git_path / "requirements.txt"
+        self.sd.snapshot.invalidate(self.sd.req_txt_path)
         self.sd.log_info("    Package manager set to req_txt.")
         self.sd.log_info(f"    req_txt path: {self.sd.req_txt_path}")
 
@@ -134,6 +161,9 @@ class PlatformDeployer:
         self.sd.write_output("  Running `heroku create`...")
         cmd = "heroku create --json"
         output_obj = self.sd.run_quick_command(cmd)
+
+        # Cached app info is out of date now.
+        self.sd.cli_cache.clear()
         self.sd.write_output(output_obj)
 
         # Get name of app.
@@ -183,16 +213,20 @@ class PlatformDeployer:
         # psycopg2 2.9 causes "database connection isn't set to UTC" issue.
         #   See: https://github.com/ehmatthes/heroku-buildpack-python/issues/31
         packages = ["gunicorn", "psycopg2", "dj-database-url", "whitenoise"]
-        self.sd.add_packages(packages)
+        self.sd.add_packages(packages + self.sd.server_packages)
 
     def _set_env_vars(self):
         """Set Heroku-specific environment variables."""
         if self.sd.unit_testing:
             return
 
+        # Each helper adds to self.config_vars; all vars are then set in one call.
+        self.config_vars = {}
         self._set_heroku_env_var()
         self._set_debug_env_var()
         self._set_secret_key_env_var()
+        self._set_worker_env_vars()
+        self._apply_config_vars()
 
     def _generate_procfile(self):
         """Create Procfile, if none present.
@@ -207,7 +241,7 @@ class PlatformDeployer:
         path = self.sd.project_root / "Procfile"
         self.sd.write_output(f"\n  Looking for {path.as_posix()}...")
 
-        if path.exists():
+        if self.sd.snapshot.exists(path):
             self.sd.write_output("    Found existing Procfile.")
             proceed = self.sd.get_confirmation(self.messages.procfile_found)
             if not proceed:
@@ -218,12 +252,15 @@ class PlatformDeployer:
         # No Procfile exists, or we're free to write over existing one.
         self.sd.write_output("    Generating Procfile...")
 
-        wsgi_path = f"{self.sd.local_project_name}.wsgi"
+        # Serve the project's wsgi or asgi module, depending on --server. The ASGI
+        # worker class is always passed here, rather than only through config vars.
+        app_path = f"{self.sd.local_project_name}.{self.sd.server}"
         if self.sd.nested_project:
-            wsgi_path = f"{self.sd.local_project_name}.{wsgi_path}"
+            app_path = f"{self.sd.local_project_name}.{app_path}"
 
-        proc_command = f"web: gunicorn {wsgi_path} --log-file -"
-        path.write_text(proc_command)
+        gunicorn_args = " ".join([*self.sd.server_args, app_path])
+        proc_command = f"web: gunicorn {gunicorn_args} --log-file -"
+        self.sd.snapshot.write_text(path, proc_command)
 
         self.sd.write_output("    Generated Procfile with following process:")
         self.sd.write_output(f"      {proc_command}")
@@ -239,15 +276,14 @@ class PlatformDeployer:
             self.sd.write_output("    Found non-empty static files directory.")
             return
 
-        # If path doesn't exist, create it.
+        # If path doesn't exist, it's created when the placeholder file is written.
         if not path_static.exists():
-            path_static.mkdir()
             self.sd.write_output("    Created empty static files directory.")
 
         # Add a placeholder file to the empty static files directory.
         path_placeholder = path_static / "placeholder.txt"
         msg = "This is a placeholder file to make sure this folder is pushed to Heroku."
-        path_placeholder.write_text(msg)
+        self.sd.snapshot.write_text(path_placeholder, msg)
 
         self.sd.write_output("    Added placeholder file to static files directory.")
 
@@ -259,13 +295,27 @@ class PlatformDeployer:
         """
         self.sd.write_output("\n  Adding a Heroku-specific settings block...")
 
-        settings_string = self.sd.settings_path.read_text()
+        settings_string = self.sd.snapshot.read_text(self.sd.settings_path)
         safe_settings_string = mark_safe(settings_string)
-        context = {"current_settings": safe_settings_string}
+        db = self.sd.db_settings
+        databases_setting = db.assignment(
+            "DATABASES",
+            {
+                "default": db.database_url(
+                    "dj_database_url.config",
+                    env='"DATABASE_URL"',
+                    ssl_require="True",
+                ),
+            },
+        )
+        context = {
+            "current_settings": safe_settings_string,
+            "databases_setting": mark_safe(databases_setting),
+        }
 
         template_path = self.templates_path / "settings.py"
         self.sd.utils.write_file_from_template(
-            self.sd.settings_path, template_path, context
+            self.sd.settings_path, template_path, context, self.sd.snapshot
         )
 
         msg = f"    Modified settings.py file: {self.sd.settings_path}"
@@ -372,7 +422,7 @@ class PlatformDeployer:
 
         cmd = "heroku --version"
         try:
-            output_obj = self.sd.run_quick_command(cmd)
+            output_obj = self.sd.run_quick_command(cmd, cached=True)
         except FileNotFoundError:
             # This generates a FileNotFoundError on Linux (Ubuntu) if CLI not installed.
             raise self.sd.utils.SimpleDeployCommandError(
@@ -467,16 +517,17 @@ class PlatformDeployer:
         output = self.sd.run_quick_command(cmd)
         self.sd.write_output(output)
 
+        # Cached app info lists addons, so it's out of date now.
+        self.sd.cli_cache.clear()
+
     def _set_heroku_env_var(self):
         """Set a config var to indicate when we're in the Heroku environment.
         This is mostly used to modify settings for the deployed project.
         """
-        self.sd.write_output("  Setting Heroku environment variable...")
-        cmd = "heroku config:set ON_HEROKU=1"
-        output = self.sd.run_quick_command(cmd)
-        self.sd.write_output(output)
-        self.sd.write_output("    Set ON_HEROKU=1.")
-        self.sd.write_output("    This is used to define Heroku-specific settings.")
+        self.config_vars["ON_HEROKU"] = "1"
+        self.sd.write_output(
+            "  ON_HEROKU=1 will be used to define Heroku-specific settings."
+        )
 
     def _set_debug_env_var(self):
         """Use an env var to manage DEBUG setting, and set to False."""
@@ -489,11 +540,7 @@ class PlatformDeployer:
         #    os.environ.get('DEBUG') == 'TRUE'
         # returns the bool value True for 'TRUE', and False for 'FALSE'.
         # Taken from: https://stackoverflow.com/a/56828137/748891
-        self.sd.write_output("  Setting DEBUG env var...")
-        cmd = "heroku config:set DEBUG=FALSE"
-        output = self.sd.run_quick_command(cmd)
-        self.sd.write_output(output)
-        self.sd.write_output("    Set DEBUG config variable to FALSE.")
+        self.config_vars["DEBUG"] = "FALSE"
 
     def _set_secret_key_env_var(self):
         """Use an env var to manage the secret key."""
@@ -506,12 +553,45 @@ class PlatformDeployer:
         else:
             new_secret_key = get_random_secret_key()
 
-        # Set the new key as an env var on Heroku.
-        self.sd.write_output("  Setting new secret key for Heroku...")
-        cmd = f"heroku config:set SECRET_KEY={new_secret_key}"
+        self.config_vars["SECRET_KEY"] = new_secret_key
+        self.sd.write_output("  Generated new secret key for Heroku.")
+
+    def _set_worker_env_vars(self):
+        """Size gunicorn for the dyno type. Gunicorn reads these from the environment,
+        so the Procfile doesn't need to change."""
+        self.config_vars.update(self.sd.worker_env_vars)
+        self.sd.write_output(f"  Gunicorn will be sized for a {self.sd.vm_size} dyno.")
+
+    def _apply_config_vars(self):
+        """Set all pending config vars in a single `heroku config:set` call.
+
+        Every `heroku config:set` call creates a new release, so vars are batched.
+        Vars that are already set to the same value are skipped.
+        """
+        self.sd.write_output("  Setting Heroku config vars...")
+
+        # Don't log output of `heroku config`; it includes existing secrets.
+        cmd = "heroku config --json"
+        output_obj = self.sd.run_quick_command(cmd)
+        config_vars = heroku_utils.get_config_vars_to_set(
+            self.config_vars, output_obj.stdout.decode()
+        )
+
+        for name in self.config_vars:
+            if name not in config_vars:
+                self.sd.write_output(f"    Found {name} in existing config vars.")
+
+        if not config_vars:
+            return
+
+        # The command includes the new secret key, so it's not logged.
+        cmd = heroku_utils.get_config_set_cmd(config_vars)
+        self.sd.log_info(f"\nheroku config:set {' '.join(config_vars)}")
         output = self.sd.run_quick_command(cmd, skip_logging=True)
         self.sd.write_output(output)
-        self.sd.write_output("    Set SECRET_KEY config variable.")
+
+        for name in config_vars:
+            self.sd.write_output(f"    Set {name} config variable.")
 
     def _generate_summary(self):
         """Generate the friendly summary, which is html for now."""
@@ -11,14 +11,7 @@ if "ON_HEROKU" in os.environ:
 
     ALLOWED_HOSTS.append("*")
 
-    DATABASES = {
-        "default": dj_database_url.config(
-            env="DATABASE_URL",
-            conn_max_age=600,
-            conn_health_checks=True,
-            ssl_require=True,
-        ),
-    }
+    {{databases_setting}}
 
     STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
     STATIC_URL = "/static/"
@@ -147,9 +147,9 @@ if "ON_HEROKU" in os.environ:
     DATABASES = {
         "default": dj_database_url.config(
             env="DATABASE_URL",
+            ssl_require=True,
             conn_max_age=600,
             conn_health_checks=True,
-            ssl_require=True,
         ),
     }
 
@@ -97,7 +97,8 @@ def test_log_dir(tmp_project):
     # Check for exactly the log files we expect to find.
     assert "deployment_summary.html" in log_filenames
     # DEV: Add a regex text for a file like "simple_deploy_2022-07-09174245.log".
-    assert len(log_files) == 2
+    assert "simple_deploy_manifest.json" in log_filenames
+    assert len(log_files) == 3
 
     # Read log file.
     # DEV: Look for specific log file; not sure this log file is always the second one.
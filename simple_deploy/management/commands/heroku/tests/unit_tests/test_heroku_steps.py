@@ -0,0 +1,83 @@
+"""Unit tests for the order of Heroku's deployment steps."""
+
+from subprocess import CompletedProcess
+from types import SimpleNamespace
+
+import pytest
+
+from simple_deploy.management.commands import utils
+from simple_deploy.management.commands import step_graph
+from simple_deploy.management.commands.heroku.platform_deployer import (
+    PlatformDeployer,
+)
+
+
+def _get_steps():
+    """Get Heroku's deployment steps, without running them."""
+    steps = []
+    sd_command = SimpleNamespace(
+        stdout=None,
+        step_graph=step_graph,
+        write_output=lambda output: None,
+        run_steps=steps.extend,
+    )
+    PlatformDeployer(sd_command).deploy()
+    return steps
+
+
+def _get_index(steps, name):
+    return [step.name for step in steps].index(name)
+
+
+def test_steps_run_in_original_order():
+    steps = _get_steps()
+    assert [step.name for step in steps] == [
+        "_validate_platform",
+        "_handle_poetry",
+        "_prep_automate_all",
+        "_ensure_db",
+        "_add_requirements",
+        "_set_env_vars",
+        "_generate_procfile",
+        "_add_static_file_directory",
+        "_modify_settings",
+        "_conclude_automate_all",
+        "_summarize_deployment",
+        "_show_success_message",
+    ]
+
+
+@pytest.mark.parametrize(
+    "name", ["_prep_automate_all", "_generate_procfile", "_modify_settings"]
+)
+def test_interactive_steps_run_alone(name):
+    """These steps prompt the user, or stream output the user needs to see."""
+    steps = _get_steps()
+    assert steps[_get_index(steps, name)].exclusive
+
+
+def test_remote_changes_made_one_at_a_time():
+    """Adding the database and setting config vars each trigger a release."""
+    steps = _get_steps()
+    dependencies = step_graph.get_dependencies(steps)
+
+    db_index = _get_index(steps, "_ensure_db")
+    env_vars_index = _get_index(steps, "_set_env_vars")
+    assert db_index in dependencies[env_vars_index]
+
+
+def test_failed_poetry_export_stops_deployment():
+    """Without an exported requirements.txt, there's nothing to add requirements to."""
+    logged = []
+    sd_command = SimpleNamespace(
+        stdout=None,
+        utils=utils,
+        pkg_manager="poetry",
+        write_output=lambda output: None,
+        log_info=logged.append,
+        run_quick_command=lambda cmd: CompletedProcess(cmd, 1),
+    )
+
+    with pytest.raises(utils.SimpleDeployCommandError):
+        PlatformDeployer(sd_command)._handle_poetry()
+    assert sd_command.pkg_manager == "poetry"
@@ -0,0 +1,41 @@
+"""Unit tests for Heroku utils."""
+
+import json, shlex
+
+import simple_deploy.management.commands.heroku.utils as heroku_utils
+
+
+def test_get_config_vars_to_set():
+    desired_vars = {"ON_HEROKU": "1", "DEBUG": "FALSE", "SECRET_KEY": "new-key"}
+
+    # No vars set yet.
+    to_set = heroku_utils.get_config_vars_to_set(desired_vars, "{}")
+    assert to_set == desired_vars
+
+    # Some vars set to the same value, some to a different value.
+    output_str = json.dumps(
+        {
+            "DATABASE_URL": "postgres://...",
+            "ON_HEROKU": "1",
+            "DEBUG": "TRUE",
+            "SECRET_KEY": "old-key",
+        }
+    )
+    to_set = heroku_utils.get_config_vars_to_set(desired_vars, output_str)
+    assert to_set == {"DEBUG": "FALSE", "SECRET_KEY": "new-key"}
+
+    # Order of desired_vars is kept.
+    assert list(to_set) == ["DEBUG", "SECRET_KEY"]
+
+
+def test_get_config_set_cmd():
+    config_vars = {"ON_HEROKU": "1", "DEBUG": "FALSE"}
+    cmd = heroku_utils.get_config_set_cmd(config_vars)
+    assert cmd == "heroku config:set ON_HEROKU=1 DEBUG=FALSE"
+
+
+def test_get_config_set_cmd_quotes_values_with_spaces():
+    config_vars = {"WEB_CONCURRENCY": "2", "GUNICORN_CMD_ARGS": "--threads 4"}
+    cmd = heroku_utils.get_config_set_cmd(config_vars)
+    assert cmd == 'heroku config:set WEB_CONCURRENCY=2 GUNICORN_CMD_ARGS="--threads 4"'
+    assert shlex.split(cmd)[-1] == "GUNICORN_CMD_ARGS=--threads 4"
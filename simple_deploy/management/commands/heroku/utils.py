@@ -0,0 +1,39 @@
+"""Utilities specific to Heroku deployments."""
+
+import json
+
+
+def get_config_vars_to_set(desired_vars, output_str):
+    """Find the config vars that need to be set.
+
+    Compares desired_vars against the output of `heroku config --json`. Vars that are
+    already set to the same value are skipped.
+
+    Returns:
+        dict: {name: value} for each var that needs to be set, in the order of
+        desired_vars.
+    """
+    current_vars = json.loads(output_str) if output_str.strip() else {}
+
+    return {
+        name: value
+        for name, value in desired_vars.items()
+        if current_vars.get(name) != value
+    }
+
+
+def get_config_set_cmd(config_vars):
+    """Build a single `heroku config:set` command for all of config_vars.
+
+    Each `heroku config:set` call creates a new release, so all vars are set in one
+    call. Values with spaces are double-quoted, which works whether or not the command
+    is run through a shell.
+
+    Returns:
+        str
+    """
+    assignments = " ".join(
+        f'{name}="{value}"' if " " in value else f"{name}={value}"
+        for name, value in config_vars.items()
+    )
+    return f"heroku config:set {assignments}"
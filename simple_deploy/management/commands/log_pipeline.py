@@ -0,0 +1,155 @@
+"""Write simple_deploy's log file from a background thread.
+
+Log records are put on a queue by a QueueHandler, which never touches the disk. A
+QueueListener takes records off the queue on its own thread, and writes them through a
+buffered file handler. Streaming a long build log to the console doesn't wait on disk
+writes, and the log file isn't flushed after every line.
+
+A record can hold many lines of output. Secrets are scrubbed from the whole record in
+one pass on the writer thread, and then each line is written as its own log line.
+
+The log is flushed when the pipeline stops, when flush() is called, and at interpreter
+exit if the pipeline was never stopped.
+"""
+
+import atexit, logging, queue, threading
+from logging.handlers import QueueHandler, QueueListener
+
+LOGGER_NAME = "simple_deploy"
+LOG_FORMAT = "%(asctime)s %(levelname)s: %(message)s"
+
+
+def get_logger():
+    """Get the logger that all of simple_deploy's log records go through."""
+    return logging.getLogger(LOGGER_NAME)
+
+
+class LogPipeline:
+    """Queue log records, and write them to log_path on a background thread."""
+
+    def __init__(self, log_path, scrub=None, buffer_size=64 * 1024):
+        """Set up the pipeline. Nothing is logged until start() is called.
+
+        scrub: Callable that takes a log message and returns it with any secrets
+          removed.
+        buffer_size: Bytes of log output held in memory before they're written.
+        """
+        self.log_path = log_path
+        self._queue = queue.SimpleQueue()
+        self._queue_handler = QueueHandler(self._queue)
+
+        self._file_handler = _BufferedFileHandler(log_path, buffer_size)
+        self._file_handler.setFormatter(_LineFormatter(LOG_FORMAT))
+        if scrub:
+            self._file_handler.addFilter(_ScrubFilter(scrub))
+
+        self._listener = QueueListener(self._queue, self._file_handler)
+        self._running = False
+
+    def start(self):
+        """Start the writer thread, and send simple_deploy's log records to it.
+
+        Returns:
+            None
+        """
+        logger = get_logger()
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(self._queue_handler)
+
+        self._listener.start()
+        self._running = True
+        atexit.register(self.stop)
+
+    def flush(self, timeout=5):
+        """Wait until every record logged so far has been written to disk.
+
+        Returns:
+            bool: False if the writer didn't catch up within timeout seconds.
+        """
+        if not self._running:
+            return True
+
+        flushed = threading.Event()
+        self._queue.put(logging.makeLogRecord({"flushed": flushed}))
+        return flushed.wait(timeout)
+
+    def stop(self):
+        """Write any queued records, stop the writer thread, and close the log file.
+
+        Safe to call more than once.
+
+        Returns:
+            None
+        """
+        if not self._running:
+            return
+        self._running = False
+
+        get_logger().removeHandler(self._queue_handler)
+        self._listener.stop()
+        self._file_handler.close()
+        atexit.unregister(self.stop)
+
+
+# --- Helper classes ---
+
+
+class _BufferedFileHandler(logging.FileHandler):
+    """A FileHandler that leaves flushing to its buffer, instead of flushing every
+    record."""
+
+    def __init__(self, filename, buffer_size):
+        self.buffer_size = buffer_size
+        super().__init__(filename, encoding="utf-8", delay=True)
+
+    def handle(self, record):
+        # Flush requests from LogPipeline.flush() aren't written to the log.
+        flushed = getattr(record, "flushed", None)
+        if flushed is not None:
+            self.flush()
+            flushed.set()
+            return False
+
+        return super().handle(record)
+
+    def emit(self, record):
+        if self.stream is None:
+            self.stream = self._open()
+
+        try:
+            msg = self.format(record)
+            if msg:
+                self.stream.write(msg + self.terminator)
+        except RecursionError:
+            raise
+        except Exception:
+            self.handleError(record)
+
+    def _open(self):
+        return open(
+            self.baseFilename, self.mode, buffering=self.buffer_size, encoding="utf-8"
+        )
+
+
+class _LineFormatter(logging.Formatter):
+    """Format each line of a record's message as a separate log line."""
+
+    def format(self, record):
+        lines = record.getMessage().splitlines()
+        record.msg, record.args = "", None
+        prefix = super().format(record)
+        return "\n".join(prefix + line for line in lines)
+
+
+class _ScrubFilter(logging.Filter):
+    """Remove secrets from each record's message before it's written."""
+
+    def __init__(self, scrub):
+        super().__init__()
+        self.scrub = scrub
+
+    def filter(self, record):
+        record.msg = self.scrub(record.getMessage())
+        record.args = None
+        return True
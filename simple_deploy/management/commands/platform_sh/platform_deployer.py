@@ -39,17 +39,31 @@ class PlatformDeployer:
 
         self.sd.write_output("\nConfiguring project for deployment to Platform.sh...")
 
-        self._validate_platform()
-
-        self._prep_automate_all()
-        self._modify_settings()
-        self._add_requirements()
-        self._generate_platform_app_yaml()
-        self._make_platform_dir()
-        self._generate_services_yaml()
-
-        self._conclude_automate_all()
-        self._show_success_message()
+        # Steps run in order, except for the few that opt in to running concurrently.
+        # Creating the project streams output the user needs to see, and the settings
+        # step may prompt the user, so they run on their own.
+        Step = self.sd.step_graph.Step
+        steps = [
+            Step(self._validate_platform),
+            Step(self._prep_automate_all),
+            Step(self._modify_settings, provides=["settings.py"]),
+            Step(self._add_requirements, provides=["requirements"], concurrent=True),
+            Step(
+                self._generate_platform_app_yaml,
+                provides=[".platform.app.yaml"],
+                concurrent=True,
+            ),
+            Step(self._make_platform_dir, provides=[".platform/"], concurrent=True),
+            Step(
+                self._generate_services_yaml,
+                requires=[".platform/"],
+                provides=["services.yaml"],
+                concurrent=True,
+            ),
+            Step(self._conclude_automate_all),
+            Step(self._show_success_message),
+        ]
+        self.sd.run_steps(steps)
 
     # --- Helper methods for deploy() ---
 
@@ -121,13 +135,34 @@ class PlatformDeployer:
         """
         self.sd.write_output("\n  Adding a Platform.sh-specific settings block...")
 
-        settings_string = self.sd.settings_path.read_text()
+        settings_string = self.sd.snapshot.read_text(self.sd.settings_path)
         safe_settings_string = mark_safe(settings_string)
-        context = {"current_settings": safe_settings_string}
+        db = self.sd.db_settings
+        default_db = {
+            "ENGINE": '"django.db.backends.postgresql"',
+            "NAME": 'db_settings["path"]',
+            "USER": 'db_settings["username"]',
+            "PASSWORD": 'db_settings["password"]',
+            "HOST": 'db_settings["host"]',
+            "PORT": 'db_settings["port"]',
+        }
+        sqlite_db = {
+            "ENGINE": '"django.db.backends.sqlite3"',
+            "NAME": 'os.path.join(BASE_DIR, "db.sqlite3")',
+        }
+        databases_setting = db.assignment(
+            "DATABASES",
+            {"default": db.connection(default_db), "sqlite": sqlite_db},
+            level=2,
+        )
+        context = {
+            "current_settings": safe_settings_string,
+            "databases_setting": mark_safe(databases_setting),
+        }
 
         template_path = self.templates_path / "settings.py"
         self.sd.utils.write_file_from_template(
-            self.sd.settings_path, template_path, context
+            self.sd.settings_path, template_path, context, self.sd.snapshot
         )
 
         msg = f"    Modified settings.py file: {self.sd.settings_path}"
@@ -139,7 +174,7 @@ class PlatformDeployer:
         path = self.sd.project_root / ".platform.app.yaml"
         self.sd.write_output(f"\n  Looking for {path.as_posix()}...")
 
-        if path.exists():
+        if self.sd.snapshot.exists(path):
             self.sd.write_output("    Found existing .platform.app.yaml file.")
         else:
             # Generate file from template.
@@ -150,6 +185,9 @@ class PlatformDeployer:
             context = {
                 "project_name": self.sd.local_project_name,
                 "deployed_project_name": self.deployed_project_name,
+                "worker_env_vars": self.sd.worker_env_vars,
+                "server": self.sd.server,
+                "server_args": self.sd.server_args,
             }
 
             if self.sd.pkg_manager == "poetry":
@@ -160,7 +198,9 @@ class PlatformDeployer:
                 template_path = "platform.app.yaml"
             template_path = self.templates_path / template_path
 
-            self.sd.utils.write_file_from_template(path, template_path, context)
+            self.sd.utils.write_file_from_template(
+                path, template_path, context, self.sd.snapshot
+            )
 
             msg = f"\n    Generated {path.as_posix()}"
             self.sd.write_output(msg)
@@ -169,7 +209,7 @@ class PlatformDeployer:
     def _add_requirements(self):
         """Add requirements for Platform.sh."""
         requirements = ["platformshconfig", "gunicorn", "psycopg2"]
-        self.sd.add_packages(requirements)
+        self.sd.add_packages(requirements + self.sd.server_packages)
 
     def _make_platform_dir(self):
         """Add a .platform directory, if it doesn't already exist."""
@@ -180,7 +220,7 @@ class PlatformDeployer:
         if self.platform_dir_path.exists():
             self.sd.write_output(f"    Found {self.platform_dir_path.as_posix()}")
         else:
-            self.platform_dir_path.mkdir()
+            # The directory is created when services.yaml is written.
             self.sd.write_output(f"    Generated {self.platform_dir_path.as_posix()}")
 
     def _generate_services_yaml(self):
@@ -189,12 +229,14 @@ class PlatformDeployer:
         path = self.platform_dir_path / "services.yaml"
         self.sd.write_output(f"\n  Looking for {path.as_posix()}...")
 
-        if path.exists():
+        if self.sd.snapshot.exists(path):
             self.sd.write_output("    Found existing services.yaml file.")
         else:
             self.sd.write_output("    No services.yaml file found. Generating file...")
             template_path = self.templates_path / "services.yaml"
-            self.sd.utils.write_file_from_template(path, template_path)
+            self.sd.utils.write_file_from_template(
+                path, template_path, snapshot=self.sd.snapshot
+            )
 
             msg = f"\n    Generated {path.as_posix()}"
             self.sd.write_output(msg)
@@ -269,12 +311,18 @@ class PlatformDeployer:
         )
 
     def _validate_cli(self):
-        """Make sure the Platform.sh CLI is installed, and user is authenticated."""
-        cmd = "platform --version"
+        """Make sure the Platform.sh CLI is installed, and user is authenticated.
+
+        The version check and the auth check don't depend on each other, so they're
+        run at the same time.
+        """
+        cmds = ["platform --version", "platform auth:info --no-interaction"]
 
         # This generates a FileNotFoundError on Ubuntu if the CLI is not installed.
         try:
-            output_obj = self.sd.run_quick_command(cmd)
+            output_obj, auth_output_obj = self.sd.gather_commands(
+                cmds, cached=["platform --version"]
+            )
         except FileNotFoundError:
             raise self.sd.utils.SimpleDeployCommandError(
                 self.sd, self.messages.cli_not_installed
@@ -283,8 +331,7 @@ class PlatformDeployer:
         self.sd.log_info(output_obj)
 
         # Check that the user is authenticated.
-        cmd = "platform auth:info --no-interaction"
-        output_obj = self.sd.run_quick_command(cmd)
+        output_obj = auth_output_obj
 
         if "Authentication is required." in output_obj.stderr.decode():
             raise self.sd.utils.SimpleDeployCommandError(
@@ -21,17 +21,4 @@ if os.environ.get("PLATFORM_APPLICATION_NAME"):
 
     if not config.in_build():
         db_settings = config.credentials("database")
-        DATABASES = {
-            "default": {
-                "ENGINE": "django.db.backends.postgresql",
-                "NAME": db_settings["path"],
-                "USER": db_settings["username"],
-                "PASSWORD": db_settings["password"],
-                "HOST": db_settings["host"],
-                "PORT": db_settings["port"],
-            },
-            "sqlite": {
-                "ENGINE": "django.db.backends.sqlite3",
-                "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
-            },
-        }
+        {{databases_setting}}
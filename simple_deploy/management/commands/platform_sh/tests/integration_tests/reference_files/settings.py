@@ -162,6 +162,8 @@ if os.environ.get("PLATFORM_APPLICATION_NAME"):
                 "PASSWORD": db_settings["password"],
                 "HOST": db_settings["host"],
                 "PORT": db_settings["port"],
+                "CONN_MAX_AGE": 600,
+                "CONN_HEALTH_CHECKS": True,
             },
             "sqlite": {
                 "ENGINE": "django.db.backends.sqlite3",
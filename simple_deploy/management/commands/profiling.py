@@ -0,0 +1,107 @@
+"""Record where a run of simple_deploy spends its time.
+
+The Command class wraps each phase of handle(), the platform's deploy hook, each
+deployment step, and every command it runs in a span. Plugins can add their own spans
+through self.sd.profiler:
+
+    with self.sd.profiler.span("fly_io: create db"):
+        ...
+
+Spans are cheap when profiling is disabled, so they can stay in place for every run.
+When --profile is passed, a table of spans is shown at the end of the run, and the
+same data is written as JSON next to the log file.
+"""
+
+import json, threading, time
+from contextlib import contextmanager
+from functools import wraps
+
+
+class Profiler:
+    """Collect timed spans, from any thread."""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.spans = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        """Time the body of a with block, and record it as a span named name.
+
+        Spans can be nested; nesting is tracked per thread.
+        """
+        if not self.enabled:
+            yield
+            return
+
+        stack = self._get_stack()
+        parent = stack[-1] if stack else None
+        stack.append(name)
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+
+            span = {
+                "name": name,
+                "parent": parent,
+                "depth": len(stack),
+                "thread": threading.current_thread().name,
+                "start": round(start - self._start, 6),
+                "duration": round(duration, 6),
+            }
+            with self._lock:
+                self.spans.append(span)
+
+    def wrap(self, func, name):
+        """Return a version of func that runs inside a span."""
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    def get_report(self):
+        """Return a table of spans, slowest first.
+
+        Returns:
+            str
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["duration"], reverse=True)
+
+        lines = ["\nProfile (wall-clock seconds, slowest first):"]
+        for span in spans:
+            lines.append(f"  {span['duration']:9.3f}  {span['name']}")
+
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        """Write all spans to path as JSON, in the order they started.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+
+        data = {"spans": spans}
+        path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+
+    # --- Helper methods ---
+
+    def _get_stack(self):
+        """Return the stack of open span names for the current thread."""
+        try:
+            return self._local.stack
+        except AttributeError:
+            self._local.stack = []
+            return self._local.stack
@@ -0,0 +1,199 @@
+"""An in-memory view of the project files that simple_deploy reads and modifies.
+
+Inspecting a project and configuring it for deployment reads the same files many
+times. For example settings.py is read when checking for an existing platform-specific
+settings block, and again when that block is written. pyproject.toml is parsed to
+detect Poetry, to list requirements, to check for a deploy group, and again for every
+package that's added.
+
+The snapshot reads and parses each file once. Edits are kept in memory, and written to
+disk together by flush(), in a single FileTransaction; either every edited file is
+written, or none are. Files whose new contents match what's already on disk aren't
+rewritten, so their mtimes don't change. Edits can also be thrown away with discard().
+Anything that reads project files from disk, such as `git add`, needs to happen after
+a flush.
+
+Files generated from templates are recorded with a status of "created", "updated", or
+"unchanged", so the run can report what it generated.
+
+The snapshot is shared by deployment steps running on different threads. Individual
+calls are thread-safe; a caller doing a read-modify-write on one file should hold
+snapshot.lock for the whole sequence.
+"""
+
+import copy, os, threading
+from pathlib import Path
+
+from .transaction import FileTransaction
+from . import toml_files
+
+
+class ProjectSnapshot:
+    """Cached reads, and deferred writes, of project files."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+
+        # Text of each file that's been read or written, and the text that's on disk.
+        # None means the file doesn't exist.
+        self._texts = {}
+        self._originals = {}
+        self._tomls = {}
+        self._dirty = set()
+
+        # Status of each generated file, since the last call to pop_generated().
+        self._generated = {}
+
+    def read_text(self, path):
+        """Return the current contents of path, including unflushed edits.
+
+        Raises:
+            FileNotFoundError: If path doesn't exist, and hasn't been written.
+        """
+        key = self._get_key(path)
+        with self.lock:
+            self._load(key)
+            text = self._texts[key]
+
+        if text is None:
+            raise FileNotFoundError(f"No such file: {path}")
+        return text
+
+    def get_original_text(self, path):
+        """Return the contents of path on disk, ignoring unflushed edits.
+
+        Returns:
+            str | None: None if the file doesn't exist on disk.
+        """
+        key = self._get_key(path)
+        with self.lock:
+            self._load(key)
+            return self._originals[key]
+
+    def exists(self, path):
+        """Return True if path exists on disk, or has been written."""
+        key = self._get_key(path)
+        with self.lock:
+            if key in self._texts:
+                return self._texts[key] is not None
+        return key.exists()
+
+    def write_text(self, path, text):
+        """Record new contents for path. Nothing is written until flush()."""
+        key = self._get_key(path)
+        with self.lock:
+            self._texts[key] = text
+            self._tomls.pop(key, None)
+            self._dirty.add(key)
+
+    def load_toml(self, path):
+        """Return the parsed contents of a TOML file.
+
+        The parsed data is cached. Callers get their own copy, so they can modify it
+        and write the result back with write_text().
+        """
+        key = self._get_key(path)
+        with self.lock:
+            if key not in self._tomls:
+                self._tomls[key] = toml_files.loads(self.read_text(key))
+            return copy.deepcopy(self._tomls[key])
+
+    def invalidate(self, path):
+        """Forget cached contents of path, after it's been changed on disk.
+
+        Any unflushed edits to path are discarded.
+        """
+        key = self._get_key(path)
+        with self.lock:
+            self._texts.pop(key, None)
+            self._originals.pop(key, None)
+            self._tomls.pop(key, None)
+            self._dirty.discard(key)
+            self._generated.pop(key, None)
+
+    def flush(self):
+        """Write all edited files to disk, in a single transaction.
+
+        Returns:
+            List[Path]: Paths that were written.
+
+        Raises:
+            OSError: If the files can't be written. No files are changed.
+        """
+        with self.lock:
+            for path in self._dirty:
+                self._load(path)
+            written = sorted(
+                path
+                for path in self._dirty
+                if self._texts[path] != self._originals[path]
+            )
+
+            if written:
+                with FileTransaction(self._get_common_dir(written)) as transaction:
+                    for path in written:
+                        transaction.stage(path, self._texts[path])
+
+            # Edits stay pending until they've been committed, so a failed flush can
+            # be retried, or discarded.
+            for path in written:
+                self._originals[path] = self._texts[path]
+            self._dirty.clear()
+
+        return written
+
+    def discard(self):
+        """Throw away all edits that haven't been flushed.
+
+        Returns:
+            List[Path]: Paths whose edits were discarded.
+        """
+        with self.lock:
+            discarded = sorted(self._dirty)
+            for path in discarded:
+                self.invalidate(path)
+
+        return discarded
+
+    def record_generated(self, path, status):
+        """Record that path was generated, with a status of "created", "updated", or
+        "unchanged".
+        """
+        with self.lock:
+            self._generated[self._get_key(path)] = status
+
+    def pop_generated(self):
+        """Return, and forget, the status of each file generated since the last call.
+
+        Returns:
+            dict: {Path: status}
+        """
+        with self.lock:
+            generated, self._generated = self._generated, {}
+        return generated
+
+    # --- Helper methods ---
+
+    def _load(self, key):
+        """Read key from disk, if it hasn't been read or written yet."""
+        if key in self._originals:
+            return
+
+        try:
+            text = key.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            text = None
+
+        self._originals[key] = text
+        self._texts.setdefault(key, text)
+
+    def _get_common_dir(self, paths):
+        """Get the deepest existing directory that contains all of paths."""
+        common_dir = Path(os.path.commonpath([path.parent for path in paths]))
+        while not common_dir.exists():
+            common_dir = common_dir.parent
+        return common_dir
+
+    def _get_key(self, path):
+        """Key files by absolute path, so relative and absolute paths match."""
+        return Path(os.path.abspath(path))
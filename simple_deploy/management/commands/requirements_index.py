@@ -0,0 +1,192 @@
+"""Parse project requirements, and index them by canonical package name.
+
+Package names aren't compared as plain strings. Django and django are the same
+package, as are psycopg2_binary and psycopg2-binary. Names are normalized as described
+in PEP 503, so a package that's already listed under a different spelling isn't added
+again.
+
+Lines in a requirements file are parsed as PEP 508 requirements, which may include
+extras, version specifiers, environment markers, and direct URLs. Files included with
+-r are followed. Files included with -c only constrain versions, so the packages they
+list are recorded as constraints, not as requirements.
+"""
+
+import os, re
+from collections import namedtuple
+from pathlib import Path
+
+# A PEP 508 name, optional extras, and everything after that.
+REQ_RE = re.compile(
+    r"^(?P<name>[A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)"
+    r"\s*(?:\[(?P<extras>[^\]]*)\])?"
+    r"\s*(?P<rest>.*)$"
+)
+EGG_RE = re.compile(r"#egg=(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)")
+EDITABLE_RE = re.compile(r"^(-e|--editable)(\s+|=)")
+URL_RE = re.compile(r"^[A-Za-z][A-Za-z0-9+.-]*://")
+INCLUDE_RE = re.compile(
+    r"^(?P<option>-r|--requirement|-c|--constraint)(?:\s+|=)(?P<path>.+)$"
+)
+
+# Everything a requirement line can specify. Fields that aren't present are "".
+Requirement = namedtuple(
+    "Requirement", ["name", "extras", "specifier", "url", "marker", "line"]
+)
+
+
+def canonicalize_name(name):
+    """Normalize a package name, as described in PEP 503.
+
+    Returns:
+        str
+    """
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def parse_requirement(line):
+    """Parse a single requirement, such as `requests[socks]>=2.0; python_version>"3"`.
+
+    Editable and URL requirements are recognized by their #egg= fragment.
+
+    Returns:
+        Requirement | None: None if the line isn't a requirement.
+    """
+    line = _strip_comment(line)
+    if not line:
+        return None
+
+    if line.startswith(("-e", "--editable")):
+        return _parse_url_requirement(EDITABLE_RE.sub("", line), line)
+    if line.startswith("-"):
+        # Some other pip option, such as --index-url.
+        return None
+    if URL_RE.match(line) or line.startswith((".", "/")):
+        return _parse_url_requirement(line, line)
+
+    m = REQ_RE.match(line)
+    if not m:
+        return None
+
+    rest, _, marker = m.group("rest").partition(";")
+    url = ""
+    if rest.startswith("@"):
+        url = rest[1:].strip()
+        rest = ""
+
+    return Requirement(
+        m.group("name"),
+        (m.group("extras") or "").replace(" ", ""),
+        rest.strip(),
+        url,
+        marker.strip(),
+        line,
+    )
+
+
+def parse_req_txt(path, read_text):
+    """Parse a requirements file, following -r and -c includes.
+
+    read_text is a callable that returns the text of a file, so callers can read
+    through a ProjectSnapshot. Included files that don't exist are skipped; this isn't
+    the place to validate a project's requirements.
+
+    Returns:
+        tuple: (requirements, constraints), each a List[Requirement].
+    """
+    requirements, constraints = [], []
+    _parse_req_file(path, read_text, requirements, constraints, set(), False)
+    return requirements, constraints
+
+
+class RequirementsIndex:
+    """The set of packages a project requires, keyed by canonical name."""
+
+    def __init__(self, names=()):
+        """Index names, keeping the first spelling seen for each package."""
+        self._names = {}
+        for name in names:
+            self.add(name)
+
+    def add(self, name):
+        """Add a package. Returns False if it was already in the index."""
+        key = canonicalize_name(name)
+        if key in self._names:
+            return False
+
+        self._names[key] = name
+        return True
+
+    def get(self, name):
+        """Return the spelling of name used in the project, or None if it's missing."""
+        return self._names.get(canonicalize_name(name))
+
+    def __contains__(self, name):
+        return canonicalize_name(name) in self._names
+
+    def __iter__(self):
+        return iter(self._names.values())
+
+    def __len__(self):
+        return len(self._names)
+
+
+# --- Helper functions ---
+
+
+def _parse_req_file(path, read_text, requirements, constraints, seen, constraint):
+    """Parse one requirements file into requirements or constraints, recursively."""
+    path = Path(os.path.abspath(path))
+    if path in seen:
+        return
+    seen.add(path)
+
+    try:
+        text = read_text(path)
+    except FileNotFoundError:
+        return
+
+    for line in _join_continuations(text.splitlines()):
+        line = _strip_comment(line)
+        m = INCLUDE_RE.match(line)
+        if m:
+            include_path = path.parent / m.group("path").strip()
+            is_constraint = constraint or m.group("option") in ("-c", "--constraint")
+            _parse_req_file(
+                include_path, read_text, requirements, constraints, seen, is_constraint
+            )
+            continue
+
+        requirement = parse_requirement(line)
+        if requirement:
+            (constraints if constraint else requirements).append(requirement)
+
+
+def _parse_url_requirement(url, line):
+    """Get a requirement from a bare URL or path, if it names a package with #egg=."""
+    m = EGG_RE.search(url)
+    if not m:
+        return None
+    return Requirement(m.group("name"), "", "", url, "", line)
+
+
+def _join_continuations(lines):
+    """Join lines that end with a backslash onto the next line."""
+    current = ""
+    for line in lines:
+        if line.endswith("\\"):
+            current += line[:-1]
+            continue
+        yield current + line
+        current = ""
+
+    if current:
+        yield current
+
+
+def _strip_comment(line):
+    """Remove a comment, and surrounding whitespace, from a requirements line.
+
+    A # only starts a comment at the start of a line, or after whitespace; this keeps
+    URL fragments such as #egg=name.
+    """
+    return re.sub(r"(^|\s)#.*$", "", line).strip()
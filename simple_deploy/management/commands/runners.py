@@ -0,0 +1,224 @@
+"""Helpers for running external commands on behalf of simple_deploy.
+
+The Command class in simple_deploy.py decides what to run, and how to report it. The
+functions and classes here deal with the mechanics of running subprocesses.
+"""
+
+import re, subprocess, threading, queue, time, shlex
+from collections import deque
+
+
+class StreamedProcess:
+    """Result of a command whose output was streamed to the user.
+
+    Only a bounded tail of the combined output is kept, so long build logs don't have
+    to be held in memory in order to pull information out of them afterwards.
+    """
+
+    def __init__(self, args, returncode, tail):
+        self.args = args
+        self.returncode = returncode
+        self.tail = tail
+
+    @property
+    def tail_text(self):
+        """Return the buffered tail of the output as a single string."""
+        return "".join(self.tail)
+
+    def search_tail(self, pattern, flags=0):
+        """Search the buffered tail of the output for a regex pattern.
+
+        Returns:
+            re.Match | None
+        """
+        return re.search(pattern, self.tail_text, flags)
+
+
+def stream_command(
+    cmd_parts,
+    on_output,
+    shell=False,
+    tail_lines=200,
+    batch_lines=50,
+    flush_interval=0.1,
+):
+    """Run a command, streaming stdout and stderr as the command runs.
+
+    Each pipe is read by its own thread; lines are placed on a single queue in the
+    order they arrive, so the interleaving of stdout and stderr is preserved. The
+    calling thread takes lines off the queue and passes them to on_output() in
+    batches. A batch is sent when it reaches batch_lines lines, or when
+    flush_interval seconds have passed since the batch was started.
+
+    Returns:
+        StreamedProcess
+    """
+    tail = deque(maxlen=tail_lines)
+    lines = queue.Queue()
+
+    with subprocess.Popen(
+        cmd_parts,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=1,
+        universal_newlines=True,
+        shell=shell,
+    ) as p:
+        readers = [
+            threading.Thread(target=_read_pipe, args=(pipe, lines), daemon=True)
+            for pipe in (p.stdout, p.stderr)
+        ]
+        for reader in readers:
+            reader.start()
+
+        batch = []
+        batch_started = None
+        open_pipes = len(readers)
+        while open_pipes:
+            timeout = None
+            if batch:
+                timeout = max(0, flush_interval - (time.monotonic() - batch_started))
+
+            try:
+                line = lines.get(timeout=timeout)
+            except queue.Empty:
+                line = ""
+            else:
+                if line is None:
+                    # Sentinel from a reader; that pipe is closed.
+                    open_pipes -= 1
+                    line = ""
+
+            if line:
+                if not batch:
+                    batch_started = time.monotonic()
+                batch.append(line)
+                tail.append(line)
+
+            flush_due = batch and (
+                len(batch) >= batch_lines
+                or time.monotonic() - batch_started >= flush_interval
+            )
+            if flush_due:
+                on_output("".join(batch))
+                batch = []
+
+        if batch:
+            on_output("".join(batch))
+
+        for reader in readers:
+            reader.join()
+
+    return StreamedProcess(p.args, p.returncode, tail)
+
+
+def iter_stdout(cmd_parts, shell=False, chunk_size=64 * 1024):
+    """Run a command, yielding its stdout in chunks of bytes as they're read.
+
+    If the caller stops iterating early, the command is killed, so a caller that has
+    seen enough doesn't wait for, or buffer, the rest of the output. stderr is
+    discarded.
+
+    Returns:
+        Generator[bytes]
+    """
+    with subprocess.Popen(
+        cmd_parts, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, shell=shell
+    ) as p:
+        try:
+            yield from iter(lambda: p.stdout.read1(chunk_size), b"")
+        finally:
+            if p.poll() is None:
+                p.kill()
+
+
+async def run_command_async(cmd, use_shell=False, check=False):
+    """Run a command without blocking the event loop, and capture its output.
+
+    If use_shell is True, cmd is passed to the shell as a single string. Otherwise it's
+    split into parts, the same way run_quick_command() has always split commands.
+
+    Returns:
+        CompletedProcess
+
+    Raises:
+        CalledProcessError: If check is True and the command returns a nonzero exit
+        code.
+        FileNotFoundError: If the executable can't be found.
+    """
+    # asyncio is slow to import, and most manage.py commands never run a command.
+    import asyncio
+
+    if use_shell:
+        args = cmd
+        p = await asyncio.create_subprocess_shell(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    else:
+        args = shlex.split(cmd)
+        p = await asyncio.create_subprocess_exec(
+            *args, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+
+    try:
+        stdout, stderr = await p.communicate()
+    except asyncio.CancelledError:
+        # Don't leave the command running after whoever was waiting for it is gone.
+        if p.returncode is None:
+            p.kill()
+        await p.wait()
+        raise
+
+    if check and p.returncode:
+        raise subprocess.CalledProcessError(p.returncode, args, stdout, stderr)
+
+    return subprocess.CompletedProcess(args, p.returncode, stdout, stderr)
+
+
+async def gather_commands_async(cmds, use_shell=False, check=False):
+    """Run several independent commands at once.
+
+    If any command fails, every other command is still allowed to finish before the
+    error is raised, so no commands are left running.
+
+    Returns:
+        List[CompletedProcess]: In the same order as cmds.
+
+    Raises:
+        The exception from the first command in cmds that failed.
+    """
+    import asyncio
+
+    results = await asyncio.gather(
+        *(run_command_async(cmd, use_shell=use_shell, check=check) for cmd in cmds),
+        return_exceptions=True,
+    )
+
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+    return results
+
+
+def gather_commands(cmds, use_shell=False, check=False):
+    """Synchronous entry point for gather_commands_async().
+
+    Returns:
+        List[CompletedProcess]: In the same order as cmds.
+    """
+    import asyncio
+
+    return asyncio.run(gather_commands_async(cmds, use_shell=use_shell, check=check))
+
+
+# --- Helper functions ---
+
+
+def _read_pipe(pipe, lines):
+    """Put every line from pipe on the lines queue, then a None sentinel."""
+    try:
+        for line in pipe:
+            lines.put(line)
+    finally:
+        lines.put(None)
@@ -25,21 +25,28 @@ See the project documentation for more about this process:
     https://django-simple-deploy.readthedocs.io/en/latest/
 """
 
-import sys, os, platform, re, subprocess, logging, shlex
+import sys, os, platform, re, subprocess, threading, json, shlex
 from datetime import datetime
 from pathlib import Path
+from contextlib import closing
 from importlib import import_module
 
 from django.core.management.base import BaseCommand
 from django.conf import settings
 
-import toml
-
 from . import deploy_messages
 from . import utils
 from . import cli
-
-from simple_deploy.plugins import pm
+from . import runners
+from . import step_graph
+from . import profiling
+from . import cli_cache
+from . import project_snapshot
+from . import git_status
+from . import requirements_index
+from . import log_pipeline
+from . import worker_sizing
+from . import db_settings
 
 
 class Command(BaseCommand):
@@ -71,6 +78,22 @@ class Command(BaseCommand):
 
         # Made utils available to plugins.
         self.utils = utils
+        self.step_graph = step_graph
+
+        # Output from deployment steps running in worker threads is captured here, and
+        # replayed in step order. See run_steps().
+        self._captured = threading.local()
+
+        # Project files are read and written through this snapshot, and flushed to disk
+        # together. See project_snapshot.py.
+        self.snapshot = project_snapshot.ProjectSnapshot()
+
+        # Packages to add to the project's requirements, written in one batch per
+        # requirements file. See add_package().
+        self._pending_packages = {}
+
+        # Profiling is enabled in _parse_cli_options(), if --profile was passed.
+        self.profiler = profiling.Profiler()
 
         super().__init__()
 
@@ -112,20 +135,25 @@ class Command(BaseCommand):
             self._start_logging()
             self._log_cli_args(options)
 
-        self._validate_command()
-        self._inspect_system()
-        self._inspect_project()
-        self._add_simple_deploy_req()
-
-        # Get the platform-specific deployer module.
-        platform_module = import_module(
-            f".{self.platform}.deploy", package="simple_deploy.management.commands"
-        )
-        pm.register(platform_module, self.platform)
-        self._check_required_hooks(pm)
-
-        self._confirm_automate_all(pm)
-        pm.hook.simple_deploy_deploy(sd=self)
+        try:
+            with self.profiler.span("simple_deploy"):
+                self._run_phases()
+
+            # Changes to project files are written together, at the end of the run.
+            with self.profiler.span("flush_changes"):
+                self.flush_changes()
+        except BaseException:
+            # Leave the project as it was, so the user can fix the issue and rerun.
+            # This includes bugs, failed commands, and Ctrl-C during a prompt or a
+            # long deployment, not just SimpleDeployCommandError.
+            self.discard_changes()
+            self._flush_log()
+            raise
+        finally:
+            if self.profile:
+                self._report_profile()
+
+            self._stop_logging()
 
     # --- Methods used here, and also by platform-specific modules ---
 
@@ -143,6 +171,9 @@ class Command(BaseCommand):
         Returns:
             None
         """
+        if self._capture(self.write_output, output, write_to_console, skip_logging):
+            return
+
         output_str = self.utils.get_string_from_output(output)
 
         if write_to_console:
@@ -153,11 +184,14 @@ class Command(BaseCommand):
 
     def log_info(self, output):
         """Log output, which may be a string or CompletedProcess instance."""
+        if self._capture(self.log_info, output):
+            return
+
         if self.log_output:
             output_str = self.utils.get_string_from_output(output)
             self.utils.log_output_string(output_str)
 
-    def run_quick_command(self, cmd, check=False, skip_logging=False):
+    def run_quick_command(self, cmd, check=False, skip_logging=False, cached=False):
         """Run a command that should finish quickly.
 
         Commands that should finish quickly can be run more simply than commands that
@@ -170,6 +204,11 @@ class Command(BaseCommand):
         callers will only check stderr, or maybe the returncode; they won't need to
         involve exception handling.
 
+        Read-only commands whose output the user can't change between runs, such as
+        version checks and region lists, can pass cached=True. See cli_cache.py.
+
+        This is a thin wrapper around gather_commands(), for a single command.
+
         Returns:
             CompletedProcess
 
@@ -177,48 +216,140 @@ class Command(BaseCommand):
             CalledProcessError: If check=True is passed, will raise CPError instead of
             returning a CompletedProcess instance with an error code set.
         """
-        if not skip_logging:
-            self.log_info(f"\n{cmd}")
+        return self.gather_commands(
+            [cmd], check=check, skip_logging=skip_logging, cached=cached
+        )[0]
+
+    def gather_commands(self, cmds, check=False, skip_logging=False, cached=False):
+        """Run several quick, independent commands at the same time.
+
+        Most platform CLI calls are network round trips. When a deployer needs the
+        output of several calls that don't depend on each other, running them together
+        means waiting on the slowest call, rather than on the sum of all calls.
+
+        cached: True to cache every command's output, or a list of the commands whose
+          output should be cached.
 
-        if self.on_windows:
-            output = subprocess.run(cmd, shell=True, capture_output=True)
+        Returns:
+            List[CompletedProcess]: In the same order as cmds.
+
+        Raises:
+            CalledProcessError: If check=True is passed and any command fails.
+        """
+        # asyncio is slow to import, and isn't needed until a command is run.
+        import asyncio
+
+        return asyncio.run(
+            self.run_quick_commands_async(
+                cmds, check=check, skip_logging=skip_logging, cached=cached
+            )
+        )
+
+    async def run_quick_commands_async(
+        self, cmds, check=False, skip_logging=False, cached=False
+    ):
+        """Coroutine version of gather_commands(), for callers that are already
+        running an event loop.
+
+        Commands that aren't logged may carry secrets, so they're never cached.
+
+        Returns:
+            List[CompletedProcess]: In the same order as cmds.
+        """
+        if skip_logging or not cached:
+            cached_cmds = set()
+        elif cached is True:
+            cached_cmds = set(cmds)
         else:
-            cmd_parts = shlex.split(cmd)
-            output = subprocess.run(cmd_parts, capture_output=True, check=check)
+            cached_cmds = set(cached)
+
+        outputs = [
+            self.cli_cache.get(cmd) if cmd in cached_cmds else None for cmd in cmds
+        ]
+
+        if not skip_logging:
+            for cmd, output in zip(cmds, outputs):
+                self.log_info(f"\n{cmd}")
+                if output is not None:
+                    self.log_info("  (Using cached output.)")
+
+        cmds_to_run = [cmd for cmd, output in zip(cmds, outputs) if output is None]
+        if not cmds_to_run:
+            return outputs
+
+        with self.profiler.span(self._get_command_span_name(cmds_to_run, skip_logging)):
+            new_outputs = await runners.gather_commands_async(
+                cmds_to_run, use_shell=self.on_windows, check=check
+            )
 
-        return output
+        new_outputs = iter(new_outputs)
+        for index, output in enumerate(outputs):
+            if output is None:
+                outputs[index] = output = next(new_outputs)
+                if cmds[index] in cached_cmds:
+                    self.cli_cache.set(cmds[index], output)
 
-    def run_slow_command(self, cmd, skip_logging=False):
+        return outputs
+
+    def run_slow_command(self, cmd, skip_logging=False, tail_lines=200):
         """Run a command that may take some time.
 
         For commands that may take a while, we need to stream output to the user, rather
         than just capturing it. Otherwise, the command will appear to hang.
-        """
 
-        # DEV: This only captures stderr right now.
-        # The first call I used this for was `git push heroku`. That call writes to
-        # stderr; I believe streaming to stdout and stderr requires multithreading. The
-        # current approach seems to be working for all calls that use it.
-        #
-        # Adding a parameter stdout=subprocess.PIPE and adding a separate identical loop
-        # over p.stdout misses stderr. Maybe combine the loops with zip()? SO posts on
-        # this topic date back to Python2/3 days.
+        Both stdout and stderr are streamed, in the order they're written. Output is
+        written to the console and the log in batches, so long build logs don't pay
+        for a console write and a log call on every single line. The last tail_lines
+        lines of output are kept, so callers can pull information such as a deployed
+        URL out of the output without capturing the entire stream.
+
+        Returns:
+            StreamedProcess: Has returncode, and the tail of the combined output.
+
+        Raises:
+            CalledProcessError: If the command returns a nonzero exit code.
+        """
         if not skip_logging:
             self.log_info(f"\n{cmd}")
 
         cmd_parts = cmd.split()
-        with subprocess.Popen(
-            cmd_parts,
-            stderr=subprocess.PIPE,
-            bufsize=1,
-            universal_newlines=True,
-            shell=self.use_shell,
-        ) as p:
-            for line in p.stderr:
-                self.write_output(line, skip_logging=skip_logging)
-
-        if p.returncode != 0:
-            raise subprocess.CalledProcessError(p.returncode, p.args)
+        with self.profiler.span(self._get_command_span_name([cmd], skip_logging)):
+            streamed = runners.stream_command(
+                cmd_parts,
+                on_output=lambda output: self.write_output(
+                    output, skip_logging=skip_logging
+                ),
+                shell=self.use_shell,
+                tail_lines=tail_lines,
+            )
+
+        if streamed.returncode != 0:
+            raise subprocess.CalledProcessError(streamed.returncode, streamed.args)
+
+        return streamed
+
+    def run_steps(self, steps, max_workers=4):
+        """Run a platform's deployment steps, concurrently where it's safe to do so.
+
+        Steps are instances of step_graph.Step. Independent steps run on a thread
+        pool; output from each step is written in step order, as if the steps had
+        run one after the other.
+
+        Returns:
+            None
+
+        Raises:
+            Any exception raised by a step, after all running steps have finished.
+        """
+        for step in steps:
+            step.func = self.profiler.wrap(step.func, f"step: {step.name}")
+
+        self.step_graph.run_steps(
+            steps,
+            capture=self._run_captured,
+            replay=self._replay_output,
+            max_workers=max_workers,
+        )
 
     def get_confirmation(
         self, msg="Are you sure you want to do this?", skip_logging=False
@@ -232,6 +363,8 @@ class Command(BaseCommand):
         Returns:
             bool: True if confirmation granted, False if not granted.
         """
+        self.check_prompt_allowed()
+
         prompt = f"\n{msg} (yes|no) "
         confirmed = ""
 
@@ -266,6 +399,24 @@ class Command(BaseCommand):
                     "  Please answer yes or no.", skip_logging=skip_logging
                 )
 
+    def check_prompt_allowed(self):
+        """Make sure the user can be prompted from the current thread.
+
+        Concurrent steps run in worker threads, and their output isn't shown until
+        they finish. A prompt from one of those steps would wait for an answer to a
+        question the user can't see.
+
+        Returns:
+            None
+
+        Raises:
+            RuntimeError: If called from a concurrent step.
+        """
+        if getattr(self._captured, "records", None) is not None:
+            msg = "The user can't be prompted from a concurrent step."
+            msg += " Remove concurrent=True from the step that prompts the user."
+            raise RuntimeError(msg)
+
     def check_settings(self, platform_name, start_line, msg_found, msg_cant_overwrite):
         """Check if a platform-specific settings block already exists.
 
@@ -279,7 +430,7 @@ class Command(BaseCommand):
             SimpleDeployCommandError: If we can't overwrite existing platform-specific
             settings block.
         """
-        settings_text = self.settings_path.read_text()
+        settings_text = self.snapshot.read_text(self.settings_path)
 
         re_platform_settings = f"(.*)({start_line})(.*)"
         m = re.match(re_platform_settings, settings_text, re.DOTALL)
@@ -293,7 +444,7 @@ class Command(BaseCommand):
             raise self.utils.SimpleDeployCommandError(self, msg_cant_overwrite)
 
         # Platform-specific settings exist, but we can remove them and start fresh.
-        self.settings_path.write_text(m.group(1))
+        self.snapshot.write_text(self.settings_path, m.group(1))
 
         msg = f"  Removed existing {platform_name}-specific settings block."
         self.write_output(msg)
@@ -303,7 +454,8 @@ class Command(BaseCommand):
 
         This is a simple wrapper for add_package(), to make it easier to add multiple
         requirements at once. If you need to specify a version for a particular package,
-        use add_package().
+        use add_package(). Like add_package(), the packages are written to the
+        requirements file along with every other package added during the run.
 
         Returns:
             None
@@ -319,25 +471,87 @@ class Command(BaseCommand):
         The utility methods handle this version information correctly for the dependency
         management system in use.
 
+        Missing packages are collected, and written when changes are flushed, so each
+        requirements file is read, modified, and written once per run, however many
+        packages are added. See write_pending_packages().
+
         Returns:
             None
         """
         self.write_output(f"\nLooking for {package_name}...")
 
-        if package_name in self.requirements:
-            self.write_output(f"  Found {package_name} in requirements file.")
+        existing_name = self.requirements.get(package_name)
+        if existing_name:
+            self.write_output(f"  Found {existing_name} in requirements file.")
             return
 
         if self.pkg_manager == "pipenv":
-            self.utils.add_pipenv_pkg(self.pipfile_path, package_name, version)
+            manifest_path = self.pipfile_path
         elif self.pkg_manager == "poetry":
             self._check_poetry_deploy_group()
-            self.utils.add_poetry_pkg(self.pyprojecttoml_path, package_name, version)
+            manifest_path = self.pyprojecttoml_path
         else:
-            self.utils.add_req_txt_pkg(self.req_txt_path, package_name, version)
+            manifest_path = self.req_txt_path
+
+        with self.snapshot.lock:
+            key = (self.pkg_manager, manifest_path)
+            self._pending_packages.setdefault(key, []).append((package_name, version))
+            self.requirements.add(package_name)
 
         self.write_output(f"  Added {package_name} to requirements file.")
 
+    def write_pending_packages(self):
+        """Add all collected packages to their requirements files.
+
+        Each requirements file gets a single read-modify-write. This is called by
+        flush_changes(); deployers only need to call it directly if they need to run a
+        command that reads requirements before the end of the run.
+
+        Returns:
+            None
+        """
+        with self.snapshot.lock:
+            pending, self._pending_packages = self._pending_packages, {}
+
+            for (pkg_manager, manifest_path), packages in pending.items():
+                if pkg_manager == "pipenv":
+                    self.utils.add_pipenv_pkgs(manifest_path, packages, self.snapshot)
+                elif pkg_manager == "poetry":
+                    self.utils.add_poetry_pkgs(manifest_path, packages, self.snapshot)
+                else:
+                    self.utils.add_req_txt_pkgs(manifest_path, packages, self.snapshot)
+
+                self.log_info(f"Added {len(packages)} package(s) to {manifest_path}")
+
+    def flush_changes(self):
+        """Write all pending changes to project files to disk.
+
+        Returns:
+            None
+        """
+        # If a requirements file can't be updated, nothing is written, so the project
+        # isn't left half-configured.
+        self.write_pending_packages()
+        for path in self.snapshot.flush():
+            self.log_info(f"Wrote {path}")
+
+        generated = self.snapshot.pop_generated()
+        if generated:
+            self._report_generated_files(generated)
+
+    def discard_changes(self):
+        """Throw away all pending changes to project files.
+
+        Returns:
+            None
+        """
+        self._pending_packages = {}
+        discarded = self.snapshot.discard()
+        if discarded:
+            self.write_output("\nPending changes to project files were discarded.")
+        for path in discarded:
+            self.log_info(f"Discarded changes to {path}")
+
     def commit_changes(self):
         """Commit changes that have been made to the project.
 
@@ -348,6 +562,9 @@ class Command(BaseCommand):
 
         self.write_output("  Committing changes...")
 
+        # Make sure git sees every change that's been made.
+        self.flush_changes()
+
         cmd = "git add ."
         output = self.run_quick_command(cmd)
         self.write_output(output)
@@ -371,10 +588,61 @@ class Command(BaseCommand):
         self.deployed_project_name = options["deployed_project_name"]
         self.region = options["region"]
 
+        # Used to size gunicorn for the deployed app.
+        self.vm_size = options["vm_size"]
+        self.workload = options["workload"]
+        self.server = options["server"]
+
+        # Used to configure Fly.io's load balancing and auto-scaling.
+        self.concurrency_type = options["concurrency_type"]
+        self.min_machines = options["min_machines"]
+        self.max_machines = options["max_machines"]
+        self.health_check_path = options["health_check_path"]
+
+        # Used to configure database connections in the settings block.
+        self.conn_max_age = options["conn_max_age"]
+        self.db_health_checks = not options["no_db_health_checks"]
+
+        self.profile = options["profile"]
+        self.profiler.enabled = self.profile
+
+        self.cli_cache = cli_cache.CLICache(
+            self.utils.get_user_cache_dir() / "cli_responses",
+            cwd=Path.cwd(),
+            refresh=options["refresh_cache"],
+        )
+
         # Developer arguments.
         self.unit_testing = options["unit_testing"]
         self.e2e_testing = options["e2e_testing"]
 
+    def _run_phases(self):
+        """Run each phase of the configuration process, timing each one."""
+        with self.profiler.span("_validate_command"):
+            self._validate_command()
+        with self.profiler.span("_inspect_system"):
+            self._inspect_system()
+        with self.profiler.span("_inspect_project"):
+            self._inspect_project()
+        with self.profiler.span("_add_simple_deploy_req"):
+            self._add_simple_deploy_req()
+
+        # The plugin manager, and the platform-specific deployer module, are only
+        # imported once a deployment is underway. This keeps other manage.py commands,
+        # and `manage.py help simple_deploy`, from paying for them.
+        from simple_deploy.plugins import pm
+
+        platform_module = import_module(
+            f".{self.platform}.deploy", package="simple_deploy.management.commands"
+        )
+        pm.register(platform_module, self.platform)
+        self._check_required_hooks(pm)
+
+        with self.profiler.span("_confirm_automate_all"):
+            self._confirm_automate_all(pm)
+        with self.profiler.span("hook: simple_deploy_deploy"):
+            pm.hook.simple_deploy_deploy(sd=self)
+
     def _start_logging(self):
         """Set up for logging.
 
@@ -397,15 +665,86 @@ class Command(BaseCommand):
         timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
         log_filename = f"simple_deploy_{timestamp}.log"
         verbose_log_path = self.log_dir_path / log_filename
-        verbose_logger = logging.basicConfig(
-            level=logging.INFO,
-            filename=verbose_log_path,
-            format="%(asctime)s %(levelname)s: %(message)s",
+        self.log_path = verbose_log_path
+
+        # Log records are written on a background thread, so console output never
+        # waits on the log file.
+        self.log_pipeline = log_pipeline.LogPipeline(
+            verbose_log_path, scrub=self.utils._strip_secret_key
         )
+        self.log_pipeline.start()
 
         self.write_output("Logging run of `manage.py simple_deploy`...")
         self.write_output(f"Created {verbose_log_path}.")
 
+    def _flush_log(self):
+        """Write everything logged so far to the log file."""
+        if self.log_output:
+            self.log_pipeline.flush()
+
+    def _stop_logging(self):
+        """Write any remaining log records, and close the log file."""
+        if self.log_output:
+            self.log_pipeline.stop()
+
+    def _report_profile(self):
+        """Show the profile table, and write profile data next to the log file."""
+        self.write_output(self.profiler.get_report(), skip_logging=True)
+
+        if not self.log_output:
+            return
+
+        profile_path = self.log_path.with_name(f"{self.log_path.stem}_profile.json")
+        self.profiler.write_json(profile_path)
+        self.write_output(f"\nWrote profile data to {profile_path}.")
+
+    def _report_generated_files(self, generated):
+        """Show the status of each generated file, and update the manifest.
+
+        The manifest in the log directory holds a hash of each generated file, as of
+        the most recent run that generated it.
+
+        Returns:
+            None
+        """
+        self.write_output("\nGenerated files:")
+        for path, status in sorted(generated.items()):
+            self.write_output(f"  {status}: {self._get_project_relpath(path)}")
+
+        if not self.log_output:
+            return
+
+        manifest_path = self.log_dir_path / "simple_deploy_manifest.json"
+        try:
+            manifest = json.loads(manifest_path.read_text())
+        except (OSError, ValueError):
+            manifest = {}
+
+        timestamp = datetime.now().isoformat(timespec="seconds")
+        for path, status in generated.items():
+            manifest[self._get_project_relpath(path)] = {
+                "sha256": self.utils.get_content_hash(self.snapshot.read_text(path)),
+                "status": status,
+                "generated": timestamp,
+            }
+        manifest_path.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+
+    def _get_project_relpath(self, path):
+        """Get path relative to the project's git root, for reporting."""
+        try:
+            return Path(path).relative_to(self.git_path).as_posix()
+        except ValueError:
+            return Path(path).as_posix()
+
+    def _get_command_span_name(self, cmds, skip_logging):
+        """Name a profiling span for running cmds.
+
+        Commands that aren't logged may contain secrets, so they're not named.
+        """
+        if skip_logging:
+            return "command: (not logged)"
+        return f"command: {' & '.join(cmds)}"
+
     def _log_cli_args(self, options):
         """Log the args used for this call."""
         self.log_info(f"\nCLI args:")
@@ -444,6 +783,65 @@ class Command(BaseCommand):
             error_msg = deploy_messages.invalid_platform_msg(self.platform)
             raise self.utils.SimpleDeployCommandError(self, error_msg)
 
+        self._configure_app_server()
+        self._configure_db_settings()
+
+    def _configure_app_server(self):
+        """Make sure --vm-size is a known size, and configure gunicorn for it and for
+        --server.
+
+        Sets self.vm_size, self.worker_config, self.worker_env_vars,
+        self.server_args, and self.server_packages.
+
+        Returns:
+            None
+
+        Raises:
+            SimpleDeployCommandError: If --vm-size isn't known for the platform.
+        """
+        vm = worker_sizing.get_vm(self.platform, self.vm_size)
+        if not vm:
+            known_sizes = list(worker_sizing.VM_SIZES[self.platform])
+            error_msg = deploy_messages.invalid_vm_size_msg(
+                self.platform, self.vm_size, known_sizes
+            )
+            raise self.utils.SimpleDeployCommandError(self, error_msg)
+
+        self.vm_size = worker_sizing.get_vm_size(self.platform, self.vm_size)
+        self.worker_config = worker_sizing.get_worker_config(
+            vm, self.workload, self.server
+        )
+        self.worker_env_vars = worker_sizing.get_env_vars(self.worker_config)
+        self.server_args = worker_sizing.SERVER_ARGS[self.server]
+        self.server_packages = worker_sizing.SERVER_PACKAGES[self.server]
+
+        workers, threads, worker_class = self.worker_config
+        msg = (
+            f"  Sizing gunicorn for {self.vm_size}: {workers} {worker_class} worker(s)"
+        )
+        msg += f", {threads} thread(s) each."
+        self.write_output(msg)
+
+    def _configure_db_settings(self):
+        """Make sure --conn-max-age is valid, and set self.db_settings.
+
+        Plugins use self.db_settings to write the database settings in their
+        settings blocks.
+
+        Returns:
+            None
+
+        Raises:
+            SimpleDeployCommandError: If --conn-max-age is negative.
+        """
+        if self.conn_max_age < 0:
+            error_msg = deploy_messages.invalid_conn_max_age_msg(self.conn_max_age)
+            raise self.utils.SimpleDeployCommandError(self, error_msg)
+
+        self.db_settings = db_settings.DatabaseSettings(
+            self.conn_max_age, self.db_health_checks
+        )
+
     def _inspect_system(self):
         """Inspect the user's local system for relevant information.
 
@@ -500,6 +898,9 @@ class Command(BaseCommand):
 
         self.settings_path = self.project_root / self.local_project_name / "settings.py"
 
+        if self.server == "asgi":
+            self._check_asgi_module()
+
         # Find out which package manager is being used: req_txt, poetry, or pipenv
         self.pkg_manager = self._get_dep_man_approach()
         msg = f"Dependency management system: {self.pkg_manager}"
@@ -507,6 +908,18 @@ class Command(BaseCommand):
 
         self.requirements = self._get_current_requirements()
 
+    def _check_asgi_module(self):
+        """Make sure the project has an asgi.py file to serve, when --server asgi is
+        used.
+
+        Raises:
+            SimpleDeployCommandError: If there's no asgi.py next to settings.py.
+        """
+        asgi_path = self.settings_path.parent / "asgi.py"
+        if not self.snapshot.exists(asgi_path):
+            error_msg = deploy_messages.missing_asgi_module_msg(asgi_path)
+            raise self.utils.SimpleDeployCommandError(self, error_msg)
+
     def _find_git_dir(self):
         """Find .git/ location.
 
@@ -568,17 +981,13 @@ class Command(BaseCommand):
             self.write_output(msg)
             return
 
-        cmd = "git status --porcelain"
-        output_obj = self.run_quick_command(cmd)
-        status_output = output_obj.stdout.decode()
-        self.log_info(f"{status_output}")
-
-        cmd = "git diff --unified=0"
-        output_obj = self.run_quick_command(cmd)
-        diff_output = output_obj.stdout.decode()
-        self.log_info(f"{diff_output}\n")
+        with closing(self._read_git_status()) as entries:
+            proceed, diff_paths = git_status.check_status_entries(entries)
 
-        proceed = self.utils.check_status_output(status_output, diff_output)
+        if proceed and diff_paths:
+            # Only the files simple_deploy is allowed to modify need to be diffed.
+            with closing(self._read_git_diff(diff_paths)) as diff_lines:
+                proceed = git_status.check_diff_lines(diff_lines)
 
         if proceed:
             msg = "No uncommitted changes, other than simple_deploy work."
@@ -586,6 +995,45 @@ class Command(BaseCommand):
         else:
             self._raise_unclean_error()
 
+    def _read_git_status(self):
+        """Run `git status --porcelain=v2 -z`, yielding entries as they're read.
+
+        Each entry is logged in the format of `git status --porcelain`. If the caller
+        stops early, git is stopped as well.
+
+        Returns:
+            Generator[StatusEntry]
+        """
+        chunks = self._stream_git_output(git_status.STATUS_CMD)
+        for entry in git_status.parse_status(chunks):
+            self.log_info(git_status.format_entry(entry))
+            yield entry
+
+    def _read_git_diff(self, paths):
+        """Run `git diff --unified=0` on paths, yielding lines as they're read.
+
+        Each line is logged. If the caller stops early, git is stopped as well.
+
+        Returns:
+            Generator[str]
+        """
+        chunks = self._stream_git_output(git_status.get_diff_cmd(paths))
+        for line in git_status.iter_lines(chunks):
+            self.log_info(line)
+            yield line
+
+    def _stream_git_output(self, cmd):
+        """Run a git command, yielding its stdout in chunks of bytes.
+
+        Returns:
+            Generator[bytes]
+        """
+        self.log_info(f"\n{cmd}")
+
+        cmd_parts = cmd if self.use_shell else shlex.split(cmd)
+        with self.profiler.span(self._get_command_span_name([cmd], False)):
+            yield from runners.iter_stdout(cmd_parts, shell=self.use_shell)
+
     def _raise_unclean_error(self):
         """Raise unclean git status error."""
         error_msg = deploy_messages.unclean_git_status
@@ -602,17 +1050,17 @@ class Command(BaseCommand):
         ignore_msg = "simple_deploy_logs/\n"
 
         gitignore_path = self.git_path / ".gitignore"
-        if not gitignore_path.exists():
+        if not self.snapshot.exists(gitignore_path):
             # Make the .gitignore file, and add log directory.
-            gitignore_path.write_text(ignore_msg, encoding="utf-8")
+            self.snapshot.write_text(gitignore_path, ignore_msg)
             self.write_output("No .gitignore file found; created .gitignore.")
             self.write_output("Added simple_deploy_logs/ to .gitignore.")
         else:
             # Append log directory to .gitignore if it's not already there.
-            contents = gitignore_path.read_text()
+            contents = self.snapshot.read_text(gitignore_path)
             if "simple_deploy_logs/" not in contents:
                 contents += f"\n{ignore_msg}"
-                gitignore_path.write_text(contents)
+                self.snapshot.write_text(gitignore_path, contents)
                 self.write_output("Added simple_deploy_logs/ to .gitignore")
 
     def _get_dep_man_approach(self):
@@ -631,11 +1079,11 @@ class Command(BaseCommand):
         Raises:
             SimpleDeployCommandError: If a pkg manager can't be identified.
         """
-        if (self.git_path / "Pipfile").exists():
+        if self.snapshot.exists(self.git_path / "Pipfile"):
             return "pipenv"
         elif self._check_using_poetry():
             return "poetry"
-        elif (self.git_path / "requirements.txt").exists():
+        elif self.snapshot.exists(self.git_path / "requirements.txt"):
             return "req_txt"
 
         # Exit if we haven't found any requirements.
@@ -651,10 +1099,10 @@ class Command(BaseCommand):
             bool: True if found, False if not found.
         """
         path = self.git_path / "pyproject.toml"
-        if not path.exists():
+        if not self.snapshot.exists(path):
             return False
 
-        pptoml_data = toml.load(path)
+        pptoml_data = self.snapshot.load_toml(path)
         return "poetry" in pptoml_data.get("tool", {})
 
     def _get_current_requirements(self):
@@ -664,24 +1112,32 @@ class Command(BaseCommand):
         are needed on the remote platform. We don't need to deal with version numbers
         for most packages.
 
+        Requirements are indexed by canonical name, so a package that's listed as
+        Django, or as psycopg2_binary, is found when looking for django, or for
+        psycopg2-binary.
+
         Sets:
             self.req_txt_path
 
         Returns:
-            List[str]: List of strings, each representing a requirement.
+            RequirementsIndex
         """
         msg = "Checking current project requirements..."
         self.write_output(msg)
 
         if self.pkg_manager == "req_txt":
             self.req_txt_path = self.git_path / "requirements.txt"
-            requirements = self.utils.parse_req_txt(self.req_txt_path)
+            requirements = self.utils.parse_req_txt(self.req_txt_path, self.snapshot)
         elif self.pkg_manager == "pipenv":
             self.pipfile_path = self.git_path / "Pipfile"
-            requirements = self.utils.parse_pipfile(self.pipfile_path)
+            requirements = self.utils.parse_pipfile(self.pipfile_path, self.snapshot)
         elif self.pkg_manager == "poetry":
             self.pyprojecttoml_path = self.git_path / "pyproject.toml"
-            requirements = self.utils.parse_pyproject_toml(self.pyprojecttoml_path)
+            requirements = self.utils.parse_pyproject_toml(
+                self.pyprojecttoml_path, self.snapshot
+            )
+
+        requirements = requirements_index.RequirementsIndex(requirements)
 
         # Report findings.
         msg = "  Found existing dependencies:"
@@ -704,11 +1160,13 @@ class Command(BaseCommand):
 
     def _check_poetry_deploy_group(self):
         """Make sure a deploy group exists in pyproject.toml."""
-        pptoml_data = toml.load(self.pyprojecttoml_path)
+        pptoml_data = self.snapshot.load_toml(self.pyprojecttoml_path)
         try:
             deploy_group = pptoml_data["tool"]["poetry"]["group"]["deploy"]
         except KeyError:
-            self.utils.create_poetry_deploy_group(self.pyprojecttoml_path)
+            self.utils.create_poetry_deploy_group(
+                self.pyprojecttoml_path, self.snapshot
+            )
             msg = "    Added optional deploy group to pyproject.toml."
             self.write_output(msg)
 
@@ -741,6 +1199,42 @@ class Command(BaseCommand):
             msg = f"\nPlugin missing required hook implementation: {hook}()"
             raise self.utils.SimpleDeployCommandError(self, msg)
 
+    def _capture(self, method, *args):
+        """Capture a call to an output method, if running in a captured step.
+
+        Returns:
+            bool: True if the call was captured, False if it should proceed.
+        """
+        records = getattr(self._captured, "records", None)
+        if records is None:
+            return False
+
+        records.append((method, args))
+        return True
+
+    def _run_captured(self, func):
+        """Run func, capturing its output instead of writing it.
+
+        This runs in a worker thread; see run_steps().
+
+        Returns:
+            tuple: (list of captured output records, exception raised or None)
+        """
+        self._captured.records = records = []
+        try:
+            func()
+        except BaseException as e:
+            return records, e
+        finally:
+            self._captured.records = None
+
+        return records, None
+
+    def _replay_output(self, records):
+        """Write output that was captured while a step ran."""
+        for method, args in records:
+            method(*args)
+
     def _confirm_automate_all(self, pm):
         """Confirm the user understands what --automate-all does.
 
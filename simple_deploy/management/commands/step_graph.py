@@ -0,0 +1,145 @@
+"""Run a platform's deployment steps, concurrently where that's safe.
+
+A plugin's deploy() method is a list of steps. Many of those steps are independent;
+for example generating a Dockerfile doesn't depend on setting a remote secret. Each
+step declares the resources it requires and provides, such as "settings.py" or
+"remote_secrets". A step depends on every earlier step that it shares a resource with,
+so running the graph has the same effect as running the list in order.
+
+Steps run one at a time by default. A step that's safe to run alongside other steps
+opts in with concurrent=True. Concurrent steps that are independent run on a thread
+pool. Output from each step is captured while it runs, and replayed in step order, so
+what the user sees doesn't depend on timing.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class Step:
+    """A single step in a platform's deployment process."""
+
+    def __init__(self, func, requires=(), provides=(), concurrent=False):
+        """Describe a step.
+
+        func: Callable that does the work of this step. Called with no arguments.
+        requires: Names of resources this step reads.
+        provides: Names of resources this step creates or modifies.
+        concurrent: True if this step can run in a worker thread, alongside steps it
+          doesn't share any resources with. Concurrent steps can't prompt the user,
+          and their output isn't shown until they finish.
+        """
+        self.func = func
+        self.name = func.__name__
+        self.requires = set(requires)
+        self.provides = set(provides)
+        self.concurrent = concurrent
+
+    @property
+    def exclusive(self):
+        """Return True if this step needs to run alone, in the main thread.
+
+        Steps run alone unless they opt in to concurrency. Steps that don't declare
+        any resources can't be reasoned about, so they're run alone as well.
+        """
+        return not (self.concurrent and (self.requires or self.provides))
+
+    def depends_on(self, earlier_step):
+        """Return True if this step has to wait for earlier_step to finish."""
+        if self.exclusive or earlier_step.exclusive:
+            return True
+
+        return bool(
+            (self.requires & earlier_step.provides)
+            or (self.provides & earlier_step.provides)
+            or (self.provides & earlier_step.requires)
+        )
+
+
+def get_dependencies(steps):
+    """Find the earlier steps that each step depends on.
+
+    Returns:
+        List[set]: For each step, the indexes of the steps it has to wait for.
+    """
+    return [
+        {index for index in range(step_index) if step.depends_on(steps[index])}
+        for step_index, step in enumerate(steps)
+    ]
+
+
+def run_steps(steps, capture, replay, max_workers=4):
+    """Run steps, respecting their dependencies.
+
+    capture: Callable that runs a step's func in a worker thread. It returns a tuple
+      of (records, error), where records is the output that was captured while the
+      step ran, and error is any exception that was raised, or None.
+    replay: Callable that writes a step's captured records.
+
+    Exclusive steps run in the calling thread, without capturing output. By the time
+    an exclusive step starts, every earlier step has finished and been replayed.
+
+    If a step fails, no new steps are started. Steps that are already running are
+    allowed to finish, all captured output is replayed in step order, and then the
+    error from the earliest failing step is raised.
+
+    Returns:
+        None
+    """
+    dependencies = get_dependencies(steps)
+    pending = list(range(len(steps)))
+    finished = set()
+    records = {}
+    errors = {}
+    running = {}
+    next_to_replay = 0
+
+    def replay_finished():
+        """Replay output from finished steps, in order, up to the first gap."""
+        nonlocal next_to_replay
+        while next_to_replay in finished:
+            replay(records.pop(next_to_replay))
+            next_to_replay += 1
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while True:
+            # Start every step whose dependencies have all finished.
+            started = True
+            while started and not errors:
+                started = False
+                for index in pending:
+                    if not dependencies[index] <= finished:
+                        continue
+
+                    pending.remove(index)
+                    started = True
+
+                    step = steps[index]
+                    if step.exclusive:
+                        replay_finished()
+                        step.func()
+                        records[index] = []
+                        finished.add(index)
+                        replay_finished()
+                    else:
+                        future = executor.submit(capture, step.func)
+                        running[future] = index
+                    break
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                records[index], error = future.result()
+                finished.add(index)
+                if error is not None:
+                    errors[index] = error
+
+            replay_finished()
+
+    if errors:
+        # Steps after a failed step may have finished; show their output as well.
+        for index in sorted(records):
+            replay(records.pop(index))
+        raise errors[min(errors)]
@@ -0,0 +1,242 @@
+"""Read TOML project files quickly, and edit them without losing their formatting.
+
+Reads use the standard library's tomllib where it's available, which is much faster
+than the pure-Python toml package. On Python versions before 3.11 the tomli backport is
+used, and toml is the last resort. Backends are imported the first time a file is
+parsed, so importing this module is cheap.
+
+Parsing a file such as pyproject.toml and dumping it back out rewrites the whole file:
+comments and blank lines are dropped, and arrays and tables are reformatted. Most of
+simple_deploy's edits only add entries to a table, so those edits are made to the text
+of the file. New entries go right after the last entry in the table, and the table is
+added at the end of the file if it doesn't exist yet. Everything else in the file is
+left exactly as it was.
+
+Tables are found by their [header] lines. Callers should parse the result to make sure
+the edit took effect, and fall back to a full rewrite if it didn't; for example, if the
+table is defined inline rather than with a header.
+"""
+
+import json, re
+
+
+class TOMLDecodeError(ValueError):
+    """A TOML file couldn't be parsed, whichever backend was used."""
+
+
+# A [table] header, but not an [[array.of.tables]] header.
+HEADER_RE = re.compile(r"^\s*\[(?!\[)\s*(?P<name>[^\[\]]+?)\s*\]\s*(#.*)?$")
+ANY_HEADER_RE = re.compile(r"^\s*\[")
+BARE_KEY_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+# Set by _get_backend().
+_backend = None
+
+
+def loads(text):
+    """Parse TOML text.
+
+    Returns:
+        dict
+
+    Raises:
+        TOMLDecodeError: If text isn't valid TOML.
+    """
+    loads_func, backend_error = _get_backend()
+    try:
+        return loads_func(text)
+    except backend_error as e:
+        raise TOMLDecodeError(str(e)) from e
+
+
+def load(path):
+    """Parse a TOML file.
+
+    Returns:
+        dict
+    """
+    return loads(path.read_text(encoding="utf-8"))
+
+
+def dumps(data):
+    """Write data as TOML text.
+
+    This rewrites the whole document; prefer add_table_entries() when changing an
+    existing file.
+
+    Returns:
+        str
+    """
+    # The toml package is slow to import, and is only needed for full rewrites.
+    import toml
+
+    return toml.dumps(data)
+
+
+def format_document(data, indent="  "):
+    """Write data as TOML text, laid out the way config files are written by hand.
+
+    Unlike dumps(), the output doesn't depend on the toml package, and keeps the order
+    of data. Each table lists its own entries before its sub-tables. Dicts become
+    [tables], and lists of dicts become [[arrays.of.tables]]. Entries and sub-tables
+    are indented one level deeper than the header of the table they're in.
+
+    Returns:
+        str
+    """
+    lines = []
+    _format_table(lines, data, (), indent)
+    return "\n".join(lines).lstrip("\n") + "\n"
+
+
+def add_table_entries(text, table, entries):
+    """Add entries to a table, creating the table if it doesn't exist.
+
+    table: Dotted name of the table, such as "tool.poetry.group.deploy.dependencies".
+    entries: List of (key, value) pairs. Values are anything that can be formatted as
+      a TOML value by format_value().
+
+    Returns:
+        str: The new text of the file.
+    """
+    newline = "\r\n" if "\r\n" in text else "\n"
+    new_lines = [f"{format_key(key)} = {format_value(value)}" for key, value in entries]
+    lines = text.splitlines(keepends=True)
+
+    header_index = _find_header(lines, table)
+    if header_index is None:
+        return _append_table(text, table, new_lines, newline)
+
+    # Insert after the table's last entry; comments and blank lines at the end of the
+    # table usually belong to whatever comes next.
+    insert_index = header_index + 1
+    for index in range(header_index + 1, len(lines)):
+        line = lines[index].strip()
+        if ANY_HEADER_RE.match(line):
+            break
+        if line and not line.startswith("#"):
+            insert_index = index + 1
+
+    if not new_lines:
+        return text
+
+    if not lines[insert_index - 1].endswith(("\n", "\r")):
+        # The table's last entry is at the end of a file with no trailing newline.
+        # Keep it that way.
+        lines[insert_index - 1] += newline
+        return "".join(lines) + newline.join(new_lines)
+
+    lines[insert_index:insert_index] = [line + newline for line in new_lines]
+    return "".join(lines)
+
+
+def has_table(text, table):
+    """Return True if text has a [header] line for table."""
+    return _find_header(text.splitlines(), table) is not None
+
+
+def format_key(key):
+    """Quote a key, if it can't be written as a bare key."""
+    if BARE_KEY_RE.match(key):
+        return key
+    return format_value(key)
+
+
+def format_value(value):
+    """Format a string, bool, number, or list of those as a TOML value.
+
+    JSON's string escapes are all valid in TOML basic strings.
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(format_value(item) for item in value) + "]"
+    return json.dumps(str(value), ensure_ascii=False)
+
+
+# --- Helper functions ---
+
+
+def _format_table(lines, table, names, indent):
+    """Add the lines for table, named by names, and everything nested in it."""
+    prefix = indent * len(names)
+    subtables = []
+    for key, value in table.items():
+        if isinstance(value, dict) or _is_table_array(value):
+            subtables.append((key, value))
+        else:
+            lines.append(f"{prefix}{format_key(key)} = {format_value(value)}")
+
+    for key, value in subtables:
+        child_names = (*names, key)
+        name = ".".join(format_key(child_name) for child_name in child_names)
+        if isinstance(value, dict):
+            lines += ["", f"{prefix}[{name}]"]
+            _format_table(lines, value, child_names, indent)
+        else:
+            for item in value:
+                lines += ["", f"{prefix}[[{name}]]"]
+                _format_table(lines, item, child_names, indent)
+
+
+def _is_table_array(value):
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(item, dict) for item in value)
+    )
+
+
+def _find_header(lines, table):
+    """Get the index of the header line for table, or None if there isn't one."""
+    for index, line in enumerate(lines):
+        m = HEADER_RE.match(line)
+        if m and _normalize_table_name(m.group("name")) == table:
+            return index
+    return None
+
+
+def _normalize_table_name(name):
+    """Remove whitespace around dots, and quotes around simple keys."""
+    parts = [part.strip() for part in name.split(".")]
+    return ".".join(part.strip("\"'") for part in parts)
+
+
+def _append_table(text, table, new_lines, newline):
+    """Add a new table, with new_lines as its entries, at the end of text."""
+    if text and not text.endswith(("\n", "\r")):
+        text += newline
+    if text.strip():
+        text += newline
+
+    text += f"[{table}]{newline}"
+    text += "".join(line + newline for line in new_lines)
+    return text
+
+
+def _get_backend():
+    """Get the fastest available parser, importing it the first time it's needed.
+
+    Returns:
+        tuple: (loads function, exception raised for invalid TOML)
+    """
+    global _backend
+    if _backend is None:
+        try:
+            import tomllib
+        except ModuleNotFoundError:
+            try:
+                import tomli as tomllib
+            except ModuleNotFoundError:
+                tomllib = None
+
+        if tomllib:
+            _backend = (tomllib.loads, tomllib.TOMLDecodeError)
+        else:
+            import toml
+
+            _backend = (toml.loads, toml.TomlDecodeError)
+
+    return _backend
@@ -0,0 +1,157 @@
+"""Write a set of project files all at once, or not at all.
+
+New file contents are staged in a temporary directory, and fsynced. When the
+transaction commits, each existing file is moved aside, and the staged file is moved
+into place with os.replace(). If anything goes wrong partway through, every file that
+was already replaced is restored, and any new files and directories are removed.
+
+The staging directory is created next to the files being written, so os.replace() is
+an atomic rename on the same filesystem.
+
+Usage:
+    with FileTransaction(project_root) as transaction:
+        transaction.stage(path, text)
+        ...
+
+Leaving the with block normally commits the transaction; an exception rolls it back.
+"""
+
+import os, shutil, tempfile
+from pathlib import Path
+
+
+class FileTransaction:
+    """Stage writes to several files, then commit or roll them all back."""
+
+    def __init__(self, root):
+        """root: Directory that contains every file that will be staged."""
+        self.root = Path(root)
+        self._staging_dir = None
+
+        # (target path, staged path) for each staged write.
+        self._staged = []
+
+        # Record of changes made while committing, so they can be undone.
+        self._backups = []
+        self._new_files = []
+        self._new_dirs = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def stage(self, path, text):
+        """Write text to a staging file, to be moved to path on commit.
+
+        Returns:
+            None
+        """
+        if self._staging_dir is None:
+            self._staging_dir = Path(
+                tempfile.mkdtemp(prefix=".simple_deploy_staging_", dir=self.root)
+            )
+
+        staged_path = self._staging_dir / f"{len(self._staged)}.staged"
+        with open(staged_path, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._staged.append((Path(path), staged_path))
+
+    def commit(self):
+        """Move every staged file into place.
+
+        Returns:
+            List[Path]: Paths that were written.
+
+        Raises:
+            OSError: If a file can't be moved into place. Everything is rolled back
+            before the error is raised.
+        """
+        try:
+            for index, (path, staged_path) in enumerate(self._staged):
+                self._make_parent_dirs(path)
+
+                if path.is_dir():
+                    raise IsADirectoryError(f"Can't replace directory {path}.")
+                elif path.exists():
+                    # Keep the original file's permissions.
+                    shutil.copymode(path, staged_path)
+                    backup_path = self._staging_dir / f"{index}.backup"
+                    os.replace(path, backup_path)
+                    self._backups.append((path, backup_path))
+                else:
+                    self._new_files.append(path)
+
+                os.replace(staged_path, path)
+                _fsync_dir(path.parent)
+        except BaseException:
+            self.rollback()
+            raise
+
+        written = [path for path, _ in self._staged]
+        self._cleanup()
+        return written
+
+    def rollback(self):
+        """Undo any changes made by a partial commit, and discard staged files.
+
+        Returns:
+            None
+        """
+        for path in reversed(self._new_files):
+            if path.exists():
+                path.unlink()
+        for path, backup_path in reversed(self._backups):
+            os.replace(backup_path, path)
+        for dir_path in reversed(self._new_dirs):
+            try:
+                dir_path.rmdir()
+            except OSError:
+                pass
+
+        self._cleanup()
+
+    # --- Helper methods ---
+
+    def _make_parent_dirs(self, path):
+        """Create any missing parent directories of path, and record them."""
+        missing_dirs = []
+        parent = path.parent
+        while not parent.exists():
+            missing_dirs.append(parent)
+            parent = parent.parent
+
+        for dir_path in reversed(missing_dirs):
+            dir_path.mkdir()
+            self._new_dirs.append(dir_path)
+
+    def _cleanup(self):
+        """Remove the staging directory, and reset the transaction."""
+        if self._staging_dir is not None:
+            shutil.rmtree(self._staging_dir, ignore_errors=True)
+
+        self._staging_dir = None
+        self._staged = []
+        self._backups = []
+        self._new_files = []
+        self._new_dirs = []
+
+
+def _fsync_dir(dir_path):
+    """Make sure a rename in dir_path is on disk. Not supported on Windows."""
+    if os.name == "nt":
+        return
+
+    fd = os.open(dir_path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
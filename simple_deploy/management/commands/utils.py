@@ -4,28 +4,96 @@ Also contains resources useful to platform-specific deployment scripts.
 """
 
 from pathlib import Path
-import inspect, re, sys, subprocess, logging
+import inspect, sys, os, subprocess, threading, hashlib
 
 from django.template.engine import Engine, Context
 from django.template.utils import get_app_template_dirs
 from django.core.management.base import CommandError
 
-import toml
+from . import git_status
+from . import log_pipeline
+from . import secret_scrubber
+from . import requirements_index
+from . import toml_files
 
+# One template Engine per templates directory. See get_template().
+_template_engines = {}
+_template_engines_lock = threading.Lock()
 
-def write_file_from_template(dest_path, template_path, context=None):
+
+def write_file_from_template(dest_path, template_path, context=None, snapshot=None):
     """Write a file based on a platform-specific template.
 
     This may be a whole new file, such as a Dockerfile. Or, we may be modifying an
     existing file such as settings.py.
 
+    If a ProjectSnapshot is passed, the file is written through the snapshot, and its
+    status is recorded there. The rendered output is compared against the file that's
+    on disk. If they match, the file isn't rewritten, so its mtime doesn't change.
+
     Returns:
-    - None
+    - str: "created", "updated", or "unchanged"
     """
-    my_engine = Engine()
-    template = my_engine.from_string(template_path.read_text())
+    template = get_template(template_path)
     rendered_template = template.render(Context(context))
-    dest_path.write_text(rendered_template)
+
+    if snapshot:
+        current_text = snapshot.get_original_text(dest_path)
+    elif dest_path.exists():
+        current_text = dest_path.read_text()
+    else:
+        current_text = None
+
+    if current_text is None:
+        status = "created"
+    elif get_content_hash(current_text) == get_content_hash(rendered_template):
+        status = "unchanged"
+    else:
+        status = "updated"
+
+    if snapshot:
+        # Always write through the snapshot, in case an unflushed edit needs to be
+        # replaced. The snapshot doesn't rewrite files that match what's on disk.
+        snapshot.write_text(dest_path, rendered_template)
+        snapshot.record_generated(dest_path, status)
+    elif status != "unchanged":
+        dest_path.write_text(rendered_template)
+
+    return status
+
+
+def get_content_hash(text):
+    """Get a hash of a file's contents, for detecting changes.
+
+    Returns:
+        str
+    """
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def get_template(template_path):
+    """Get a compiled template, parsing it only the first time it's used.
+
+    Each templates directory gets its own Engine, with a cached loader. Templates are
+    read and parsed lazily, and the compiled Template is reused for every render.
+
+    Returns:
+        Template
+    """
+    templates_dir = str(template_path.parent)
+    with _template_engines_lock:
+        engine = _template_engines.get(templates_dir)
+        if engine is None:
+            loaders = [
+                (
+                    "django.template.loaders.cached.Loader",
+                    ["django.template.loaders.filesystem.Loader"],
+                )
+            ]
+            engine = Engine(dirs=[templates_dir], loaders=loaders)
+            _template_engines[templates_dir] = engine
+
+    return engine.get_template(template_path.name)
 
 
 def get_numbered_choice(sd_command, prompt, valid_choices, quit_message):
@@ -34,6 +102,7 @@ def get_numbered_choice(sd_command, prompt, valid_choices, quit_message):
     This is used, for example, to select from a number of apps that the user
     has created on a platform.
     """
+    sd_command.check_prompt_allowed()
     prompt += "\n\nYou can quit by entering q.\n"
 
     while True:
@@ -114,15 +183,64 @@ def get_string_from_output(output):
 def log_output_string(output):
     """Log output as a series of single lines, for better log parsing.
 
+    The whole output is queued as one record. The log pipeline's writer thread scrubs
+    secrets from it in a single pass, and writes each line as its own log line. See
+    log_pipeline.py.
+
     Returns:
         None
     """
-    for line in output.splitlines():
-        line = _strip_secret_key(line)
-        logging.info(line)
+    if output:
+        log_pipeline.get_logger().info(output)
+
+
+def get_user_cache_dir():
+    """Get the per-user directory where simple_deploy can cache data between runs.
+
+    Follows each OS's convention for cache files. The directory is not created here.
+
+    Returns:
+        Path
+    """
+    if sys.platform == "win32":
+        base_dir = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData/Local"
+    elif sys.platform == "darwin":
+        base_dir = Path.home() / "Library/Caches"
+    else:
+        base_dir = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+
+    return Path(base_dir) / "django-simple-deploy"
+
+
+def read_text(path, snapshot=None):
+    """Read a project file, through a ProjectSnapshot if one is passed."""
+    if snapshot:
+        return snapshot.read_text(path)
+    return path.read_text()
+
+
+def write_text(path, text, snapshot=None):
+    """Write a project file, through a ProjectSnapshot if one is passed."""
+    if snapshot:
+        snapshot.write_text(path, text)
+    else:
+        path.write_text(text)
+
+
+def write_toml(path, data, snapshot=None):
+    """Write data as a new TOML project file, through a ProjectSnapshot if one is
+    passed."""
+    write_text(path, toml_files.format_document(data), snapshot)
+
+
+def load_toml(path, snapshot=None):
+    """Parse a TOML project file, through a ProjectSnapshot if one is passed."""
+    if snapshot:
+        return snapshot.load_toml(path)
+    return toml_files.load(path)
 
 
-def parse_req_txt(path):
+def parse_req_txt(path, snapshot=None):
     """Get a list of requirements from a requirements.txt file.
 
     Parses requirements.txt file directly, rather than using a command like
@@ -131,27 +249,19 @@ def parse_req_txt(path):
     than other dependency management systems, which write to various requirements
     files whenever a package is installed.
 
+    Lines are parsed as PEP 508 requirements, and files included with -r are followed.
+    Packages from files included with -c are constraints, so they're not listed.
+
     Returns:
-        List[str]: List of strings representing each requirement.
+        List[str]: Name of each requirement, as it's written in the file.
     """
-    lines = path.read_text().splitlines()
-
-    # Remove blank lines, extra whitespace, and comments.
-    lines = [l.strip() for l in lines if l]
-    lines = [l for l in lines if l[0] != "#"]
-
-    # Parse requirements file, without including version information.
-    req_re = r"^([a-zA-Z0-9_\-]*)"
-    requirements = []
-    for line in lines:
-        m = re.search(req_re, line)
-        if m:
-            requirements.append(m.group(1))
-
-    return requirements
+    requirements, _ = requirements_index.parse_req_txt(
+        path, lambda req_path: read_text(req_path, snapshot)
+    )
+    return [requirement.name for requirement in requirements]
 
 
-def parse_pipfile(path):
+def parse_pipfile(path, snapshot=None):
     """Get a list of requirements that are already in Pipfile.
 
     Parses Pipfile, because we don't want to trust a lock file, and we need to examine
@@ -160,10 +270,10 @@ def parse_pipfile(path):
     This is a one-line utility, but having it here allows for easier testing, and makes
     it easier to expand this to manage a deploy group if appropriate.
     """
-    return toml.load(path)["packages"].keys()
+    return load_toml(path, snapshot)["packages"].keys()
 
 
-def parse_pyproject_toml(path):
+def parse_pyproject_toml(path, snapshot=None):
     """Get a list of requirements that Poetry is already tracking.
 
     Parses pyproject.toml file. It's easier to work with the output of
@@ -173,7 +283,7 @@ def parse_pyproject_toml(path):
     Returns:
         List[str]: List of strings representing each requirement.
     """
-    parsed_toml = toml.load(path)
+    parsed_toml = load_toml(path, snapshot)
 
     # For now, just examine main requirements and deploy group requirements.
     main_reqs = parsed_toml["tool"]["poetry"]["dependencies"].keys()
@@ -189,186 +299,155 @@ def parse_pyproject_toml(path):
         requirements += list(deploy_reqs)
 
     # Remove python as a requirement, as we're only interested in packages.
-    if "python" in requirements:
-        requirements.remove("python")
+    requirements = [req for req in requirements if req.lower() != "python"]
 
     return requirements
 
 
-def create_poetry_deploy_group(pptoml_path):
+def create_poetry_deploy_group(pptoml_path, snapshot=None):
     """Create a deploy group for Poetry in pyproject.toml."""
-    pptoml_data = toml.load(pptoml_path)
-
-    # Create Poetry group if needed.
-    if "group" not in pptoml_data["tool"]["poetry"]:
-        pptoml_data["tool"]["poetry"]["group"] = {}
-
     # Create optional deploy group, and deploy group dependencies.
-    pptoml_data["tool"]["poetry"]["group"]["deploy"] = {"optional": True}
-    pptoml_data["tool"]["poetry"]["group"]["deploy"]["dependencies"] = {}
+    edits = [
+        ("tool.poetry.group.deploy", [("optional", True)]),
+        ("tool.poetry.group.deploy.dependencies", []),
+    ]
 
-    pptoml_data_str = toml.dumps(pptoml_data)
-    pptoml_path.write_text(pptoml_data_str)
+    def update_data(pptoml_data):
+        groups = pptoml_data["tool"]["poetry"].setdefault("group", {})
+        groups["deploy"] = {"optional": True, "dependencies": {}}
 
+    def is_updated(pptoml_data):
+        deploy_group = pptoml_data["tool"]["poetry"].get("group", {}).get("deploy", {})
+        return "dependencies" in deploy_group
 
-def add_req_txt_pkg(req_txt_path, package, version):
-    """Add a package to requirements.txt."""
-    contents = req_txt_path.read_text()
-    pkg_string = f"\n{package + version}"
-    req_txt_path.write_text(contents + pkg_string)
+    _edit_toml_file(pptoml_path, edits, update_data, is_updated, snapshot)
 
 
-def add_poetry_pkg(pptoml_path, package, version):
-    """Add a package to poetry deploy group of pyproject.toml."""
-
-    # A method in simple_deploy may pass an empty string, which would override a
-    # default argument value of "*".
-    if not version:
-        version = "*"
-
-    pptoml_data = toml.load(pptoml_path)
-    pptoml_data["tool"]["poetry"]["group"]["deploy"]["dependencies"][package] = version
+def add_req_txt_pkg(req_txt_path, package, version, snapshot=None):
+    """Add a package to requirements.txt."""
+    add_req_txt_pkgs(req_txt_path, [(package, version)], snapshot)
 
-    pptoml_data_str = toml.dumps(pptoml_data)
-    pptoml_path.write_text(pptoml_data_str)
 
+def add_req_txt_pkgs(req_txt_path, packages, snapshot=None):
+    """Add packages to requirements.txt, in a single write.
 
-def add_pipenv_pkg(pipfile_path, package, version):
-    """Add a package to Pipfile."""
-    # A method in simple_deploy may pass an empty string, which would override a
-    # default argument value of "*".
-    if not version:
-        version = "*"
+    packages: List of (package, version) pairs. version is a pip-style specifier such
+      as "<2.9", or an empty string.
+    """
+    contents = read_text(req_txt_path, snapshot)
+    pkg_strings = [f"\n{package + version}" for package, version in packages]
+    write_text(req_txt_path, contents + "".join(pkg_strings), snapshot)
 
-    data = toml.load(pipfile_path)
-    data["packages"][package] = version
-    data_str = toml.dumps(data)
-    pipfile_path.write_text(data_str)
 
+def add_poetry_pkg(pptoml_path, package, version, snapshot=None):
+    """Add a package to poetry deploy group of pyproject.toml."""
+    add_poetry_pkgs(pptoml_path, [(package, version)], snapshot)
 
-def check_status_output(status_output, diff_output):
-    """Check output of `git status --porcelain` for uncommitted changes.
 
-    Look for:
-        Untracked changes other than simple_deploy_logs/
-        Modified files beyond .gitignore and settings.py
-    Consider looking at other status codes at some point.
+def add_poetry_pkgs(pptoml_path, packages, snapshot=None):
+    """Add packages to the poetry deploy group of pyproject.toml, in a single write.
 
-    Returns:
-        bool: True if okay to proceed, False if not.
+    The deploy group needs to exist already; see create_poetry_deploy_group().
     """
-    lines = status_output.splitlines()
-    lines = [line.strip() for line in lines]
+    packages = _get_toml_versions(packages)
+    edits = [("tool.poetry.group.deploy.dependencies", packages)]
 
-    # Process untracked changes first.
-    untracked_changes = [line for line in lines if line[0:2] == "??"]
+    def update_data(pptoml_data):
+        pptoml_data["tool"]["poetry"]["group"]["deploy"]["dependencies"].update(
+            packages
+        )
 
-    if len(untracked_changes) > 1:
-        return False
-    if (
-        len(untracked_changes) == 1
-        and "simple_deploy_logs/" not in untracked_changes[0]
-    ):
-        return False
+    def is_updated(pptoml_data):
+        deploy_group = pptoml_data["tool"]["poetry"]["group"]["deploy"]
+        return _has_packages(deploy_group["dependencies"], packages)
 
-    # Process modified files.
-    modified_files = [line.replace("M ", "") for line in lines if line[0] == "M"]
-    modified_paths = [Path(f) for f in modified_files]
-    allowed_modifications = ["settings.py", ".gitignore"]
-    # Return False if any files other than these have been modified.
-    if any([path.name not in allowed_modifications for path in modified_paths]):
-        return False
+    _edit_toml_file(pptoml_path, edits, update_data, is_updated, snapshot)
 
-    if not _check_git_diff(diff_output):
-        return False
 
-    # No reason not to continue.
-    return True
+def add_pipenv_pkg(pipfile_path, package, version, snapshot=None):
+    """Add a package to Pipfile."""
+    add_pipenv_pkgs(pipfile_path, [(package, version)], snapshot)
 
 
-# --- Helper functions ---
+def add_pipenv_pkgs(pipfile_path, packages, snapshot=None):
+    """Add packages to Pipfile, in a single write."""
+    packages = _get_toml_versions(packages)
+    edits = [("packages", packages)]
 
+    def update_data(data):
+        data["packages"].update(packages)
 
-def _strip_secret_key(line):
-    """Strip secret key value from log file lines."""
-    if "SECRET_KEY =" in line:
-        new_line = line.split("SECRET_KEY")[0]
-        new_line += "SECRET_KEY = *value hidden*"
-        return new_line
-    else:
-        return line
+    def is_updated(data):
+        return _has_packages(data["packages"], packages)
 
+    _edit_toml_file(pipfile_path, edits, update_data, is_updated, snapshot)
 
-def _check_git_diff(diff_output):
-    """Check git diff output, which may include several changed files."""
-    file_diffs = diff_output.split("\ndiff ")
-    for diff in file_diffs:
-        diff_lines = diff.split("\n")
-        if "settings.py" in diff_lines[0]:
-            if not _check_settings_diff(diff_lines):
-                return False
-        elif ".gitignore" in diff_lines[0]:
-            if not _check_gitignore_diff(diff_lines):
-                return False
-
-    return True
 
+def check_status_output(status_output, diff_output):
+    """Check output of `git status --porcelain` for uncommitted changes.
 
-def _check_settings_diff(diff_lines):
-    """Look for any unexpected changes in settings.py.
+    The Command class checks status with git_status directly; this is for callers that
+    already have the output of `git status --porcelain` and `git diff`.
 
-    Note: May want to accept a platform-specific settings block.
+    Returns:
+        bool: True if okay to proceed, False if not.
     """
-    lines = _clean_diff(diff_lines)
+    proceed, _ = git_status.check_status_entries(
+        git_status.parse_status_v1(status_output)
+    )
+    return proceed and git_status.check_diff(diff_output)
 
-    # If no meaningful changes, proceed.
-    if not lines:
-        return True
 
-    # If there's more than one change to settings, don't proceed.
-    if len(lines) > 1:
-        return False
+# --- Helper functions ---
 
-    # If the change is not adding simple_deploy, don't proceed.
-    if "simple_deploy" not in lines[0]:
-        return False
 
-    return True
+def _strip_secret_key(line):
+    """Strip secret values from log file lines. See secret_scrubber.py."""
+    return secret_scrubber.scrub(line)
 
 
-def _check_gitignore_diff(diff_lines):
-    """Look for any unexpected changes in .gitignore."""
-    lines = _clean_diff(diff_lines)
+# Diff checks live in git_status.py; these names are kept for existing callers.
+_check_git_diff = git_status.check_diff
+_check_settings_diff = git_status.check_settings_diff
+_check_gitignore_diff = git_status.check_gitignore_diff
+_clean_diff = git_status.clean_diff
 
-    # If no meaningful changes, proceed.
-    if not lines:
-        return True
 
-    # If there's more than one change to .gitignore, don't proceed.
-    if len(lines) > 1:
-        return False
+def _get_toml_versions(packages):
+    """Use "*" for packages with no version, as Poetry and Pipenv expect.
+
+    A method in simple_deploy may pass an empty string for version.
+    """
+    return [(package, version or "*") for package, version in packages]
 
-    # If the change is not adding simple_deploy, don't proceed.
-    if "simple_deploy_logs" not in lines[0]:
-        return False
 
-    return True
+def _has_packages(dependencies, packages):
+    """Check that every package is listed in dependencies, with its version."""
+    return all(dependencies.get(package) == version for package, version in packages)
 
 
-def _clean_diff(diff_lines):
-    """Remove unneeded info from diff output."""
-    # Get rid of blank lines. Most likely a newline at end of output.
-    lines = [l for l in diff_lines if l]
+def _edit_toml_file(path, edits, update_data, is_updated, snapshot=None):
+    """Add entries to tables in a TOML file, keeping the file's formatting.
 
-    # Get rid of lines that start with --- or +++
-    # Also, get rid of line starting with -- from split() removing first occurrence of
-    # "diff".
-    lines = [l for l in lines if l[:2] not in ("--", "++")]
+    edits: List of (table, entries) pairs, passed to toml_files.add_table_entries().
+    update_data: Makes the same change to parsed data. This is only used if editing
+      the text didn't work, for example because a table is defined inline. The file
+      is then rewritten with toml_files.dumps().
+    is_updated: Checks parsed data for the change.
+    """
+    text = read_text(path, snapshot)
+    new_text = text
+    for table, entries in edits:
+        new_text = toml_files.add_table_entries(new_text, table, entries)
 
-    # Only keep lines indicating changes.
-    lines = [l for l in lines if l[0] in ("-", "+")]
+    try:
+        edited = is_updated(toml_files.loads(new_text))
+    except (toml_files.TOMLDecodeError, KeyError, TypeError):
+        edited = False
 
-    # Ignore additions or deletions of blank lines.
-    lines = [l for l in lines if l not in ("-", "+")]
+    if not edited:
+        data = toml_files.loads(text)
+        update_data(data)
+        new_text = toml_files.dumps(data)
 
-    return lines
+    write_text(path, new_text, snapshot)
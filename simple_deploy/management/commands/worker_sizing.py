@@ -0,0 +1,152 @@
+"""Size gunicorn's workers and threads for the machine a project will run on.
+
+Each platform describes its machines differently: Fly.io has VM sizes, Heroku has dyno
+types, and Platform.sh has container sizes. Each size is mapped to an approximate
+number of CPUs and amount of memory, and gunicorn's settings are derived from those.
+
+The workload hint says whether requests mostly wait on IO, such as database queries,
+or mostly use the CPU:
+- IO-bound apps get one worker per CPU plus one, and several threads per worker.
+  Threads waiting on the database don't hold up other requests.
+- CPU-bound apps get the usual 2 * CPUs + 1 sync workers, one request at a time each.
+
+Projects served through ASGI use uvicorn's gunicorn worker class instead. Each worker
+runs an event loop that handles many connections at once, so there's one thread per
+worker, and the worker count follows the workload in the same way.
+
+Either way, the number of workers is capped by memory. Each worker is a full copy of
+the Django app, so small VMs can't run many of them.
+
+Workers and threads are passed to gunicorn through the environment, rather than on the
+command line. Gunicorn reads WEB_CONCURRENCY as its default worker count, and
+GUNICORN_CMD_ARGS for any other settings. Users can tune a deployment by changing env
+vars instead of regenerating files. Gunicorn switches sync workers to gthread workers
+when there's more than one thread, so the worker class isn't needed for WSGI apps.
+
+The ASGI worker class goes on the start command instead. A sync worker can't serve an
+ASGI app at all, so it can't depend on an env var that may not be set, such as when an
+existing fly.toml is kept, or when a user sets their own GUNICORN_CMD_ARGS.
+"""
+
+import math
+from collections import namedtuple
+
+# Approximate resources of a machine. cpus may be fractional for shared containers.
+VM = namedtuple("VM", ["cpus", "memory_mb"])
+
+WorkerConfig = namedtuple("WorkerConfig", ["workers", "threads", "worker_class"])
+
+WORKLOADS = ("io", "cpu")
+SERVERS = ("wsgi", "asgi")
+
+# Worker class for ASGI apps. uvicorn.workers is deprecated in favor of the separate
+# uvicorn-worker package.
+ASGI_WORKER_CLASS = "uvicorn_worker.UvicornWorker"
+
+# Arguments each server needs on gunicorn's start command.
+SERVER_ARGS = {
+    "wsgi": [],
+    "asgi": ["-k", ASGI_WORKER_CLASS],
+}
+
+# Packages each server needs, besides gunicorn.
+SERVER_PACKAGES = {
+    "wsgi": [],
+    "asgi": ["uvicorn-worker"],
+}
+
+# Threads per worker for IO-bound apps.
+IO_THREADS = 4
+
+# Memory each worker is expected to use, and memory left for everything else.
+MEMORY_PER_WORKER_MB = 96
+RESERVED_MEMORY_MB = 64
+
+VM_SIZES = {
+    "fly_io": {
+        "shared-cpu-1x": VM(1, 256),
+        "shared-cpu-2x": VM(2, 512),
+        "shared-cpu-4x": VM(4, 1024),
+        "shared-cpu-8x": VM(8, 2048),
+        "performance-1x": VM(1, 2048),
+        "performance-2x": VM(2, 4096),
+        "performance-4x": VM(4, 8192),
+        "performance-8x": VM(8, 16384),
+        "performance-16x": VM(16, 32768),
+    },
+    "heroku": {
+        "eco": VM(1, 512),
+        "basic": VM(1, 512),
+        "standard-1x": VM(1, 512),
+        "standard-2x": VM(2, 1024),
+        "performance-m": VM(2, 2560),
+        "performance-l": VM(8, 14336),
+    },
+    # Platform.sh's BALANCED container profile.
+    "platform_sh": {
+        "S": VM(0.4, 128),
+        "M": VM(0.4, 288),
+        "L": VM(1.2, 704),
+        "XL": VM(2.5, 1472),
+        "2XL": VM(5, 3008),
+        "4XL": VM(10, 6080),
+    },
+}
+
+# Sizes assumed when --vm-size isn't passed.
+DEFAULT_VM_SIZES = {
+    "fly_io": "shared-cpu-1x",
+    "heroku": "basic",
+    "platform_sh": "M",
+}
+
+
+def get_vm_size(platform, vm_size=""):
+    """Get the VM size to plan for, using the platform's default if none was given.
+
+    Returns:
+        str
+    """
+    return vm_size or DEFAULT_VM_SIZES[platform]
+
+
+def get_vm(platform, vm_size=""):
+    """Get the resources of a machine on platform.
+
+    Returns:
+        VM | None: None if vm_size isn't a known size for platform.
+    """
+    return VM_SIZES[platform].get(get_vm_size(platform, vm_size))
+
+
+def get_worker_config(vm, workload="io", server="wsgi"):
+    """Derive gunicorn's workers, threads, and worker class for vm.
+
+    Returns:
+        WorkerConfig
+    """
+    cpus = max(1, math.ceil(vm.cpus))
+    if workload == "cpu":
+        workers, threads, worker_class = 2 * cpus + 1, 1, "sync"
+    else:
+        workers, threads, worker_class = cpus + 1, IO_THREADS, "gthread"
+
+    if server == "asgi":
+        threads, worker_class = 1, ASGI_WORKER_CLASS
+
+    max_workers = (vm.memory_mb - RESERVED_MEMORY_MB) // MEMORY_PER_WORKER_MB
+    workers = max(1, min(workers, max_workers))
+
+    return WorkerConfig(workers, threads, worker_class)
+
+
+def get_env_vars(worker_config):
+    """Get the env vars that pass worker_config to gunicorn.
+
+    Returns:
+        dict: {name: value}
+    """
+    return {
+        "WEB_CONCURRENCY": str(worker_config.workers),
+        "GUNICORN_CMD_ARGS": f"--threads {worker_config.threads}",
+    }
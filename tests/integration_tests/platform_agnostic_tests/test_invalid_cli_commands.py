@@ -73,3 +73,35 @@ def test_invalid_platform_call_automate_all(tmp_project):
         'The platform "unsupported_platform_name" is not currently supported.' in stderr
     )
     check_project_unchanged(tmp_project)
+
+
+def test_invalid_vm_size_call(tmp_project):
+    """Call simple_deploy with a --vm-size that isn't known for the platform."""
+    invalid_sd_command = (
+        "python manage.py simple_deploy --platform fly_io --vm-size standard-2x"
+    )
+    stdout, stderr = msp.call_simple_deploy(tmp_project, invalid_sd_command)
+
+    assert 'The VM size "standard-2x" isn\'t known for fly_io.' in stderr
+    assert "shared-cpu-1x" in stderr
+    check_project_unchanged(tmp_project)
+
+
+def test_invalid_machine_counts_call(tmp_project):
+    """Call simple_deploy with --min-machines greater than --max-machines."""
+    invalid_sd_command = "python manage.py simple_deploy --platform fly_io --min-machines 3 --max-machines 2"
+    stdout, stderr = msp.call_simple_deploy(tmp_project, invalid_sd_command)
+
+    assert "--min-machines can't be greater than --max-machines." in stderr
+    check_project_unchanged(tmp_project)
+
+
+def test_invalid_conn_max_age_call(tmp_project):
+    """Call simple_deploy with a negative --conn-max-age."""
+    invalid_sd_command = (
+        "python manage.py simple_deploy --platform heroku --conn-max-age -1"
+    )
+    stdout, stderr = msp.call_simple_deploy(tmp_project, invalid_sd_command)
+
+    assert "The connection age -1 can't be used." in stderr
+    check_project_unchanged(tmp_project)
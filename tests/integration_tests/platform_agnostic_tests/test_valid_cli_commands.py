@@ -28,3 +28,58 @@ def test_help_output(tmp_project, capfd):
     ).read_text()
 
     assert stdout == reference_help_output
+
+
+def test_asgi_server(tmp_project, pkg_manager):
+    """Call simple_deploy with `--server asgi`."""
+    valid_sd_command = "python manage.py simple_deploy --server asgi"
+    stdout, stderr = msp.call_simple_deploy(tmp_project, valid_sd_command, "heroku")
+
+    procfile = (tmp_project / "Procfile").read_text()
+    assert (
+        procfile
+        == "web: gunicorn -k uvicorn_worker.UvicornWorker blog.asgi --log-file -"
+    )
+
+    if pkg_manager == "req_txt":
+        requirements = (tmp_project / "requirements.txt").read_text()
+        assert "uvicorn-worker" in requirements
+    elif pkg_manager == "pipenv":
+        assert "uvicorn-worker" in (tmp_project / "Pipfile").read_text()
+
+
+def test_asgi_server_existing_fly_toml(tmp_project, pkg_manager):
+    """Call simple_deploy with `--server asgi`, when the project already has a
+    fly.toml file. The existing file isn't changed, so the worker class has to be
+    on the Dockerfile's start command.
+    """
+    msp.reset_test_project(tmp_project, pkg_manager)
+    fly_toml = 'app = "my_blog_project"\n'
+    (tmp_project / "fly.toml").write_text(fly_toml)
+    msp.make_git_call(tmp_project, "git add fly.toml")
+    msp.make_git_call(tmp_project, 'git commit -m "Added fly.toml."')
+
+    valid_sd_command = "python manage.py simple_deploy --server asgi"
+    stdout, stderr = msp.call_simple_deploy(tmp_project, valid_sd_command, "fly_io")
+
+    assert (tmp_project / "fly.toml").read_text() == fly_toml
+    dockerfile = (tmp_project / "Dockerfile").read_text()
+    assert (
+        'CMD ["gunicorn", "--bind", ":8000", "-k", "uvicorn_worker.UvicornWorker",'
+        ' "blog.asgi"]'
+    ) in dockerfile
+
+
+def test_conn_max_age(tmp_project, pkg_manager):
+    """Call simple_deploy with --conn-max-age and --no-db-health-checks."""
+    # An earlier test may have already added a Heroku settings block.
+    msp.reset_test_project(tmp_project, pkg_manager)
+
+    valid_sd_command = (
+        "python manage.py simple_deploy --conn-max-age 60 --no-db-health-checks"
+    )
+    stdout, stderr = msp.call_simple_deploy(tmp_project, valid_sd_command, "heroku")
+
+    settings_text = (tmp_project / "blog" / "settings.py").read_text()
+    assert "conn_max_age=60," in settings_text
+    assert "conn_health_checks" not in settings_text
@@ -0,0 +1,83 @@
+"""Tests for simple_deploy/management/commands/cli_cache.py."""
+
+import subprocess
+
+from simple_deploy.management.commands.cli_cache import CLICache
+
+
+def _output(stdout, returncode=0):
+    return subprocess.CompletedProcess(["fly", "apps", "list"], returncode, stdout, b"")
+
+
+def test_cache_round_trip(tmp_path):
+    cache = CLICache(tmp_path, cwd="/projects/blog")
+    cmd = "fly apps list --json"
+
+    assert cache.get(cmd) is None
+    assert cache.set(cmd, _output(b'[{"Name": "my-app"}]'))
+
+    output = cache.get(cmd)
+    assert output.stdout == b'[{"Name": "my-app"}]'
+    assert output.returncode == 0
+
+
+def test_cache_keyed_by_cwd(tmp_path):
+    cmd = "fly apps list --json"
+    CLICache(tmp_path, cwd="/projects/blog").set(cmd, _output(b"[]"))
+
+    assert CLICache(tmp_path, cwd="/projects/shop").get(cmd) is None
+
+
+def test_cache_expires(tmp_path):
+    cmd = "fly apps list --json"
+    CLICache(tmp_path, cwd="/projects/blog").set(cmd, _output(b"[]"))
+
+    assert CLICache(tmp_path, cwd="/projects/blog", ttl=-1).get(cmd) is None
+
+
+def test_refresh_ignores_cache_but_writes(tmp_path):
+    cmd = "fly apps list --json"
+    CLICache(tmp_path, cwd="/projects/blog").set(cmd, _output(b"[]"))
+
+    refreshing_cache = CLICache(tmp_path, cwd="/projects/blog", refresh=True)
+    assert refreshing_cache.get(cmd) is None
+    refreshing_cache.set(cmd, _output(b'[{"Name": "new-app"}]'))
+
+    output = CLICache(tmp_path, cwd="/projects/blog").get(cmd)
+    assert output.stdout == b'[{"Name": "new-app"}]'
+
+
+def test_failed_and_secret_output_not_cached(tmp_path):
+    cache = CLICache(tmp_path, cwd="/projects/blog")
+
+    assert not cache.set("fly auth whoami --json", _output(b"", returncode=1))
+    assert not cache.set("heroku config --json", _output(b'{"SECRET_KEY": "abc"}'))
+    assert not cache.set(
+        "heroku apps:info --json", _output(b"postgres://user:pw@host:5432/db")
+    )
+    assert not list(tmp_path.rglob("*.json"))
+
+
+def test_clear(tmp_path):
+    cache = CLICache(tmp_path, cwd="/projects/blog")
+    cmd = "fly apps list --json"
+    cache.set(cmd, _output(b"[]"))
+
+    cache.clear()
+    assert cache.get(cmd) is None
+
+
+def test_gather_commands_caches_listed_commands(tmp_path):
+    """Only the commands passed in cached are cached, such as version checks."""
+    from simple_deploy.management.commands.simple_deploy import Command
+
+    sd_command = Command()
+    sd_command.cli_cache = CLICache(tmp_path, cwd="/projects/blog")
+    sd_command.on_windows = False
+    sd_command.log_output = False
+
+    cmds = ["git --version", "python --version"]
+    sd_command.gather_commands(cmds, cached=["git --version"])
+
+    assert sd_command.cli_cache.get("git --version") is not None
+    assert sd_command.cli_cache.get("python --version") is None
@@ -0,0 +1,74 @@
+"""Tests for simple_deploy/management/commands/db_settings.py."""
+
+from textwrap import dedent
+
+from simple_deploy.management.commands.db_settings import DatabaseSettings
+
+
+def test_database_url():
+    db = DatabaseSettings()
+    code = db.assignment(
+        "DATABASES",
+        {"default": db.database_url("dj_database_url.config", ssl_require="True")},
+        level=0,
+    )
+    assert code == dedent(
+        """\
+        DATABASES = {
+            "default": dj_database_url.config(
+                ssl_require=True,
+                conn_max_age=600,
+                conn_health_checks=True,
+            ),
+        }"""
+    )
+
+
+def test_database_url_positional_args():
+    db = DatabaseSettings(60, health_checks=False)
+    code = db.assignment(
+        'DATABASES["default"]', db.database_url("dj_database_url.parse", "db_url")
+    )
+    assert code == dedent(
+        """\
+        DATABASES["default"] = dj_database_url.parse(
+                db_url,
+                conn_max_age=60,
+            )"""
+    )
+
+
+def test_connection():
+    db = DatabaseSettings()
+    entries = {"ENGINE": '"django.db.backends.postgresql"'}
+    assert db.connection(entries) == {
+        "ENGINE": '"django.db.backends.postgresql"',
+        "CONN_MAX_AGE": "600",
+        "CONN_HEALTH_CHECKS": "True",
+    }
+    # The entries passed in aren't changed.
+    assert entries == {"ENGINE": '"django.db.backends.postgresql"'}
+
+
+def test_no_health_checks_without_reuse():
+    """Health checks only apply to reused connections."""
+    db = DatabaseSettings(0)
+    assert db.connection({}) == {"CONN_MAX_AGE": "0"}
+
+
+def test_generated_code_is_valid():
+    db = DatabaseSettings()
+    code = db.assignment(
+        "DATABASES",
+        {
+            "default": db.connection({"NAME": '"db"'}),
+            "sqlite": {"ENGINE": '"django.db.backends.sqlite3"'},
+        },
+    )
+    namespace = {}
+    exec(code, namespace)
+    assert namespace["DATABASES"]["default"] == {
+        "NAME": "db",
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
+    }
@@ -3,6 +3,7 @@
 from textwrap import dedent
 
 import simple_deploy.management.commands.utils as sd_utils
+from simple_deploy.management.commands import git_status
 
 import pytest
 
@@ -209,3 +210,89 @@ def test_clean_diff_settings():
     cleaned_diff = sd_utils._clean_diff(diff_output.splitlines())
     assert cleaned_diff == ["+    'simple_deploy',"]
     assert sd_utils._check_settings_diff(diff_output.splitlines())
+
+
+# --- Tests for parsing `git status --porcelain=v2 -z` ---
+
+
+def test_iter_records_across_chunks():
+    chunks = [b"? simple_de", b"ploy_logs/\0? a", b".txt\0? b.txt"]
+    records = list(git_status.iter_records(chunks))
+    assert records == [b"? simple_deploy_logs/", b"? a.txt", b"? b.txt"]
+
+
+def test_parse_status_v2():
+    hash_ = "0" * 40
+    status_output = (
+        f"1 .M N... 100644 100644 100644 {hash_} {hash_} blog/settings.py\0"
+        f"2 R. N... 100644 100644 100644 {hash_} {hash_} R100 new name.py\0old.py\0"
+        "? simple_deploy_logs/\0"
+    ).encode()
+
+    entries = list(git_status.parse_status([status_output]))
+    assert entries == [
+        git_status.StatusEntry(" M", "blog/settings.py", None),
+        git_status.StatusEntry("R ", "new name.py", "old.py"),
+        git_status.StatusEntry("??", "simple_deploy_logs/", None),
+    ]
+    assert git_status.format_entry(entries[0]) == " M blog/settings.py"
+    assert git_status.format_entry(entries[1]) == "R  old.py -> new name.py"
+    assert git_status.format_entry(entries[2]) == "?? simple_deploy_logs/"
+
+
+def test_check_status_entries_stops_early():
+    def entries():
+        yield git_status.StatusEntry(" M", "blog/settings.py", None)
+        yield git_status.StatusEntry(" M", "blog/urls.py", None)
+        raise AssertionError("Read past the first disallowed change.")
+
+    assert git_status.check_status_entries(entries()) == (False, [])
+
+
+def test_check_status_entries_diff_paths():
+    entries = [
+        git_status.StatusEntry(" M", "blog/settings.py", None),
+        git_status.StatusEntry("M ", ".gitignore", None),
+        git_status.StatusEntry("??", "simple_deploy_logs/", None),
+    ]
+    proceed, diff_paths = git_status.check_status_entries(entries)
+    assert proceed
+    assert diff_paths == ["blog/settings.py", ".gitignore"]
+
+    cmd = git_status.get_diff_cmd(diff_paths)
+    assert cmd == "git diff --unified=0 -- :/blog/settings.py :/.gitignore"
+
+
+# --- Tests for checking diffs as a stream ---
+
+
+def test_check_diff_lines_stops_early():
+    def diff_lines():
+        yield "diff --git a/blog/settings.py b/blog/settings.py"
+        yield "@@ -135 +135,2 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'"
+        yield "+# Placeholder comment to create unacceptable git status."
+        raise AssertionError("Read past the first disallowed change.")
+
+    assert not git_status.check_diff_lines(diff_lines())
+
+
+def test_check_diff_lines_from_chunks():
+    diff_output = dedent(
+        """\
+        diff --git a/.gitignore b/.gitignore
+        --- a/.gitignore
+        +++ b/.gitignore
+        @@ -8,0 +9,2 @@ db.sqlite3
+        +
+        +simple_deploy_logs/
+        diff --git a/blog/settings.py b/blog/settings.py
+        --- a/blog/settings.py
+        +++ b/blog/settings.py
+        @@ -39,0 +40 @@ INSTALLED_APPS = [
+        +    'simple_deploy',
+        """
+    ).encode()
+    chunks = [diff_output[i : i + 7] for i in range(0, len(diff_output), 7)]
+
+    lines = git_status.iter_lines(chunks)
+    assert git_status.check_diff_lines(lines)
@@ -0,0 +1,94 @@
+"""Tests for how the simple_deploy command's handle() treats project files."""
+
+import pytest
+
+from simple_deploy.management.commands.simple_deploy import Command
+from simple_deploy.management.commands.utils import SimpleDeployCommandError
+
+
+@pytest.fixture
+def sd_command(monkeypatch):
+    sd_command = Command()
+    sd_command.log_output = False
+
+    def parse_cli_options(options):
+        sd_command.log_output = False
+        sd_command.profile = False
+
+    monkeypatch.setattr(sd_command, "_parse_cli_options", parse_cli_options)
+    return sd_command
+
+
+def _edit_then_raise(sd_command, path, exception):
+    def run_phases():
+        sd_command.snapshot.write_text(path, "DEBUG = False\n")
+        if exception:
+            raise exception
+
+    return run_phases
+
+
+def test_changes_written_on_success(sd_command, tmp_path, monkeypatch):
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True\n")
+    monkeypatch.setattr(
+        sd_command, "_run_phases", _edit_then_raise(sd_command, path, None)
+    )
+
+    sd_command.handle()
+    assert path.read_text() == "DEBUG = False\n"
+
+
+@pytest.mark.parametrize(
+    "exception",
+    [
+        RuntimeError("Bug in a step."),
+        KeyboardInterrupt(),
+    ],
+)
+def test_changes_discarded_on_any_error(sd_command, tmp_path, monkeypatch, exception):
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True\n")
+    monkeypatch.setattr(
+        sd_command, "_run_phases", _edit_then_raise(sd_command, path, exception)
+    )
+
+    with pytest.raises(type(exception)):
+        sd_command.handle()
+    assert path.read_text() == "DEBUG = True\n"
+
+
+def test_changes_discarded_on_command_error(sd_command, tmp_path, monkeypatch):
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True\n")
+    exception = SimpleDeployCommandError(sd_command, "Can't deploy.")
+    monkeypatch.setattr(
+        sd_command, "_run_phases", _edit_then_raise(sd_command, path, exception)
+    )
+
+    with pytest.raises(SimpleDeployCommandError):
+        sd_command.handle()
+    assert path.read_text() == "DEBUG = True\n"
+
+
+def test_changes_discarded_when_requirements_fail(sd_command, tmp_path, monkeypatch):
+    """A failed requirements write leaves every project file unchanged."""
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True\n")
+    pptoml_path = tmp_path / "pyproject.toml"
+    pptoml_path.write_text("[tool.poetry]\n")
+
+    def run_phases():
+        sd_command.snapshot.write_text(path, "DEBUG = False\n")
+        sd_command._pending_packages = {("poetry", pptoml_path): [("gunicorn", "")]}
+
+    def add_poetry_pkgs(*args, **kwargs):
+        raise OSError("Can't write pyproject.toml.")
+
+    monkeypatch.setattr(sd_command, "_run_phases", run_phases)
+    monkeypatch.setattr(sd_command.utils, "add_poetry_pkgs", add_poetry_pkgs)
+
+    with pytest.raises(OSError):
+        sd_command.handle()
+    assert path.read_text() == "DEBUG = True\n"
+    assert pptoml_path.read_text() == "[tool.poetry]\n"
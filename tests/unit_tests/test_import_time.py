@@ -0,0 +1,95 @@
+"""Check that importing simple_deploy stays cheap.
+
+Django imports the simple_deploy app for every manage.py command, and imports the
+simple_deploy command module for commands such as `manage.py help simple_deploy`.
+Heavy dependencies should only be imported when they're actually used.
+"""
+
+import ast, subprocess, sys
+from pathlib import Path
+
+import pytest
+
+# Dependencies that are only needed partway through a deployment.
+LAZY_MODULES = {"asyncio", "pluggy", "requests", "toml", "tomli", "tomllib"}
+
+# Django imports these through asgiref whenever a management command is loaded, so
+# they can't be absent after importing the command module. They're still checked in
+# simple_deploy's own module-level imports.
+DJANGO_IMPORTS = {"asyncio"}
+
+
+def _get_import_times(module_name):
+    """Import module_name in a fresh interpreter, with -X importtime.
+
+    Returns:
+        dict: {module name: self time in microseconds}
+    """
+    root_dir = Path(__file__).parents[2]
+    cmd = [sys.executable, "-X", "importtime", "-c", f"import {module_name}"]
+    output = subprocess.run(
+        cmd, cwd=root_dir, capture_output=True, text=True, check=True
+    )
+
+    import_times = {}
+    for line in output.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.split(":", 1)[1].split("|")
+        import_times[name.strip()] = int(self_us)
+
+    return import_times
+
+
+@pytest.mark.parametrize(
+    "module_name",
+    ["simple_deploy", "simple_deploy.management.commands.simple_deploy"],
+)
+def test_heavy_dependencies_imported_lazily(module_name):
+    import_times = _get_import_times(module_name)
+
+    assert module_name in import_times
+    if module_name == "simple_deploy":
+        assert not LAZY_MODULES & set(import_times)
+    else:
+        assert not (LAZY_MODULES - DJANGO_IMPORTS) & set(import_times)
+
+
+def test_no_module_level_lazy_imports():
+    """Modules loaded with the command module import lazy dependencies inside the
+    functions that use them."""
+    root_dir = Path(__file__).parents[2]
+    import_times = _get_import_times("simple_deploy.management.commands.simple_deploy")
+
+    for module_name in import_times:
+        if not module_name.startswith("simple_deploy"):
+            continue
+        path = root_dir / Path(*module_name.split("."))
+        path = path / "__init__.py" if path.is_dir() else path.with_suffix(".py")
+        if not path.exists():
+            # Namespace packages have no code of their own.
+            continue
+
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        for node in tree.body:
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.module:
+                names = [node.module]
+            else:
+                continue
+
+            top_level_names = {name.split(".")[0] for name in names}
+            assert not LAZY_MODULES & top_level_names, f"{module_name}: {names}"
+
+
+def test_command_module_import_time():
+    """A generous budget, to catch large regressions rather than measure noise."""
+    import_times = _get_import_times("simple_deploy.management.commands.simple_deploy")
+
+    own_time = sum(
+        self_us
+        for name, self_us in import_times.items()
+        if name.startswith("simple_deploy")
+    )
+    assert own_time < 250_000
@@ -0,0 +1,92 @@
+"""Tests for simple_deploy/management/commands/log_pipeline.py."""
+
+import threading
+
+import simple_deploy.management.commands.utils as sd_utils
+from simple_deploy.management.commands.log_pipeline import LogPipeline
+
+import pytest
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    log_path = tmp_path / "simple_deploy.log"
+    pipeline = LogPipeline(log_path, scrub=sd_utils._strip_secret_key)
+    pipeline.start()
+    yield pipeline
+    pipeline.stop()
+
+
+def test_records_written_on_stop(pipeline):
+    sd_utils.log_output_string("Line 1\nLine 2")
+    pipeline.stop()
+
+    lines = pipeline.log_path.read_text().splitlines()
+    assert len(lines) == 2
+    assert lines[0].endswith("INFO: Line 1")
+    assert lines[1].endswith("INFO: Line 2")
+
+
+def test_flush_writes_without_stopping(pipeline):
+    sd_utils.log_output_string("Before flush")
+    assert pipeline.flush()
+    assert "INFO: Before flush" in pipeline.log_path.read_text()
+
+    # The pipeline keeps working after a flush, and flush requests aren't logged.
+    sd_utils.log_output_string("After flush")
+    pipeline.stop()
+    lines = pipeline.log_path.read_text().splitlines()
+    assert len(lines) == 2
+    assert lines[1].endswith("INFO: After flush")
+
+
+def test_secrets_scrubbed(pipeline):
+    sd_utils.log_output_string("SECRET_KEY = 'django-insecure-abc'")
+    pipeline.stop()
+
+    log_text = pipeline.log_path.read_text()
+    assert "django-insecure" not in log_text
+    assert "SECRET_KEY = *value hidden*" in log_text
+
+
+def test_records_from_threads(pipeline):
+    def log_lines(thread_num):
+        sd_utils.log_output_string(
+            "\n".join(f"thread {thread_num} line {i}" for i in range(100))
+        )
+
+    threads = [threading.Thread(target=log_lines, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pipeline.stop()
+
+    lines = pipeline.log_path.read_text().splitlines()
+    assert len(lines) == 400
+    for n in range(4):
+        thread_lines = [line for line in lines if f"thread {n} " in line]
+        assert thread_lines[-1].endswith(f"thread {n} line 99")
+
+
+def test_stop_twice(pipeline):
+    sd_utils.log_output_string("Logged")
+    pipeline.stop()
+    pipeline.stop()
+    sd_utils.log_output_string("Not logged")
+    log_text = pipeline.log_path.read_text()
+    assert "INFO: Logged" in log_text
+    assert "Not logged" not in log_text
+
+
+def test_multiline_record_scrubbed_in_one_pass(pipeline):
+    sd_utils.log_output_string(
+        "Attached database.\n\n  DATABASE_URL=postgres://user:pw@host/db\nDone."
+    )
+    pipeline.stop()
+
+    lines = pipeline.log_path.read_text().splitlines()
+    assert len(lines) == 4
+    assert lines[1].endswith("INFO: ")
+    assert lines[2].endswith("INFO:   DATABASE_URL=*value hidden*")
+    assert "pw@host" not in pipeline.log_path.read_text()
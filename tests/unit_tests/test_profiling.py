@@ -0,0 +1,69 @@
+"""Tests for simple_deploy/management/commands/profiling.py."""
+
+import json, threading, time
+
+from simple_deploy.management.commands.profiling import Profiler
+
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    with profiler.span("outer"):
+        pass
+
+    assert profiler.spans == []
+
+
+def test_nested_spans():
+    profiler = Profiler(enabled=True)
+    with profiler.span("outer"):
+        with profiler.span("inner"):
+            time.sleep(0.05)
+
+    spans = {span["name"]: span for span in profiler.spans}
+    assert spans["inner"]["parent"] == "outer"
+    assert spans["inner"]["depth"] == 1
+    assert spans["outer"]["depth"] == 0
+    assert spans["outer"]["duration"] >= spans["inner"]["duration"] >= 0.05
+
+
+def test_spans_from_threads():
+    profiler = Profiler(enabled=True)
+    work = profiler.wrap(lambda: time.sleep(0.01), "step: work")
+
+    with profiler.span("outer"):
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    step_spans = [span for span in profiler.spans if span["name"] == "step: work"]
+    assert len(step_spans) == 4
+
+    # Nesting is tracked per thread.
+    assert all(span["parent"] is None for span in step_spans)
+
+
+def test_report_sorted_by_duration():
+    profiler = Profiler(enabled=True)
+    with profiler.span("fast"):
+        pass
+    with profiler.span("slow"):
+        time.sleep(0.05)
+
+    report = profiler.get_report()
+    assert report.index("slow") < report.index("fast")
+
+
+def test_write_json(tmp_path):
+    profiler = Profiler(enabled=True)
+    with profiler.span("first"):
+        pass
+    with profiler.span("second"):
+        pass
+
+    path = tmp_path / "profile.json"
+    profiler.write_json(path)
+
+    data = json.loads(path.read_text())
+    assert [span["name"] for span in data["spans"]] == ["first", "second"]
@@ -0,0 +1,143 @@
+"""Tests for simple_deploy/management/commands/project_snapshot.py."""
+
+import os
+from textwrap import dedent
+
+import pytest
+
+from simple_deploy.management.commands import project_snapshot
+from simple_deploy.management.commands.project_snapshot import ProjectSnapshot
+
+
+def test_reads_are_cached(tmp_path):
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True\n")
+
+    snapshot = ProjectSnapshot()
+    assert snapshot.read_text(path) == "DEBUG = True\n"
+
+    # Later reads come from the snapshot, not the disk.
+    path.write_text("changed on disk\n")
+    assert snapshot.read_text(path) == "DEBUG = True\n"
+
+    # Until the file is invalidated.
+    snapshot.invalidate(path)
+    assert snapshot.read_text(path) == "changed on disk\n"
+
+
+def test_writes_deferred_until_flush(tmp_path):
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True\n")
+    new_path = tmp_path / ".platform" / "services.yaml"
+
+    snapshot = ProjectSnapshot()
+    snapshot.write_text(path, "DEBUG = False\n")
+    snapshot.write_text(new_path, "db:\n")
+
+    assert snapshot.read_text(path) == "DEBUG = False\n"
+    assert snapshot.exists(new_path)
+    assert path.read_text() == "DEBUG = True\n"
+    assert not new_path.exists()
+
+    written = snapshot.flush()
+    assert written == sorted([path, new_path])
+    assert path.read_text() == "DEBUG = False\n"
+    assert new_path.read_text() == "db:\n"
+
+    # Nothing left to write.
+    assert snapshot.flush() == []
+
+
+def test_missing_file(tmp_path):
+    path = tmp_path / "Procfile"
+
+    snapshot = ProjectSnapshot()
+    assert not snapshot.exists(path)
+    with pytest.raises(FileNotFoundError):
+        snapshot.read_text(path)
+
+
+def test_relative_and_absolute_paths_match(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    snapshot = ProjectSnapshot()
+    snapshot.write_text(tmp_path / ".dockerignore", ".git/\n")
+    assert snapshot.read_text(".dockerignore") == ".git/\n"
+
+
+def test_load_toml(tmp_path):
+    path = tmp_path / "pyproject.toml"
+    path.write_text(
+        dedent(
+            """\
+            [tool.poetry.dependencies]
+            python = "^3.10"
+            """
+        )
+    )
+
+    snapshot = ProjectSnapshot()
+    data = snapshot.load_toml(path)
+    assert data["tool"]["poetry"]["dependencies"] == {"python": "^3.10"}
+
+    # Callers get their own copy.
+    data["tool"]["poetry"]["dependencies"]["django"] = "*"
+    assert "django" not in snapshot.load_toml(path)["tool"]["poetry"]["dependencies"]
+
+    # Writing text resets the parsed data.
+    snapshot.write_text(path, '[tool.poetry.dependencies]\ndjango = "*"\n')
+    assert snapshot.load_toml(path)["tool"]["poetry"]["dependencies"] == {"django": "*"}
+
+
+def test_discard(tmp_path):
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True\n")
+
+    snapshot = ProjectSnapshot()
+    snapshot.write_text(path, "DEBUG = False\n")
+
+    assert snapshot.discard() == [path]
+    assert snapshot.read_text(path) == "DEBUG = True\n"
+    assert snapshot.flush() == []
+    assert path.read_text() == "DEBUG = True\n"
+
+
+def test_flush_skips_identical_content(tmp_path):
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True\n")
+    os.utime(path, ns=(0, 0))
+
+    snapshot = ProjectSnapshot()
+    snapshot.write_text(path, "DEBUG = True\n")
+    assert snapshot.flush() == []
+    assert path.stat().st_mtime_ns == 0
+
+    # After a flush, the written text is what's on disk.
+    snapshot.write_text(path, "DEBUG = False\n")
+    assert snapshot.flush() == [path]
+    assert snapshot.get_original_text(path) == "DEBUG = False\n"
+    snapshot.write_text(path, "DEBUG = False\n")
+    assert snapshot.flush() == []
+
+
+def test_failed_flush_keeps_edits_pending(tmp_path, monkeypatch):
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True\n")
+
+    snapshot = ProjectSnapshot()
+    snapshot.write_text(path, "DEBUG = False\n")
+
+    def fail_commit(transaction):
+        raise OSError("disk full")
+
+    with monkeypatch.context() as m:
+        m.setattr(project_snapshot.FileTransaction, "commit", fail_commit)
+        with pytest.raises(OSError):
+            snapshot.flush()
+
+    assert path.read_text() == "DEBUG = True\n"
+    assert snapshot.get_original_text(path) == "DEBUG = True\n"
+
+    # The edit can still be flushed, or discarded.
+    assert snapshot.flush() == [path]
+    assert path.read_text() == "DEBUG = False\n"
@@ -0,0 +1,79 @@
+"""Tests for simple_deploy/management/commands/requirements_index.py."""
+
+from textwrap import dedent
+
+from simple_deploy.management.commands import requirements_index as ri
+
+import pytest
+
+
+def test_canonicalize_name():
+    assert ri.canonicalize_name("Django") == "django"
+    assert ri.canonicalize_name("psycopg2_binary") == "psycopg2-binary"
+    assert ri.canonicalize_name("zope.interface") == "zope-interface"
+
+
+@pytest.mark.parametrize(
+    "line, name",
+    [
+        ("Django==4.1.2", "Django"),
+        ("requests[socks, security] >= 2.0", "requests"),
+        ('gunicorn; sys_platform != "win32"', "gunicorn"),
+        ("whitenoise @ https://example.com/whitenoise.whl", "whitenoise"),
+        ("-e git+https://github.com/user/repo.git#egg=my_pkg", "my_pkg"),
+        ("plotly # Comment after the package name.", "plotly"),
+    ],
+)
+def test_parse_requirement(line, name):
+    assert ri.parse_requirement(line).name == name
+
+
+def test_parse_requirement_details():
+    line = 'requests[socks, security]>=2.0 ; python_version > "3.8"'
+    req = ri.parse_requirement(line)
+    assert req.extras == "socks,security"
+    assert req.specifier == ">=2.0"
+    assert req.marker == 'python_version > "3.8"'
+
+    req = ri.parse_requirement("whitenoise @ https://example.com/whitenoise.whl")
+    assert req.url == "https://example.com/whitenoise.whl"
+
+
+@pytest.mark.parametrize(
+    "line", ["", "# Comment", "--index-url https://example.com", "./local_dir"]
+)
+def test_parse_requirement_not_a_requirement(line):
+    assert ri.parse_requirement(line) is None
+
+
+def test_parse_req_txt_includes(tmp_path):
+    (tmp_path / "requirements.txt").write_text(
+        dedent(
+            """\
+            -r base.txt
+            -c constraints.txt
+            gunicorn
+            """
+        )
+    )
+    (tmp_path / "base.txt").write_text("Django\n-r requirements.txt\n")
+    (tmp_path / "constraints.txt").write_text("urllib3<2\n")
+
+    requirements, constraints = ri.parse_req_txt(
+        tmp_path / "requirements.txt", lambda path: path.read_text()
+    )
+    assert [req.name for req in requirements] == ["Django", "gunicorn"]
+    assert [req.name for req in constraints] == ["urllib3"]
+
+
+def test_requirements_index():
+    index = ri.RequirementsIndex(["Django", "psycopg2_binary"])
+
+    assert "django" in index
+    assert "psycopg2-binary" in index
+    assert index.get("DJANGO") == "Django"
+    assert "gunicorn" not in index
+
+    assert index.add("gunicorn")
+    assert not index.add("Gunicorn")
+    assert list(index) == ["Django", "psycopg2_binary", "gunicorn"]
@@ -0,0 +1,33 @@
+"""Tests for running deployment steps through the simple_deploy command."""
+
+import pytest
+
+from simple_deploy.management.commands.simple_deploy import Command
+from simple_deploy.management.commands.step_graph import Step
+
+
+@pytest.fixture
+def sd_command():
+    sd_command = Command()
+    sd_command.log_output = False
+    sd_command.unit_testing = True
+    sd_command.e2e_testing = False
+    return sd_command
+
+
+def test_exclusive_step_can_prompt(sd_command):
+    confirmed = []
+
+    def ask():
+        confirmed.append(sd_command.get_confirmation())
+
+    sd_command.run_steps([Step(ask, provides=["settings.py"])])
+    assert confirmed == [True]
+
+
+def test_concurrent_step_cant_prompt(sd_command):
+    def ask():
+        sd_command.get_confirmation()
+
+    with pytest.raises(RuntimeError, match="concurrent step"):
+        sd_command.run_steps([Step(ask, provides=["settings.py"], concurrent=True)])
@@ -0,0 +1,146 @@
+"""Tests for simple_deploy/management/commands/runners.py."""
+
+import asyncio, os, sys, subprocess, time
+
+import simple_deploy.management.commands.runners as sd_runners
+
+import pytest
+
+
+def _python_cmd(code):
+    """Return cmd_parts that run a snippet of Python code."""
+    return [sys.executable, "-c", code]
+
+
+def _python_shell_cmd(code):
+    """Return a command string that runs a snippet of Python code."""
+    return f'"{sys.executable}" -c "{code}"'
+
+
+def test_stream_command_captures_stdout_and_stderr():
+    code = "import sys; print('out line'); sys.stdout.flush(); print('err line', file=sys.stderr)"
+    chunks = []
+    streamed = sd_runners.stream_command(_python_cmd(code), chunks.append)
+
+    output = "".join(chunks)
+    assert "out line\n" in output
+    assert "err line\n" in output
+    assert streamed.returncode == 0
+
+
+def test_stream_command_preserves_order_within_stream():
+    code = "for i in range(500): print(f'line {i}')"
+    chunks = []
+    sd_runners.stream_command(_python_cmd(code), chunks.append, batch_lines=50)
+
+    lines = "".join(chunks).splitlines()
+    assert lines == [f"line {i}" for i in range(500)]
+
+    # Output should have been written in batches, not line by line.
+    assert len(chunks) < 500
+
+
+def test_stream_command_bounded_tail():
+    code = "for i in range(1000): print(f'line {i}')\nprint('https://my-app.fly.dev')"
+    streamed = sd_runners.stream_command(
+        _python_cmd(code), lambda output: None, tail_lines=10
+    )
+
+    assert len(streamed.tail) == 10
+    assert streamed.tail[-1] == "https://my-app.fly.dev\n"
+
+    m = streamed.search_tail(r"(https://.*\.fly\.dev)")
+    assert m.group(1) == "https://my-app.fly.dev"
+
+
+def test_stream_command_returncode():
+    code = "import sys; print('failing', file=sys.stderr); sys.exit(3)"
+    chunks = []
+    streamed = sd_runners.stream_command(_python_cmd(code), chunks.append)
+
+    assert streamed.returncode == 3
+    assert "".join(chunks) == "failing\n"
+
+
+# --- Running quick commands concurrently ---
+
+
+def test_gather_commands_results_in_order():
+    cmds = [f'"{sys.executable}" -c "print({i})"' for i in range(3)]
+    outputs = sd_runners.gather_commands(cmds)
+
+    assert [output.stdout.decode().strip() for output in outputs] == ["0", "1", "2"]
+    assert all(output.returncode == 0 for output in outputs)
+
+
+def test_gather_commands_run_concurrently():
+    cmd = f'"{sys.executable}" -c "import time; time.sleep(0.5)"'
+
+    start = time.monotonic()
+    sd_runners.gather_commands([cmd] * 4)
+    assert time.monotonic() - start < 1.5
+
+
+def test_gather_commands_check():
+    cmd = f'"{sys.executable}" -c "import sys; sys.exit(2)"'
+
+    outputs = sd_runners.gather_commands([cmd])
+    assert outputs[0].returncode == 2
+
+    with pytest.raises(subprocess.CalledProcessError):
+        sd_runners.gather_commands([cmd], check=True)
+
+
+def test_gather_commands_check_waits_for_other_commands(tmp_path):
+    marker = tmp_path / "finished"
+    fail_cmd = f'"{sys.executable}" -c "import sys; sys.exit(2)"'
+    slow_cmd = _python_shell_cmd(
+        f"import time, pathlib; time.sleep(0.3); pathlib.Path(r'{marker}').touch()"
+    )
+
+    with pytest.raises(subprocess.CalledProcessError):
+        sd_runners.gather_commands([fail_cmd, slow_cmd], check=True)
+    assert marker.exists()
+
+
+def test_cancelled_command_killed(tmp_path):
+    pid_path = tmp_path / "pid"
+    cmd = _python_shell_cmd(
+        f"import os, time, pathlib; pathlib.Path(r'{pid_path}').write_text"
+        "(str(os.getpid())); time.sleep(10)"
+    )
+
+    async def run_then_cancel():
+        task = asyncio.create_task(sd_runners.run_command_async(cmd))
+        while not pid_path.exists() or not pid_path.read_text():
+            await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run_then_cancel())
+
+    # The command was killed, and reaped.
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_path.read_text()), 0)
+
+
+def test_gather_commands_missing_executable():
+    with pytest.raises(FileNotFoundError):
+        sd_runners.gather_commands(["not-a-real-cli-abc123 --version"])
+
+
+def test_iter_stdout():
+    code = "import sys; sys.stdout.write('a' * 100000)"
+    chunks = list(sd_runners.iter_stdout(_python_cmd(code), chunk_size=4096))
+    assert b"".join(chunks) == b"a" * 100000
+
+
+def test_iter_stdout_stops_command_early():
+    code = "import sys, time\nprint('first', flush=True)\ntime.sleep(30)"
+    start = time.perf_counter()
+    chunks = sd_runners.iter_stdout(_python_cmd(code))
+    assert next(chunks).startswith(b"first")
+    chunks.close()
+
+    assert time.perf_counter() - start < 10
@@ -0,0 +1,150 @@
+"""Tests for simple_deploy/management/commands/step_graph.py."""
+
+import threading, time
+
+from simple_deploy.management.commands.step_graph import (
+    Step,
+    get_dependencies,
+    run_steps,
+)
+
+import pytest
+
+
+class Recorder:
+    """Stand-in for the capture and replay methods on Command."""
+
+    def __init__(self):
+        self.output = []
+        self._local = threading.local()
+
+    def write(self, msg):
+        records = getattr(self._local, "records", None)
+        if records is None:
+            self.output.append(msg)
+        else:
+            records.append(msg)
+
+    def capture(self, func):
+        self._local.records = records = []
+        try:
+            func()
+        except BaseException as e:
+            return records, e
+        finally:
+            self._local.records = None
+        return records, None
+
+    def replay(self, records):
+        self.output.extend(records)
+
+    def run(self, steps, max_workers=4):
+        run_steps(steps, self.capture, self.replay, max_workers=max_workers)
+
+
+def _make_func(name, recorder, delay=0, error=None):
+    """Return a step function that sleeps, writes its name, and optionally fails."""
+
+    def func():
+        time.sleep(delay)
+        recorder.write(name)
+        if error:
+            raise error
+
+    func.__name__ = name
+    return func
+
+
+def test_dependencies_from_shared_resources():
+    r = Recorder()
+    steps = [
+        Step(_make_func("validate", r)),
+        Step(_make_func("a", r), provides=["settings.py"], concurrent=True),
+        Step(_make_func("b", r), provides=["requirements"], concurrent=True),
+        Step(
+            _make_func("c", r),
+            requires=["settings.py"],
+            provides=["other"],
+            concurrent=True,
+        ),
+        Step(_make_func("conclude", r)),
+    ]
+
+    assert get_dependencies(steps) == [set(), {0}, {0}, {0, 1}, {0, 1, 2, 3}]
+
+
+def test_output_replayed_in_step_order():
+    r = Recorder()
+    steps = [
+        Step(_make_func("first", r, delay=0.3), provides=["one"], concurrent=True),
+        Step(_make_func("second", r, delay=0.1), provides=["two"], concurrent=True),
+        Step(_make_func("third", r), provides=["three"], concurrent=True),
+    ]
+    r.run(steps)
+
+    assert r.output == ["first", "second", "third"]
+
+
+def test_independent_steps_run_concurrently():
+    r = Recorder()
+    steps = [
+        Step(
+            _make_func(f"step_{i}", r, delay=0.5),
+            provides=[f"resource_{i}"],
+            concurrent=True,
+        )
+        for i in range(4)
+    ]
+
+    start = time.monotonic()
+    r.run(steps)
+    assert time.monotonic() - start < 1.5
+
+
+def test_exclusive_step_waits_for_earlier_steps():
+    r = Recorder()
+    steps = [
+        Step(_make_func("slow", r, delay=0.3), provides=["one"], concurrent=True),
+        Step(_make_func("prompt", r), provides=["settings.py"]),
+        Step(_make_func("after", r), provides=["two"], concurrent=True),
+    ]
+    r.run(steps)
+
+    assert r.output == ["slow", "prompt", "after"]
+
+
+def test_earliest_error_raised_after_output_replayed():
+    r = Recorder()
+    steps = [
+        Step(_make_func("ok", r, delay=0.2), provides=["one"], concurrent=True),
+        Step(
+            _make_func("fails", r, error=ValueError("boom")),
+            provides=["two"],
+            concurrent=True,
+        ),
+        Step(
+            _make_func("dependent", r),
+            requires=["two"],
+            provides=["three"],
+            concurrent=True,
+        ),
+    ]
+
+    with pytest.raises(ValueError, match="boom"):
+        r.run(steps)
+
+    # The step that depends on the failed step never starts.
+    assert r.output == ["ok", "fails"]
+
+
+def test_steps_exclusive_by_default():
+    r = Recorder()
+    steps = [
+        Step(_make_func("a", r), provides=["one"]),
+        Step(_make_func("b", r), provides=["two"]),
+        Step(_make_func("c", r), provides=["three"], concurrent=True),
+        Step(_make_func("d", r), provides=["four"], concurrent=True),
+    ]
+
+    assert [step.exclusive for step in steps] == [True, True, False, False]
+    assert get_dependencies(steps) == [set(), {0}, {0, 1}, {0, 1}]
@@ -0,0 +1,118 @@
+"""Tests for simple_deploy/management/commands/toml_files.py."""
+
+from pathlib import Path
+from textwrap import dedent
+
+from simple_deploy.management.commands import toml_files
+
+import pytest
+
+
+def test_add_table_entries_keeps_formatting():
+    text = dedent(
+        """\
+        [packages]
+        # Web framework.
+        django = "*"
+
+        # Comment about dev packages.
+        [dev-packages]
+        """
+    )
+
+    new_text = toml_files.add_table_entries(
+        text, "packages", [("gunicorn", "*"), ("psycopg2", "<2.9")]
+    )
+    assert new_text == dedent(
+        """\
+        [packages]
+        # Web framework.
+        django = "*"
+        gunicorn = "*"
+        psycopg2 = "<2.9"
+
+        # Comment about dev packages.
+        [dev-packages]
+        """
+    )
+
+
+def test_add_table_entries_no_trailing_newline():
+    text = '[packages]\ndjango = "*"'
+    new_text = toml_files.add_table_entries(text, "packages", [("gunicorn", "*")])
+    assert new_text == '[packages]\ndjango = "*"\ngunicorn = "*"'
+
+
+def test_add_table_entries_new_table():
+    text = '[tool.poetry]\nname = "blog"\n'
+    new_text = toml_files.add_table_entries(
+        text, "tool.poetry.group.deploy", [("optional", True)]
+    )
+    assert new_text == dedent(
+        """\
+        [tool.poetry]
+        name = "blog"
+
+        [tool.poetry.group.deploy]
+        optional = true
+        """
+    )
+    assert toml_files.has_table(new_text, "tool.poetry.group.deploy")
+
+
+def test_format_key():
+    assert toml_files.format_key("django-simple-deploy") == "django-simple-deploy"
+    assert toml_files.format_key("zope.interface") == '"zope.interface"'
+
+
+def test_format_value():
+    assert toml_files.format_value(["tls", "http"]) == '["tls", "http"]'
+    assert toml_files.format_value([]) == "[]"
+
+
+def test_format_document():
+    data = {
+        "app": "my-app",
+        "http_service": {
+            "internal_port": 8000,
+            "processes": ["app"],
+            "concurrency": {"type": "requests"},
+        },
+        "vm": [{"size": "shared-cpu-1x"}, {"size": "performance-1x"}],
+    }
+
+    text = toml_files.format_document(data)
+    assert text == dedent(
+        """\
+        app = "my-app"
+
+        [http_service]
+          internal_port = 8000
+          processes = ["app"]
+
+          [http_service.concurrency]
+            type = "requests"
+
+        [[vm]]
+          size = "shared-cpu-1x"
+
+        [[vm]]
+          size = "performance-1x"
+        """
+    )
+    assert toml_files.loads(text) == data
+
+
+def test_loads():
+    data = toml_files.loads('[packages]\ndjango = "*"\n')
+    assert data == {"packages": {"django": "*"}}
+
+    with pytest.raises(toml_files.TOMLDecodeError):
+        toml_files.loads("[packages\n")
+
+
+def test_load_matches_toml_package():
+    import toml
+
+    path = Path(__file__).parent / "resources" / "pyproject.toml"
+    assert toml_files.load(path) == toml.load(path)
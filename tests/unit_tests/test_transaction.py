@@ -0,0 +1,76 @@
+"""Tests for simple_deploy/management/commands/transaction.py."""
+
+import pytest
+
+from simple_deploy.management.commands.transaction import FileTransaction
+
+
+def _staging_dirs(path):
+    return list(path.glob(".simple_deploy_staging_*"))
+
+
+def test_commit(tmp_path):
+    settings_path = tmp_path / "settings.py"
+    settings_path.write_text("DEBUG = True\n")
+    services_path = tmp_path / ".platform" / "services.yaml"
+
+    with FileTransaction(tmp_path) as transaction:
+        transaction.stage(settings_path, "DEBUG = False\n")
+        transaction.stage(services_path, "db:\n")
+
+        # Nothing is written until the transaction commits.
+        assert settings_path.read_text() == "DEBUG = True\n"
+        assert not services_path.exists()
+
+    assert settings_path.read_text() == "DEBUG = False\n"
+    assert services_path.read_text() == "db:\n"
+    assert not _staging_dirs(tmp_path)
+
+
+def test_rollback_on_error(tmp_path):
+    settings_path = tmp_path / "settings.py"
+    settings_path.write_text("DEBUG = True\n")
+
+    with pytest.raises(RuntimeError):
+        with FileTransaction(tmp_path) as transaction:
+            transaction.stage(settings_path, "DEBUG = False\n")
+            raise RuntimeError("Something went wrong.")
+
+    assert settings_path.read_text() == "DEBUG = True\n"
+    assert not _staging_dirs(tmp_path)
+
+
+def test_failed_commit_restores_files(tmp_path):
+    settings_path = tmp_path / "settings.py"
+    settings_path.write_text("DEBUG = True\n")
+    new_path = tmp_path / "new_dir" / "Procfile"
+
+    # A directory can't be replaced by a file, so the last write fails.
+    blocked_path = tmp_path / "blocked"
+    (blocked_path / "child").mkdir(parents=True)
+
+    transaction = FileTransaction(tmp_path)
+    transaction.stage(settings_path, "DEBUG = False\n")
+    transaction.stage(new_path, "web: gunicorn blog.wsgi\n")
+    transaction.stage(blocked_path, "text")
+
+    with pytest.raises(OSError):
+        transaction.commit()
+
+    assert settings_path.read_text() == "DEBUG = True\n"
+    assert not new_path.exists()
+    assert not new_path.parent.exists()
+    assert blocked_path.is_dir()
+    assert not _staging_dirs(tmp_path)
+
+
+def test_commit_keeps_permissions(tmp_path):
+    script_path = tmp_path / "build.sh"
+    script_path.write_text("echo old\n")
+    script_path.chmod(0o755)
+
+    with FileTransaction(tmp_path) as transaction:
+        transaction.stage(script_path, "echo new\n")
+
+    assert script_path.read_text() == "echo new\n"
+    assert script_path.stat().st_mode & 0o777 == 0o755
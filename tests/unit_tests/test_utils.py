@@ -1,9 +1,10 @@
 """Tests for simple_deploy/management/commands/utils.py."""
 
 from pathlib import Path
-import filecmp
+import filecmp, os
 
 import simple_deploy.management.commands.utils as sd_utils
+from simple_deploy.management.commands.project_snapshot import ProjectSnapshot
 import subprocess
 
 import pytest
@@ -136,3 +137,104 @@ def test_add_pipenv_pkg(tmp_path):
     sd_utils.add_pipenv_pkg(tmp_pipfile, "awesome-deployment-package", "")
     ref_file = Path(__file__).parent / "reference_files" / "Pipfile"
     assert filecmp.cmp(tmp_pipfile, ref_file)
+
+
+# --- Templates ---
+
+
+def test_get_template_parses_once(tmp_path):
+    template_path = tmp_path / "Procfile"
+    template_path.write_text("web: gunicorn {{ project_name }}.wsgi")
+
+    template = sd_utils.get_template(template_path)
+    assert sd_utils.get_template(template_path) is template
+
+    # The compiled template is reused, even if the file changes on disk.
+    template_path.write_text("changed")
+    assert sd_utils.get_template(template_path) is template
+
+
+def test_write_file_from_template(tmp_path):
+    template_path = tmp_path / "templates" / "Procfile"
+    template_path.parent.mkdir()
+    template_path.write_text("web: gunicorn {{ project_name }}.wsgi")
+
+    dest_path = tmp_path / "Procfile"
+    for project_name in ("blog", "shop"):
+        context = {"project_name": project_name}
+        sd_utils.write_file_from_template(dest_path, template_path, context)
+        assert dest_path.read_text() == f"web: gunicorn {project_name}.wsgi"
+
+
+def test_write_file_from_template_skips_unchanged(tmp_path):
+    template_path = tmp_path / "templates" / "Procfile"
+    template_path.parent.mkdir()
+    template_path.write_text("web: gunicorn {{ project_name }}.wsgi")
+
+    dest_path = tmp_path / "Procfile"
+    context = {"project_name": "blog"}
+    assert (
+        sd_utils.write_file_from_template(dest_path, template_path, context)
+        == "created"
+    )
+
+    # Rewriting identical content leaves the file alone.
+    os.utime(dest_path, ns=(0, 0))
+    assert (
+        sd_utils.write_file_from_template(dest_path, template_path, context)
+        == "unchanged"
+    )
+    assert dest_path.stat().st_mtime_ns == 0
+
+    context = {"project_name": "shop"}
+    assert (
+        sd_utils.write_file_from_template(dest_path, template_path, context)
+        == "updated"
+    )
+    assert dest_path.read_text() == "web: gunicorn shop.wsgi"
+
+
+def test_write_file_from_template_with_snapshot(tmp_path):
+    template_path = tmp_path / "templates" / "Procfile"
+    template_path.parent.mkdir()
+    template_path.write_text("web: gunicorn {{ project_name }}.wsgi")
+
+    dest_path = tmp_path / "Procfile"
+    dest_path.write_text("web: gunicorn blog.wsgi")
+
+    snapshot = ProjectSnapshot()
+    status = sd_utils.write_file_from_template(
+        dest_path, template_path, {"project_name": "blog"}, snapshot=snapshot
+    )
+    assert status == "unchanged"
+    assert snapshot.pop_generated() == {dest_path: "unchanged"}
+    assert snapshot.flush() == []
+
+
+def test_add_pipenv_pkgs_single_write(tmp_path):
+    path = Path(__file__).parent / "resources" / "Pipfile"
+    tmp_pipfile = tmp_path / "Pipfile"
+    tmp_pipfile.write_text(path.read_text())
+
+    snapshot = ProjectSnapshot()
+    packages = [("gunicorn", ""), ("psycopg2", "<2.9")]
+    sd_utils.add_pipenv_pkgs(tmp_pipfile, packages, snapshot)
+    assert snapshot.flush() == [tmp_pipfile]
+
+    # Only the new lines are added; the rest of the file is unchanged.
+    new_lines = 'requests = "*"\ngunicorn = "*"\npsycopg2 = "<2.9"\n'
+    expected_text = path.read_text().replace('requests = "*"\n', new_lines)
+    assert tmp_pipfile.read_text() == expected_text
+
+
+def test_add_poetry_pkgs_inline_table_falls_back(tmp_path):
+    tmp_pptoml = tmp_path / "pyproject.toml"
+    tmp_pptoml.write_text(
+        '[tool.poetry]\nname = "blog"\n'
+        "group = { deploy = { optional = true, dependencies = {} } }\n"
+    )
+
+    sd_utils.add_poetry_pkgs(tmp_pptoml, [("gunicorn", "")])
+    pptoml_data = sd_utils.load_toml(tmp_pptoml)
+    deploy_group = pptoml_data["tool"]["poetry"]["group"]["deploy"]
+    assert deploy_group["dependencies"] == {"gunicorn": "*"}
@@ -0,0 +1,59 @@
+"""Tests for simple_deploy/management/commands/worker_sizing.py."""
+
+import simple_deploy.management.commands.worker_sizing as worker_sizing
+from simple_deploy.management.commands.worker_sizing import VM, WorkerConfig
+
+import pytest
+
+
+def test_default_vm_sizes():
+    for platform, vm_size in worker_sizing.DEFAULT_VM_SIZES.items():
+        assert worker_sizing.get_vm_size(platform) == vm_size
+        assert (
+            worker_sizing.get_vm(platform) in worker_sizing.VM_SIZES[platform].values()
+        )
+
+
+def test_unknown_vm_size():
+    assert worker_sizing.get_vm("fly_io", "shared-cpu-3x") is None
+    assert worker_sizing.get_vm("heroku", "shared-cpu-1x") is None
+
+
+@pytest.mark.parametrize(
+    "platform, vm_size, workload, expected",
+    [
+        # Small VMs are limited by memory.
+        ("fly_io", "shared-cpu-1x", "io", WorkerConfig(2, 4, "gthread")),
+        ("fly_io", "shared-cpu-1x", "cpu", WorkerConfig(2, 1, "sync")),
+        ("platform_sh", "S", "io", WorkerConfig(1, 4, "gthread")),
+        # Larger VMs are limited by CPUs.
+        ("fly_io", "performance-2x", "io", WorkerConfig(3, 4, "gthread")),
+        ("fly_io", "performance-2x", "cpu", WorkerConfig(5, 1, "sync")),
+        ("heroku", "basic", "cpu", WorkerConfig(3, 1, "sync")),
+        # Fractional CPUs round up.
+        ("platform_sh", "XL", "cpu", WorkerConfig(7, 1, "sync")),
+    ],
+)
+def test_get_worker_config(platform, vm_size, workload, expected):
+    vm = worker_sizing.get_vm(platform, vm_size)
+    assert worker_sizing.get_worker_config(vm, workload) == expected
+
+
+def test_at_least_one_worker():
+    config = worker_sizing.get_worker_config(VM(1, 64), "cpu")
+    assert config.workers == 1
+
+
+def test_get_env_vars():
+    env_vars = worker_sizing.get_env_vars(WorkerConfig(3, 4, "gthread"))
+    assert env_vars == {
+        "WEB_CONCURRENCY": "3",
+        "GUNICORN_CMD_ARGS": "--threads 4",
+    }
+
+
+@pytest.mark.parametrize("workload, workers", [("io", 2), ("cpu", 3)])
+def test_get_worker_config_asgi(workload, workers):
+    vm = worker_sizing.get_vm("heroku", "basic")
+    config = worker_sizing.get_worker_config(vm, workload, "asgi")
+    assert config == WorkerConfig(workers, 1, "uvicorn_worker.UvicornWorker")